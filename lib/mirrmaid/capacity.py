@@ -0,0 +1,188 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the management of the free space on the filesystems
+holding the target replicas: the pre-flight check that defers a mirror which
+would otherwise fill its filesystem part way through a synchronization, and
+the forecast of when each filesystem will be full.
+"""
+
+import logging
+import os
+from subprocess import PIPE, run
+
+from mirrmaid.exceptions import SynchronizerException
+from mirrmaid.stats import RsyncStats
+from mirrmaid.table import format_bytes
+from mirrmaid.timing import PHASE_OPTIONS, VERBOSE_PHASE_OPTIONS
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.capacity')
+
+# The manners of estimating the bytes a mirror will receive.
+NONE = 'none'
+HISTORY = 'history'
+DRY_RUN = 'dry-run'
+SPACE_CHECKS = [NONE, HISTORY, DRY_RUN]
+
+
+def free_space(target: str) -> tuple:
+    """
+    :param target:
+        The target of a mirror.
+
+    :return:
+        A ``(device, free_bytes)`` tuple for the filesystem that holds (or
+        will hold) the *target*, where *free_bytes* is the space available
+        to unprivileged users, or ``None`` if the *target* is not local.
+    """
+    if ':' in target.split('/', 1)[0]:
+        # Either rsync://HOST/... or HOST:PATH
+        return None
+    path = os.path.abspath(target)
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    try:
+        fs = os.statvfs(path)
+        device = os.stat(path).st_dev
+    except OSError:
+        return None
+    return device, fs.f_bavail * fs.f_frsize
+
+
+def format_device(device: int) -> str:
+    """
+    :return:
+        The *device* in the ``MAJOR:MINOR`` form.
+    """
+    return f'{os.major(device)}:{os.minor(device)}'
+
+
+def dry_run_incoming(cmd: list) -> int:
+    """
+    :param cmd:
+        The rsync command of a mirror.
+
+    :return:
+        The bytes that rsync, dry-run with statistics, reports that it would
+        transfer or ``None`` if that cannot be determined.
+    """
+    omitted = (['--dry-run', '--stats'] + PHASE_OPTIONS
+               + VERBOSE_PHASE_OPTIONS)
+    cmd = cmd[:1] + ['--dry-run', '--stats'] + [
+        arg for arg in cmd[1:] if arg not in omitted
+    ]
+    _log.debug('spawning %r', cmd)
+    try:
+        result = run(cmd, stdout=PIPE, stderr=PIPE, universal_newlines=True)
+    except OSError as e:
+        _log.warning('cannot spawn rsync dry-run because: %s', e)
+        return None
+    if result.returncode != os.EX_OK:
+        return None
+    stats = RsyncStats()
+    for line in result.stdout.splitlines():
+        stats.feed(line)
+    return stats.get(RsyncStats.TOTAL_TRANSFERRED_FILE_SIZE)
+
+
+class SpaceCheck(object):
+    """The pre-flight check of the free space for a single mirror."""
+
+    def __init__(self, mirror_conf, log: logging.Logger,
+                 expected_incoming: int = None):
+        """
+        Initialize the SpaceCheck object.
+
+        :param mirror_conf:
+            The MirrorConfig of the mirror.
+
+        :param log:
+            The logger of the mirror's Synchronizer.
+
+        :param expected_incoming:
+            The bytes the mirror is expected to receive according to its
+            history or ``None`` if it has none.
+        """
+        self.mirror_conf = mirror_conf
+        self.log = log
+        self.expected_incoming = expected_incoming
+
+    def _estimate(self, cmd: list) -> int:
+        if self.mirror_conf.space_check == HISTORY:
+            return self.expected_incoming
+        return dry_run_incoming(cmd)
+
+    def permits(self, cmd: list) -> bool:
+        """
+        :param cmd:
+            The rsync command of the mirror, for a dry-run estimate.
+
+        :return:
+            ``True`` unless the estimated bytes to be received, plus the
+            ``space_reserve``, exceed the free space of the target's
+            filesystem.  The check passes whenever either is unknown.
+
+        :raises SynchronizerException:
+            If the manner of estimation is not supported.
+        """
+        check = self.mirror_conf.space_check
+        if check not in SPACE_CHECKS:
+            raise SynchronizerException(
+                f'space_check {check!r} is not one of {SPACE_CHECKS!r}')
+        if check == NONE:
+            return True
+        free = free_space(self.mirror_conf.target)
+        if free is None:
+            self.log.debug('space check skipped for non-local target')
+            return True
+        _, free_bytes = free
+        incoming = self._estimate(cmd)
+        if incoming is None:
+            self.log.debug('space check skipped for lack of an estimate')
+            return True
+        needed = incoming + self.mirror_conf.space_reserve
+        self.log.debug('space check: need %s, have %s',
+                       format_bytes(needed), format_bytes(free_bytes))
+        if needed > free_bytes:
+            self.log.error('deferred since about %s is needed but only %s is '
+                           'free on the target filesystem',
+                           format_bytes(needed), format_bytes(free_bytes))
+            return False
+        return True
+
+
+def forecast(samples: list) -> tuple:
+    """
+    Fit a line to the free space of a filesystem over time.
+
+    :param samples:
+        A list of ``(time, free_bytes)`` tuples in chronological order.
+
+    :return:
+        A ``(bytes_per_day, days_until_full)`` tuple, where the rate is
+        negative as the free space shrinks and *days_until_full* is ``None``
+        unless it does; or ``None`` if the samples do not suffice.
+    """
+    if len(samples) < 2 or samples[-1][0] - samples[0][0] < 60 * 60:
+        return None
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_f = sum(f for _, f in samples) / n
+    variance = sum((t - mean_t) ** 2 for t, _ in samples)
+    covariance = sum((t - mean_t) * (f - mean_f) for t, f in samples)
+    per_day = covariance / variance * 24 * 60 * 60
+    if per_day >= 0:
+        return per_day, None
+    return per_day, max(0.0, samples[-1][1] / -per_day)
@@ -13,7 +13,7 @@ from traceback import format_exc
 
 from doubledog.config.sectioned import InvalidConfiguration
 
-from mirrmaid.constants import CONFIG_FILENAME
+from mirrmaid.constants import CONFIG_FILENAME, DEFAULT_HISTORY_DAYS
 from mirrmaid.exceptions import (
     MirrmaidRuntimeException, SignalException,
     SynchronizerException,
@@ -58,6 +58,115 @@ class MirrmaidCLI(object):
             action='store_const', dest='log_level', const=logging.INFO,
             help='set logging level to INFO',
         )
+        self._parser.set_defaults(command=None)
+        commands = self._parser.add_subparsers(
+            dest='command', metavar='COMMAND',
+            help='omit to synchronize all enabled mirrors',
+        )
+        self._init_history_parser(commands)
+        self._init_list_parser(commands)
+        self._init_plan_parser(commands)
+        self._init_purge_parser(commands)
+        self._init_trigger_parser(commands)
+        self._init_verify_parser(commands)
+        self._init_watch_parser(commands)
+
+    @staticmethod
+    def _init_history_parser(commands):
+        parser = commands.add_parser(
+            'history',
+            help='show trends from the journal of synchronization runs',
+        )
+        parser.set_defaults(days=DEFAULT_HISTORY_DAYS, mirror=None)
+        parser.add_argument(
+            'report',
+            choices=['slowest', 'failures', 'bytes', 'capacity'],
+            help='slowest mirrors, failure rates, bytes received per day or '
+                 'days until each target filesystem is full',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help=f'consider only the most recent DAYS '
+                 f'(default: {DEFAULT_HISTORY_DAYS})',
+        )
+        parser.add_argument(
+            '--mirror',
+            help='consider only the named mirror',
+        )
+
+    @staticmethod
+    def _init_list_parser(commands):
+        parser = commands.add_parser(
+            'list',
+            help='show the enabled mirrors, with templates and bulk '
+                 'declarations expanded',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='show all declared mirrors, even if not enabled',
+        )
+
+    @staticmethod
+    def _init_plan_parser(commands):
+        commands.add_parser(
+            'plan',
+            help='estimate the cost of the next cycle via concurrent dry-runs',
+        )
+
+    @staticmethod
+    def _init_purge_parser(commands):
+        parser = commands.add_parser(
+            'purge',
+            help='empty the trash directories of mirrors deferring their '
+                 'deletions',
+        )
+        parser.add_argument(
+            'mirrors',
+            metavar='MIRROR',
+            nargs='*',
+            help='name of an enabled mirror (default: all enabled mirrors)',
+        )
+
+    @staticmethod
+    def _init_trigger_parser(commands):
+        parser = commands.add_parser(
+            'trigger',
+            help='request immediate synchronization of mirrors by '
+                 '"mirrmaid watch"',
+        )
+        parser.add_argument(
+            'mirrors',
+            metavar='MIRROR',
+            nargs='+',
+            help='name of an enabled mirror',
+        )
+
+    @staticmethod
+    def _init_verify_parser(commands):
+        parser = commands.add_parser(
+            'verify',
+            help='verify mirror targets against their checksum manifests',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='hash every file, even if unchanged since last verified',
+        )
+        parser.add_argument(
+            'mirrors',
+            metavar='MIRROR',
+            nargs='*',
+            help='name of an enabled mirror (default: all enabled mirrors)',
+        )
+
+    @staticmethod
+    def _init_watch_parser(commands):
+        commands.add_parser(
+            'watch',
+            help='synchronize mirrors as they are triggered, until signalled',
+        )
 
     def exit(self, exit_code=os.EX_OK, message=None, show_help=False):
         """
@@ -79,7 +188,23 @@ class MirrmaidCLI(object):
         # noinspection PyBroadException
         try:
             self.args = self._parser.parse_args()
-            MirrorManager(self).run()
+            manager = MirrorManager(self)
+            if self.args.command == 'history':
+                manager.history()
+            elif self.args.command == 'list':
+                manager.list()
+            elif self.args.command == 'plan':
+                manager.plan()
+            elif self.args.command == 'purge':
+                manager.purge()
+            elif self.args.command == 'trigger':
+                manager.trigger()
+            elif self.args.command == 'verify':
+                manager.verify()
+            elif self.args.command == 'watch':
+                manager.watch()
+            else:
+                manager.run()
         except InvalidConfiguration as e:
             self.exit(os.EX_CONFIG, f'invalid configuration:\n{e}')
         except (MirrmaidRuntimeException, SynchronizerException) as e:
@@ -0,0 +1,403 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the coordination of several mirrmaid nodes that share
+storage.  Nodes claim mirrors through time-limited leases kept in a shared
+state directory, so that each mirror is synchronized by only one node per
+cycle, the work is balanced by its expected cost and the leases of a node
+that dies are eventually taken over by the others.
+
+Only operations known to be atomic on NFS are relied upon: creating a hard
+link, renaming a file and replacing a file by renaming over it.  Lease
+expiration depends on wall-clock time so the nodes' clocks must be kept
+synchronized.
+"""
+
+import errno
+import json
+import logging
+import os
+import socket
+from threading import Event, Lock, Thread, get_ident
+from time import time
+
+from mirrmaid.reporting import Reporter, RunReport, SUCCESS
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.cluster')
+
+# Weight given to the most recent run when updating a mirror's expected cost.
+COST_SMOOTHING = 0.3
+
+
+class LeaseStore(object):
+    """
+    The leases held on mirrors within a shared state directory.
+
+    Each lease is a small JSON file named for its mirror.  The file outlives
+    the lease itself, retaining when the mirror was last completed and its
+    expected cost for the benefit of all nodes.
+    """
+
+    def __init__(self, directory: str, node: str, ttl: int):
+        """
+        Initialize the LeaseStore object.
+
+        :param directory:
+            The shared state directory.
+
+        :param node:
+            The unique name of this node.
+
+        :param ttl:
+            The number of seconds that a lease (or node heartbeat) remains
+            valid unless renewed.
+        """
+        self.directory = directory
+        self.node = node
+        self.ttl = ttl
+        self._unique = f'{socket.gethostname()}.{os.getpid()}'
+        os.makedirs(self._nodes_directory, exist_ok=True)
+
+    @property
+    def _nodes_directory(self) -> str:
+        return os.path.join(self.directory, 'nodes')
+
+    def _lease_path(self, mirror: str) -> str:
+        return os.path.join(self.directory,
+                            f'{mirror.replace(os.sep, "_")}.lease')
+
+    def _temporary(self, mirror: str) -> str:
+        return os.path.join(self.directory,
+                            f'.{mirror.replace(os.sep, "_")}.{self._unique}'
+                            f'.{get_ident()}')
+
+    def _write_temporary(self, mirror: str, content: dict) -> str:
+        temporary = self._temporary(mirror)
+        with open(temporary, 'w') as f:
+            json.dump(content, f)
+        return temporary
+
+    def _link(self, temporary: str, path: str) -> bool:
+        """Atomically create *path* as a hard-link to *temporary*."""
+        try:
+            os.link(temporary, path)
+        except FileExistsError:
+            pass
+        except OSError as e:
+            _log.warning('cannot link %r because: %s', path, e)
+        # NFS may report failure of a link that did succeed (or vice versa),
+        # but the link count is authoritative.
+        try:
+            return os.stat(temporary).st_nlink == 2
+        finally:
+            os.unlink(temporary)
+
+    def _lease(self, mirror: str, previous: dict) -> dict:
+        return {
+            'node': self.node,
+            'expires': time() + self.ttl,
+            'completed': previous.get('completed'),
+            'cost': previous.get('cost'),
+        }
+
+    def acquire(self, mirror: str) -> bool:
+        """
+        Attempt to acquire the lease on a mirror.
+
+        :return:
+            ``True`` iff the lease was acquired.
+        """
+        path = self._lease_path(mirror)
+        current = self.read(mirror)
+        previous = {}
+        if current is not None:
+            if current.get('expires', 0) > time():
+                return False
+            # Expired or released; only one node can succeed in renaming it
+            # aside.
+            aside = f'{path}.{self._unique}'
+            try:
+                os.rename(path, aside)
+            except FileNotFoundError:
+                return False
+            aside_content = self._read_file(aside) or {}
+            if aside_content.get('expires', 0) > time():
+                # Renewed by its holder between our read and our rename.
+                self._link(aside, path)
+                return False
+            os.unlink(aside)
+            if aside_content.get('node') not in (None, self.node) and \
+                    aside_content.get('expires'):
+                _log.warning('taking over expired lease on %r from node %r',
+                             mirror, aside_content['node'])
+            previous = aside_content
+        temporary = self._write_temporary(mirror,
+                                          self._lease(mirror, previous))
+        acquired = self._link(temporary, path)
+        if acquired:
+            _log.debug('acquired lease on %r', mirror)
+        return acquired
+
+    def heartbeat(self):
+        """Advertise that this node is alive."""
+        path = os.path.join(self._nodes_directory, self.node)
+        now = time()
+        with open(path, 'a'):
+            # The time is that of this node's clock, as with the leases,
+            # rather than that of the file server.
+            os.utime(path, (now, now))
+
+    def live_nodes(self, window: float = None) -> list:
+        """
+        :param window:
+            The number of seconds within which a heartbeat is recent or
+            ``None`` for the ``ttl``.
+
+        :return:
+            The names of the nodes with a recent heartbeat.
+        """
+        since = time() - (self.ttl if window is None else window)
+        result = []
+        for entry in os.scandir(self._nodes_directory):
+            try:
+                if entry.stat().st_mtime > since:
+                    result.append(entry.name)
+            except OSError:
+                pass
+        if self.node not in result:
+            result.append(self.node)
+        return result
+
+    @staticmethod
+    def _read_file(path: str):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Damaged; treat as expired.
+            return {}
+
+    def read(self, mirror: str):
+        """
+        :return:
+            The content of the mirror's lease file or ``None`` if it has
+            none.
+        """
+        return self._read_file(self._lease_path(mirror))
+
+    def release(self, mirror: str, completed: bool = False,
+                elapsed: float = None):
+        """
+        Release the lease on a mirror held by this node.
+
+        :param completed:
+            If true, record that the mirror was synchronized successfully.
+
+        :param elapsed:
+            If given, the duration of the run, in seconds, which will update
+            the expected cost of the mirror.
+        """
+        current = self.read(mirror)
+        if not current or current.get('node') != self.node:
+            _log.warning('lease on %r was lost before release', mirror)
+            return
+        if completed:
+            current['completed'] = time()
+        if elapsed is not None:
+            cost = current.get('cost')
+            current['cost'] = elapsed if cost is None else (
+                    COST_SMOOTHING * elapsed + (1 - COST_SMOOTHING) * cost)
+        current['expires'] = 0
+        os.replace(self._write_temporary(mirror, current),
+                   self._lease_path(mirror))
+        _log.debug('released lease on %r', mirror)
+
+    def renew(self, mirror: str) -> bool:
+        """
+        Extend the lease on a mirror held by this node.
+
+        A lease that has expired is not renewed, for another node may be
+        taking it over meanwhile and it would be overwritten.
+
+        :return:
+            ``True`` iff the lease is still held by this node.
+        """
+        current = self.read(mirror)
+        if not current or current.get('node') != self.node:
+            return False
+        if current.get('expires', 0) <= time():
+            return False
+        current['expires'] = time() + self.ttl
+        os.replace(self._write_temporary(mirror, current),
+                   self._lease_path(mirror))
+        return True
+
+
+class ClusterCoordinator(Reporter):
+    """
+    Decides which mirrors this node is to synchronize and maintains the
+    leases on them.
+
+    Mirrors are considered in order of decreasing expected cost.  In a first
+    pass, this node claims mirrors until it holds its fair share of the total
+    cost among the nodes taking part in the cycle, being those with
+    a heartbeat within the window.  In a second pass, it claims any mirror that
+    no node has completed during this cycle and that is not leased, which
+    covers the remainder as well as the mirrors of nodes that have died.
+
+    As a Reporter, it releases each lease as its Synchronizer concludes.
+    """
+
+    def __init__(self, store: LeaseStore, costs: dict = None,
+                 window: float = None):
+        """
+        Initialize the ClusterCoordinator object.
+
+        :param store:
+            The shared leases.
+
+        :param costs:
+            A dictionary mapping mirror names to their expected cost (e.g.,
+            their mean duration from the local run journal) which is used for
+            mirrors that lack a cost within the shared state.
+
+        :param window:
+            The number of seconds within which the nodes that sent
+            a heartbeat share the cycle, even if they have since finished,
+            or ``None`` for the ``ttl`` of the *store*.
+        """
+        self.store = store
+        self.costs = costs or {}
+        self.window = max(window or 0, store.ttl)
+        self.cycle_started = time()
+        self._claimed = set()
+        self._held = {}
+        self._lock = Lock()
+        self._stopping = Event()
+        self._renewer = Thread(target=self._renew, name='lease-renewer',
+                               daemon=True)
+        self.store.heartbeat()
+        self._renewer.start()
+
+    def _cost(self, mirror: str) -> float:
+        lease = self.store.read(mirror) or {}
+        cost = lease.get('cost') or self.costs.get(mirror)
+        if cost is None:
+            known = [c for c in self.costs.values() if c]
+            cost = sum(known) / len(known) if known else 1.0
+        return cost
+
+    def _done(self, mirror: str) -> bool:
+        """
+        :return:
+            ``True`` iff some node completed the mirror during this cycle.
+        """
+        lease = self.store.read(mirror) or {}
+        completed = lease.get('completed') or 0
+        # Nodes are expected to start their cycles at about the same time.
+        return completed >= self.cycle_started - self.store.ttl
+
+    def _renew(self):
+        while not self._stopping.wait(self.store.ttl / 3):
+            self.store.heartbeat()
+            with self._lock:
+                held = list(self._held.items())
+            for mirror, worker in held:
+                if worker is not None and not worker.is_alive():
+                    # Concluded without reporting.
+                    self._release(mirror)
+                elif not self.store.renew(mirror):
+                    _log.error('lease on %r was lost', mirror)
+                    with self._lock:
+                        self._held.pop(mirror, None)
+
+    def _release(self, mirror: str, completed: bool = False,
+                 elapsed: float = None):
+        with self._lock:
+            if mirror not in self._held:
+                return
+            del self._held[mirror]
+        self.store.release(mirror, completed, elapsed)
+
+    def attach(self, mirror: str, worker):
+        """Associate the worker synchronizing a claimed mirror."""
+        with self._lock:
+            if mirror in self._held:
+                self._held[mirror] = worker
+
+    def claims(self, mirrors: list):
+        """
+        Claim mirrors for this node, one at a time as they are requested.
+
+        :param mirrors:
+            The names of all enabled mirrors.
+
+        :return:
+            A generator of the names of mirrors whose lease has been acquired.
+        """
+        costs = {mirror: self._cost(mirror) for mirror in mirrors}
+        ordered = sorted(mirrors, key=lambda m: (-costs[m], m))
+        # A node that started late must not count only the nodes still
+        # running, lest it claim the shares of those that already finished.
+        nodes = self.store.live_nodes(self.window)
+        share = sum(costs.values()) / len(nodes)
+        _log.debug('%d nodes in cycle; fair share is %.0f of %.0f',
+                   len(nodes), share, sum(costs.values()))
+        claimed = 0.0
+        for mirror in ordered:
+            if claimed >= share:
+                break
+            if not self._done(mirror) and self._claim(mirror):
+                claimed += costs[mirror]
+                yield mirror
+        for mirror in ordered:
+            if mirror not in self._claimed and not self._done(mirror) \
+                    and self._claim(mirror):
+                yield mirror
+
+    def _claim(self, mirror: str) -> bool:
+        try:
+            acquired = self.store.acquire(mirror)
+        except OSError as e:
+            if e.errno not in (errno.ENOENT, errno.EEXIST):
+                _log.error('cannot acquire lease on %r because: %s',
+                           mirror, e)
+            return False
+        if not acquired:
+            return False
+        with self._lock:
+            self._held[mirror] = None
+        if self._done(mirror):
+            # Completed by another node just before the lease was acquired.
+            self._release(mirror)
+            return False
+        self._claimed.add(mirror)
+        return True
+
+    def close(self):
+        """Stop renewing and release all leases still held."""
+        self._stopping.set()
+        self._renewer.join()
+        with self._lock:
+            held = list(self._held)
+        for mirror in held:
+            self._release(mirror)
+
+    def report(self, run_report: RunReport):
+        self._release(
+            run_report.mirror,
+            completed=run_report.outcome == SUCCESS,
+            elapsed=(run_report.elapsed
+                     if run_report.outcome == SUCCESS else None),
+        )
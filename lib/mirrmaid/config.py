@@ -11,13 +11,24 @@ This module implements the Configuration_Parser, which parses the
 configuration file to make the directives readily available.
 """
 
+import logging
+import re
+import socket
+from ast import literal_eval
+from configparser import ConfigParser, Error, NoOptionError
+from fnmatch import fnmatchcase
+from itertools import product
+
 from doubledog.config.sectioned import BaseConfig
 
 from mirrmaid.constants import *
+from mirrmaid.exceptions import MirrmaidRuntimeException
 
 __author__ = """John Florian <jflorian@doubledog.org>"""
 __copyright__ = """Copyright 2009-2020 John Florian"""
 
+_log = logging.getLogger('mirrmaid.config')
+
 
 class MirrmaidConfig(BaseConfig):
     """
@@ -37,6 +48,142 @@ class MirrmaidConfig(BaseConfig):
         BaseConfig.__init__(self, filename)
         self._set_section('MIRRMAID')
 
+    @property
+    def cluster_directory(self) -> str:
+        """
+        :return:
+            The value of the optional ``'cluster_directory'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return self.get('cluster_directory', required=False,
+                        default=DEFAULT_CLUSTER_DIRECTORY) or None
+
+    @property
+    def cluster_lease_ttl(self) -> int:
+        """
+        :return:
+            The value of the optional ``'cluster_lease_ttl'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return max(
+            30,
+            self.get_int('cluster_lease_ttl', required=False,
+                         default=DEFAULT_CLUSTER_LEASE_TTL)
+        )
+
+    @property
+    def cluster_node_window(self) -> int:
+        """
+        :return:
+            The value of the optional ``'cluster_node_window'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return max(
+            0,
+            self.get_int('cluster_node_window', required=False,
+                         default=DEFAULT_CLUSTER_NODE_WINDOW)
+        )
+
+    @property
+    def cluster_node(self) -> str:
+        """
+        :return:
+            The value of the optional ``'cluster_node'`` setting.  If unset,
+            the host name will be returned instead.
+        """
+        return (self.get('cluster_node', required=False,
+                         default=DEFAULT_CLUSTER_NODE)
+                or socket.gethostname())
+
+    @property
+    def dedup(self) -> bool:
+        """
+        :return:
+            The value of the optional ``'dedup'`` setting.  If unset, the
+            application default will be returned instead.
+        """
+        return self.get_boolean('dedup', required=False, default=DEFAULT_DEDUP)
+
+    @property
+    def dedup_min_size(self) -> int:
+        """
+        :return:
+            The value of the optional ``'dedup_min_size'`` setting.  If unset,
+            the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('dedup_min_size', required=False,
+                         default=DEFAULT_DEDUP_MIN_SIZE)
+        )
+
+    @property
+    def dedup_workers(self) -> int:
+        """
+        :return:
+            The value of the optional ``'dedup_workers'`` setting.  If unset,
+            the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('dedup_workers', required=False,
+                         default=DEFAULT_DEDUP_WORKERS)
+        )
+
+    @property
+    def forecast_days(self) -> int:
+        """
+        :return:
+            The value of the optional ``'forecast_days'`` setting.  If unset,
+            the application default will be returned instead.
+        """
+        return max(
+            0,
+            self.get_int('forecast_days', required=False,
+                         default=DEFAULT_FORECAST_DAYS)
+        )
+
+    @property
+    def journal(self) -> bool:
+        """
+        :return:
+            The value of the optional ``'journal'`` setting.  If unset, the
+            application default will be returned instead.
+        """
+        return self.get_boolean('journal', required=False,
+                                default=DEFAULT_JOURNAL)
+
+    @property
+    def log_collector(self) -> str:
+        """
+        :return:
+            The value of the optional ``'log_collector'`` setting.  If unset,
+            the application default will be returned instead.
+
+        :raises MirrmaidRuntimeException:
+            If the setting is not one of the supported log collectors.
+        """
+        collector = self.get('log_collector', required=False,
+                             default=DEFAULT_LOG_COLLECTOR)
+        if collector not in LOG_COLLECTORS:
+            raise MirrmaidRuntimeException(
+                f'log_collector {collector!r} is not one of '
+                f'{LOG_COLLECTORS!r}')
+        return collector
+
+    @property
+    def max_hook_workers(self) -> int:
+        """
+        :return:
+            The value of the optional ``'max_hook_workers'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('max_hook_workers', required=False,
+                         default=DEFAULT_MAX_HOOK_WORKERS)
+        )
+
     @property
     def max_workers(self) -> int:
         """
@@ -50,6 +197,55 @@ class MirrmaidConfig(BaseConfig):
                          default=DEFAULT_MAX_WORKERS)
         )
 
+    @property
+    def plan_workers(self) -> int:
+        """
+        :return:
+            The value of the optional ``'plan_workers'`` setting.  If unset,
+            the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('plan_workers', required=False,
+                         default=DEFAULT_PLAN_WORKERS)
+        )
+
+    @property
+    def preflight(self) -> bool:
+        """
+        :return:
+            The value of the optional ``'preflight'`` setting.  If unset, the
+            application default will be returned instead.
+        """
+        return self.get_boolean('preflight', required=False,
+                                default=DEFAULT_PREFLIGHT)
+
+    @property
+    def preflight_timeout(self) -> int:
+        """
+        :return:
+            The value of the optional ``'preflight_timeout'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('preflight_timeout', required=False,
+                         default=DEFAULT_PREFLIGHT_TIMEOUT)
+        )
+
+    @property
+    def preflight_workers(self) -> int:
+        """
+        :return:
+            The value of the optional ``'preflight_workers'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('preflight_workers', required=False,
+                         default=DEFAULT_PREFLIGHT_WORKERS)
+        )
+
     @property
     def proxy(self) -> str:
         """
@@ -59,6 +255,71 @@ class MirrmaidConfig(BaseConfig):
         """
         return self.get('proxy', required=False, default=DEFAULT_PROXY)
 
+    @property
+    def purge_batch_pause(self) -> int:
+        """
+        :return:
+            The value of the optional ``'purge_batch_pause'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return max(
+            0,
+            self.get_int('purge_batch_pause', required=False,
+                         default=DEFAULT_PURGE_BATCH_PAUSE)
+        )
+
+    @property
+    def purge_batch_size(self) -> int:
+        """
+        :return:
+            The value of the optional ``'purge_batch_size'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('purge_batch_size', required=False,
+                         default=DEFAULT_PURGE_BATCH_SIZE)
+        )
+
+    @property
+    def purge_window(self) -> tuple:
+        """
+        :return:
+            The value of the optional ``'purge_window'`` setting as
+            a ``(start, end)`` tuple of minutes since midnight or ``None`` if
+            unset, for no limit.
+
+        :raises MirrmaidRuntimeException:
+            If the setting is not in the ``'HH:MM-HH:MM'`` format.
+        """
+        window = self.get('purge_window', required=False,
+                          default=DEFAULT_PURGE_WINDOW)
+        if not window:
+            return None
+        try:
+            bounds = []
+            for bound in window.split('-'):
+                hours, minutes = bound.strip().split(':')
+                if not (0 <= int(hours) < 24 and 0 <= int(minutes) < 60):
+                    raise ValueError
+                bounds.append(int(hours) * 60 + int(minutes))
+            start, end = bounds
+        except ValueError:
+            raise MirrmaidRuntimeException(
+                f'purge_window {window!r} is not in the HH:MM-HH:MM format'
+            ) from None
+        return start, end
+
+    @property
+    def reporters(self) -> list:
+        """
+        :return:
+            The value of the optional ``'reporters'`` setting.  If unset, the
+            application default will be returned instead.
+        """
+        return self.get_list('reporters', required=False,
+                             default=DEFAULT_REPORTERS)
+
     @property
     def summary_group(self) -> str:
         """
@@ -115,6 +376,68 @@ class MirrmaidConfig(BaseConfig):
         return self.get_int('summary_size', required=False,
                             default=DEFAULT_SUMMARY_SIZE)
 
+    @property
+    def verify_workers(self) -> int:
+        """
+        :return:
+            The value of the optional ``'verify_workers'`` setting.  If unset,
+            the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('verify_workers', required=False,
+                         default=DEFAULT_VERIFY_WORKERS)
+        )
+
+    @property
+    def watch_interval(self) -> int:
+        """
+        :return:
+            The value of the optional ``'watch_interval'`` setting.  If unset,
+            the application default will be returned instead.
+        """
+        return max(
+            1,
+            self.get_int('watch_interval', required=False,
+                         default=DEFAULT_WATCH_INTERVAL)
+        )
+
+    @property
+    def worker_log_level(self) -> int:
+        """
+        :return:
+            The value of the optional ``'worker_log_level'`` setting as
+            a logging level.  If unset, the application default will be
+            returned instead.
+
+        :raises MirrmaidRuntimeException:
+            If the setting does not name a logging level.
+        """
+        name = self.get('worker_log_level', required=False,
+                        default=DEFAULT_WORKER_LOG_LEVEL)
+        level = logging.getLevelName(name.upper())
+        if not isinstance(level, int):
+            raise MirrmaidRuntimeException(
+                f'worker_log_level {name!r} is not a logging level')
+        return level
+
+    @property
+    def worker_mode(self) -> str:
+        """
+        :return:
+            The value of the optional ``'worker_mode'`` setting.  If unset,
+            the application default will be returned instead.
+
+        :raises MirrmaidRuntimeException:
+            If the setting is not one of the supported worker modes.
+        """
+        mode = self.get('worker_mode', required=False,
+                        default=DEFAULT_WORKER_MODE)
+        if mode not in WORKER_MODES:
+            raise MirrmaidRuntimeException(
+                f'worker_mode {mode!r} is not one of {WORKER_MODES!r}')
+        return mode
+
 
 class MirrorsConfig(BaseConfig):
     """
@@ -138,8 +461,9 @@ class MirrorsConfig(BaseConfig):
     def mirrors(self) -> list:
         """
         :return:
-            Return a list of those mirror names that are enabled -- the value of
-            the required ``'enabled'`` setting.
+            Return a list of those mirror names, or glob patterns matching
+            them, that are enabled -- the value of the required ``'enabled'``
+            setting.
 
         :raises NoOptionError:
             If the setting is absent.
@@ -171,6 +495,54 @@ class MirrorConfig(BaseConfig):
         BaseConfig.__init__(self, filename)
         self._set_section(mirror)
 
+    @property
+    def cgroup_cpu_weight(self) -> int:
+        """
+        :return:
+            The value of the optional ``'cgroup_cpu_weight'`` setting for this
+            mirror, limited to the range accepted by the kernel, or zero if
+            none.  If unset, the application default will be returned
+            instead.
+        """
+        weight = self.get_int('cgroup_cpu_weight', required=False,
+                              default=DEFAULT_CGROUP_CPU_WEIGHT)
+        return max(0, min(10000, weight))
+
+    @property
+    def cgroup_io_max(self) -> list:
+        """
+        :return:
+            The value of the optional ``'cgroup_io_max'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return self.get_list('cgroup_io_max', required=False,
+                             default=DEFAULT_CGROUP_IO_MAX)
+
+    @property
+    def cgroup_io_weight(self) -> int:
+        """
+        :return:
+            The value of the optional ``'cgroup_io_weight'`` setting for this
+            mirror, limited to the range accepted by the kernel, or zero if
+            none.  If unset, the application default will be returned
+            instead.
+        """
+        weight = self.get_int('cgroup_io_weight', required=False,
+                              default=DEFAULT_CGROUP_IO_WEIGHT)
+        return max(0, min(10000, weight))
+
+    @property
+    def deferred_delete(self) -> bool:
+        """
+        :return:
+            The value of the optional ``'deferred_delete'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return self.get_boolean('deferred_delete', required=False,
+                                default=DEFAULT_DEFERRED_DELETE)
+
     @property
     def excludes(self) -> list:
         """
@@ -185,6 +557,43 @@ class MirrorConfig(BaseConfig):
         """
         return self.get_list('exclude')
 
+    @property
+    def file_list(self) -> str:
+        """
+        :return:
+            The value of the optional ``'file_list'`` setting for this mirror,
+            which is relative to its source.  If unset, the application
+            default will be returned instead.
+        """
+        return (self.get('file_list', required=False,
+                         default=DEFAULT_FILE_LIST)
+                or None)
+
+    @property
+    def file_list_format(self) -> str:
+        """
+        :return:
+            The value of the optional ``'file_list_format'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return self.get('file_list_format', required=False,
+                        default=DEFAULT_FILE_LIST_FORMAT)
+
+    @property
+    def full_sync_interval(self) -> int:
+        """
+        :return:
+            The value of the optional ``'full_sync_interval'`` setting for
+            this mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return max(
+            1,
+            self.get_int('full_sync_interval', required=False,
+                         default=DEFAULT_FULL_SYNC_INTERVAL)
+        )
+
     @property
     def includes(self) -> list:
         """
@@ -199,6 +608,54 @@ class MirrorConfig(BaseConfig):
         """
         return self.get_list('include')
 
+    @property
+    def ionice_class(self) -> str:
+        """
+        :return:
+            The value of the optional ``'ionice_class'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return self.get('ionice_class', required=False,
+                        default=DEFAULT_IONICE_CLASS)
+
+    @property
+    def ionice_priority(self) -> int:
+        """
+        :return:
+            The value of the optional ``'ionice_priority'`` setting for this
+            mirror, limited to the range accepted by ionice.  If unset, the
+            application default will be returned instead.
+        """
+        priority = self.get_int('ionice_priority', required=False,
+                                default=DEFAULT_IONICE_PRIORITY)
+        return max(0, min(7, priority))
+
+    @property
+    def max_runtime(self) -> int:
+        """
+        :return:
+            The value of the optional ``'max_runtime'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return max(
+            0,
+            self.get_int('max_runtime', required=False,
+                         default=DEFAULT_MAX_RUNTIME)
+        )
+
+    @property
+    def metadata(self) -> list:
+        """
+        :return:
+            A list of the rsync patterns matching the mirror's repository
+            metadata -- the value of the optional ``'metadata'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return self.get_list('metadata', required=False,
+                             default=DEFAULT_METADATA)
+
     @property
     def mirror_name(self) -> str:
         """
@@ -212,6 +669,140 @@ class MirrorConfig(BaseConfig):
         """
         return self._get_section()
 
+    @property
+    def nice(self) -> int:
+        """
+        :return:
+            The value of the optional ``'nice'`` setting for this mirror,
+            limited to at most the 19 accepted by nice.  If unset, the
+            application default will be returned instead.
+        """
+        nice = self.get_int('nice', required=False, default=DEFAULT_NICE)
+        return min(19, nice)
+
+    @property
+    def post_sync(self) -> list:
+        """
+        :return:
+            A list of the commands to be run after a successful mirror
+            synchronization -- the value of the optional ``'post_sync'``
+            setting.  If unset, the application default will be returned
+            instead.
+        """
+        return self.get_list('post_sync', required=False,
+                             default=DEFAULT_POST_SYNC)
+
+    @property
+    def post_sync_timeout(self) -> int:
+        """
+        :return:
+            The value of the optional ``'post_sync_timeout'`` setting.  If
+            unset, the application default will be returned instead.
+        """
+        return max(
+            0,
+            self.get_int('post_sync_timeout', required=False,
+                         default=DEFAULT_POST_SYNC_TIMEOUT)
+        )
+
+    @property
+    def rsync_options(self) -> list:
+        """
+        :return:
+            A list of the options to be passed to rsync for the mirror -- the
+            value of the ``'rsync_options'`` setting, which may be inherited
+            from the ``'DEFAULT'`` section.
+
+        :raises NoOptionError:
+            If the setting is absent.
+        """
+        return self.get_list('rsync_options')
+
+    @property
+    def rsync_options_add(self) -> list:
+        """
+        :return:
+            A list of the rsync options to be added to those of the mirror
+            and its profiles -- the value of the optional
+            ``'rsync_options_add'`` setting.  If unset, the application
+            default will be returned instead.
+        """
+        return self.get_list('rsync_options_add', required=False,
+                             default=DEFAULT_RSYNC_OPTIONS_ADD)
+
+    @property
+    def rsync_options_remove(self) -> list:
+        """
+        :return:
+            A list of the rsync options to be removed from those of the
+            mirror and its profiles -- the value of the optional
+            ``'rsync_options_remove'`` setting.  If unset, the application
+            default will be returned instead.
+        """
+        return self.get_list('rsync_options_remove', required=False,
+                             default=DEFAULT_RSYNC_OPTIONS_REMOVE)
+
+    @property
+    def rsync_profiles(self) -> list:
+        """
+        :return:
+            A list of the names of the rsync profiles to be applied, in order,
+            to the mirror -- the value of the optional ``'rsync_profiles'``
+            setting.  If unset, the application default will be returned
+            instead.
+        """
+        return self.get_list('rsync_profiles', required=False,
+                             default=DEFAULT_RSYNC_PROFILES)
+
+    @property
+    def space_check(self) -> str:
+        """
+        :return:
+            The value of the optional ``'space_check'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return self.get('space_check', required=False,
+                        default=DEFAULT_SPACE_CHECK)
+
+    @property
+    def space_reserve(self) -> int:
+        """
+        :return:
+            The value of the optional ``'space_reserve'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return max(
+            0,
+            self.get_int('space_reserve', required=False,
+                         default=DEFAULT_SPACE_RESERVE)
+        )
+
+    @property
+    def staged(self) -> bool:
+        """
+        :return:
+            The value of the optional ``'staged'`` setting for this mirror.
+            If unset, the application default will be returned instead.
+        """
+        return self.get_boolean('staged', required=False,
+                                default=DEFAULT_STAGED)
+
+    @property
+    def stall_timeout(self) -> int:
+        """
+        :return:
+            The value of the optional ``'stall_timeout'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return max(
+            0,
+            self.get_int('stall_timeout', required=False,
+                         default=DEFAULT_STALL_TIMEOUT)
+        )
+
     @property
     def source(self) -> str:
         """
@@ -239,3 +830,315 @@ class MirrorConfig(BaseConfig):
             If the section is absent.
         """
         return self.get('target')
+
+    @property
+    def trash_directory(self) -> str:
+        """
+        :return:
+            The value of the optional ``'trash_directory'`` setting for this
+            mirror.  If unset, the application default will be returned
+            instead.
+        """
+        return (self.get('trash_directory', required=False,
+                         default=DEFAULT_TRASH_DIRECTORY)
+                or None)
+
+
+class ExpandedMirrorConfig(MirrorConfig):
+    """
+    Accessor to a mirror's configuration as expanded by a MirrorTable.  The
+    mirror may be declared by a section of its own, a ``'BULK'`` section or
+    both and its settings may come from a ``'TEMPLATE'`` section.
+    """
+
+    # noinspection PyMissingConstructor
+    def __init__(self, table, mirror: str):
+        """
+        Initialize the ExpandedMirrorConfig object.
+
+        Unlike the other accessors, this does not parse the configuration
+        file; the MirrorTable already has.
+
+        :param table:
+            The MirrorTable that declares the mirror.
+
+        :param mirror:
+            Name of the mirror.
+        """
+        self._table = table
+        self._mirror = mirror
+
+    def _get_section(self) -> str:
+        return self._mirror
+
+    def _invalid(self, option: str, e: Exception):
+        return MirrmaidRuntimeException(
+            f'setting {option!r} of mirror {self._mirror!r} is invalid '
+            f'because: {e}')
+
+    def get(self, option: str, required: bool = True, default=None):
+        """
+        :return:
+            The value of the *option* for the mirror, with any interpolation
+            performed, or *default* if it is unset and not *required*.
+
+        :raises NoOptionError:
+            If the setting is absent yet *required*.
+        """
+        section = self._table.section(self._mirror)
+        if option in section:
+            try:
+                return section[option]
+            except Error as e:
+                raise self._invalid(option, e) from None
+        if required:
+            raise NoOptionError(option, self._mirror)
+        return default
+
+    def get_boolean(self, option: str, required: bool = True,
+                    default=None) -> bool:
+        value = self.get(option, required, default)
+        if not isinstance(value, str):
+            return value
+        try:
+            return ConfigParser.BOOLEAN_STATES[value.lower()]
+        except KeyError:
+            raise self._invalid(
+                option, ValueError(f'{value!r} is not a boolean')) from None
+
+    def get_int(self, option: str, required: bool = True, default=None) -> int:
+        value = self.get(option, required, default)
+        if not isinstance(value, str):
+            return value
+        try:
+            return int(value)
+        except ValueError as e:
+            raise self._invalid(option, e) from None
+
+    def get_list(self, option: str, required: bool = True,
+                 default=None) -> list:
+        value = self.get(option, required, default)
+        if not isinstance(value, str):
+            return value
+        try:
+            return literal_eval(value)
+        except (SyntaxError, ValueError) as e:
+            raise self._invalid(option, e) from None
+
+    def rsync_profile(self, name: str) -> tuple:
+        """
+        :return:
+            An ``(add, remove)`` tuple of the lists of rsync options of the
+            named profile.
+
+        :raises MirrmaidRuntimeException:
+            If no such profile is declared or it is invalid.
+        """
+        return self._table.profile(name)
+
+
+class MirrorTable(object):
+    """
+    The mirrors declared within the mirrmaid configuration file, which is
+    parsed just once for all of them.
+
+    A mirror is declared by a section of its own or by a ``'BULK'`` section,
+    which declares a mirror for every combination of the values of its
+    variables.  Either may name a ``'TEMPLATE'`` section, whose settings
+    serve as those of the mirror, after substitution of the variables, unless
+    the mirror's own section overrides them.  The settings of each mirror are
+    only expanded once they are first needed.  A ``'PROFILE'`` section names
+    a set of rsync options that mirrors may add and remove.
+    """
+
+    # Options of a BULK section that are not variables.
+    _BULK_OPTIONS = ['name', 'template']
+    _BULK_PREFIX = 'BULK '
+    _PROFILE_OPTIONS = ['rsync_options_add', 'rsync_options_remove']
+    _PROFILE_PREFIX = 'PROFILE '
+    _RESERVED_SECTIONS = ['DEFAULT', 'MIRRMAID', 'MIRRORS']
+    _TEMPLATE_PREFIX = 'TEMPLATE '
+    # A variable reference within a template, e.g., {release}.
+    _VARIABLE = re.compile(r'{(\w+)}')
+
+    def __init__(self, filename: str, enabled: list):
+        """
+        Initialize the MirrorTable object for the configuration file.
+
+        :param filename:
+            Name of configuration file.
+
+        :param enabled:
+            The names of the enabled mirrors, or glob patterns matching them,
+            in the order they are to be synchronized.
+
+        :raises MirrmaidRuntimeException:
+            If the configuration file cannot be parsed or its templates and
+            bulk declarations are inconsistent.
+        """
+        # The [DEFAULT] section is kept apart, rather than merged into every
+        # other section, so that templates can take precedence over it.
+        # Interpolation is deferred until the settings are expanded.
+        self._raw = ConfigParser(default_section='', interpolation=None)
+        try:
+            with open(filename) as f:
+                self._raw.read_file(f)
+        except (Error, OSError) as e:
+            raise MirrmaidRuntimeException(
+                f'cannot parse {filename!r} because: {e}') from None
+        defaults = {}
+        if self._raw.has_section('DEFAULT'):
+            defaults = dict(self._raw['DEFAULT'])
+        self._expanded = ConfigParser(defaults=defaults)
+        # Maps each mirror's name to a (template, variables) tuple.
+        self._mirrors = {}
+        self._declare()
+        self.enabled = self._enable(enabled)
+
+    def __contains__(self, mirror: str) -> bool:
+        return mirror in self._mirrors
+
+    def __getitem__(self, mirror: str) -> ExpandedMirrorConfig:
+        """
+        :return:
+            The configuration of the named mirror.
+
+        :raises KeyError:
+            If no such mirror is declared.
+        """
+        if mirror not in self._mirrors:
+            raise KeyError(mirror)
+        return ExpandedMirrorConfig(self, mirror)
+
+    def __iter__(self):
+        return iter(self._mirrors)
+
+    def _bulk(self, section: str):
+        """Declare the mirrors of a BULK section."""
+        options = dict(self._raw[section])
+        if 'name' not in options:
+            raise MirrmaidRuntimeException(
+                f'section {section!r} lacks the required setting \'name\'')
+        axes = []
+        for variable, value in options.items():
+            if variable in self._BULK_OPTIONS:
+                continue
+            try:
+                values = literal_eval(value)
+            except (SyntaxError, ValueError):
+                values = value
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            axes.append([(variable, str(v)) for v in values])
+        for combination in product(*axes):
+            variables = dict(combination)
+            mirror = self._substitute(options['name'], variables)
+            if mirror in self._mirrors:
+                raise MirrmaidRuntimeException(
+                    f'section {section!r} declares mirror {mirror!r} again')
+            variables['mirror'] = mirror
+            self._mirrors[mirror] = (options.get('template'), variables)
+
+    def _declare(self):
+        """Declare the mirrors of all sections, in a single pass."""
+        sections = []
+        for section in self._raw.sections():
+            if section.startswith(self._BULK_PREFIX):
+                self._bulk(section)
+            elif not (section in self._RESERVED_SECTIONS
+                      or section.startswith(self._PROFILE_PREFIX)
+                      or section.startswith(self._TEMPLATE_PREFIX)):
+                sections.append(section)
+        # A mirror's own section may refine one declared in bulk.
+        for mirror in sections:
+            template, variables = self._mirrors.get(mirror, (None, {}))
+            own = dict(self._raw[mirror])
+            variables = dict(variables)
+            variables.update(own)
+            variables['mirror'] = mirror
+            self._mirrors[mirror] = (own.get('template', template), variables)
+        for mirror, (template, _) in self._mirrors.items():
+            if template is not None and not self._raw.has_section(
+                    self._TEMPLATE_PREFIX + template):
+                raise MirrmaidRuntimeException(
+                    f'mirror {mirror!r} refers to template {template!r}, '
+                    f'which is not declared')
+
+    def _enable(self, patterns: list) -> list:
+        """
+        :return:
+            The names of the enabled mirrors, in order and without duplicates.
+        """
+        enabled = []
+        for pattern in patterns:
+            if any(c in pattern for c in '*?['):
+                matches = sorted(m for m in self._mirrors
+                                 if fnmatchcase(m, pattern))
+                if not matches:
+                    _log.warning('enabled pattern %r matches no mirrors',
+                                 pattern)
+            elif pattern in self._mirrors:
+                matches = [pattern]
+            else:
+                _log.error('mirror %r is enabled but not declared', pattern)
+                matches = []
+            enabled += [m for m in matches if m not in enabled]
+        return enabled
+
+    def _substitute(self, value: str, variables: dict) -> str:
+        return self._VARIABLE.sub(
+            lambda m: variables.get(m.group(1), m.group(0)),
+            value,
+        )
+
+    def profile(self, name: str) -> tuple:
+        """
+        :return:
+            An ``(add, remove)`` tuple of the lists of rsync options of the
+            named ``'PROFILE'`` section.
+
+        :raises MirrmaidRuntimeException:
+            If no such profile is declared or it is invalid.
+        """
+        section = self._PROFILE_PREFIX + name
+        if not self._raw.has_section(section):
+            raise MirrmaidRuntimeException(
+                f'rsync profile {name!r} is not declared')
+        result = []
+        for option in self._PROFILE_OPTIONS:
+            try:
+                value = literal_eval(self._raw[section].get(option, '[]'))
+            except (SyntaxError, ValueError) as e:
+                value = e
+            if not isinstance(value, list):
+                raise MirrmaidRuntimeException(
+                    f'setting {option!r} of section {section!r} is not '
+                    f'a list')
+            result.append(value)
+        return tuple(result)
+
+    def section(self, mirror: str):
+        """
+        :return:
+            The expanded settings of the named mirror, as a section of
+            a ConfigParser.
+        """
+        if not self._expanded.has_section(mirror):
+            template, variables = self._mirrors[mirror]
+            settings = {}
+            if template is not None:
+                for option, value in self._raw[
+                        self._TEMPLATE_PREFIX + template].items():
+                    settings[option] = self._substitute(value, variables)
+            if self._raw.has_section(mirror):
+                settings.update(self._raw[mirror])
+            self._expanded.read_dict({mirror: settings})
+        return self._expanded[mirror]
+
+    def template(self, mirror: str) -> str:
+        """
+        :return:
+            The name of the template of the named mirror or ``None`` if it has
+            none.
+        """
+        return self._mirrors[mirror][0]
@@ -20,9 +20,160 @@ CONFIG_FILENAME = '/etc/mirrmaid/mirrmaid.conf'
 # Format to be used when logging to console (i.e., when using the '-d' option).
 CONSOLE_FORMATTER = Formatter('%(name)s %(levelname)-8s %(message)s')
 
+# Default weight of a mirror's rsync within its cgroup for the CPU controller
+# or zero for no cgroup CPU control.
+DEFAULT_CGROUP_CPU_WEIGHT = 0
+
+# Default list of I/O limits of a mirror's rsync within its cgroup.  (List
+# necessarily cast as a string here to emulate retrieval from configuration
+# file.)
+DEFAULT_CGROUP_IO_MAX = '[]'
+
+# Default weight of a mirror's rsync within its cgroup for the I/O controller
+# or zero for no cgroup I/O weight.
+DEFAULT_CGROUP_IO_WEIGHT = 0
+
+# Default shared state directory for coordinating mirrmaid nodes or None if
+# this node is not part of a cluster.
+DEFAULT_CLUSTER_DIRECTORY = None
+
+# Default number of seconds a lease on a mirror remains valid unless renewed.
+DEFAULT_CLUSTER_LEASE_TTL = 300
+
+# Default unique name of this node within a cluster or None to use the host
+# name.
+DEFAULT_CLUSTER_NODE = None
+
+# Default number of seconds within which the nodes with a heartbeat count
+# toward the fair share of a cycle.
+DEFAULT_CLUSTER_NODE_WINDOW = 3600
+
+# Default state of the cross-mirror content deduplication feature.
+DEFAULT_DEDUP = False
+
+# Default minimum size, in bytes, of files to be deduplicated.
+DEFAULT_DEDUP_MIN_SIZE = 1024 * 1024
+
+# Default number of files to be hashed concurrently for deduplication.
+DEFAULT_DEDUP_WORKERS = 4
+
+# Default state of the deferred deletion of a mirror's files.
+DEFAULT_DEFERRED_DELETE = False
+
+# Default upstream file list that enables incremental synchronization of
+# a mirror or None for none.
+DEFAULT_FILE_LIST = None
+
+# Default format of the upstream file list.
+DEFAULT_FILE_LIST_FORMAT = 'fedora'
+
+# Default number of incremental runs of a mirror between full runs.
+DEFAULT_FULL_SYNC_INTERVAL = 10
+
+# Default number of days within which a target filesystem forecast to be
+# full is warned of or zero for no warnings.
+DEFAULT_FORECAST_DAYS = 14
+
+# Default number of days of the run journal considered by history queries.
+DEFAULT_HISTORY_DAYS = 30
+
+# Default state of the run journal feature.
+DEFAULT_JOURNAL = True
+
+# Default I/O scheduling class of a mirror's rsync.
+DEFAULT_IONICE_CLASS = 'none'
+
+# Default I/O scheduling priority of a mirror's rsync, within its class.
+DEFAULT_IONICE_PRIORITY = 4
+
+# Default number of concurrent rsync dry-runs for the planner.
+DEFAULT_PLAN_WORKERS = 8
+
+# Default limit, in seconds, on the duration of a mirror's synchronization or
+# zero for no limit.
+DEFAULT_MAX_RUNTIME = 0
+
+# Default number of post-synchronization hook workers.
+DEFAULT_MAX_HOOK_WORKERS = 1
+
 # Default number of synchronization workers (rsync threads).
 DEFAULT_MAX_WORKERS = 2
 
+# Default list of rsync patterns matching package repository metadata, for
+# staged synchronization.  (List necessarily cast as a string here to emulate
+# retrieval from configuration file.)
+DEFAULT_METADATA = (
+    '["repodata/***", "Release", "Release.gpg", "InRelease", "Packages*", '
+    '"Sources*", "Contents-*", "Translation-*", "by-hash/***"]'
+)
+
+# Default niceness adjustment of a mirror's rsync.
+DEFAULT_NICE = 0
+
+# Default list of post-synchronization hook commands for a mirror.  (List
+# necessarily cast as a string here to emulate retrieval from configuration
+# file.)
+DEFAULT_POST_SYNC = '[]'
+
+# Default time limit, in seconds, for each post-synchronization hook command or
+# zero for no limit.
+DEFAULT_POST_SYNC_TIMEOUT = 0
+
+# Default state of the pre-flight check of all mirrors before a cycle.
+DEFAULT_PREFLIGHT = True
+
+# Default time limit, in seconds, on the upstream reachability probe of each
+# mirror's pre-flight check.
+DEFAULT_PREFLIGHT_TIMEOUT = 30
+
+# Default number of mirrors checked concurrently by the pre-flight check.
+DEFAULT_PREFLIGHT_WORKERS = 8
+
+# Default number of seconds to pause after each batch of files purged from
+# the trash directories.
+DEFAULT_PURGE_BATCH_PAUSE = 1
+
+# Default number of files purged from the trash directories per batch.
+DEFAULT_PURGE_BATCH_SIZE = 1000
+
+# Default daily window of time, in 'HH:MM-HH:MM' format, within which the
+# trash directories may be purged or None for no limit.
+DEFAULT_PURGE_WINDOW = None
+
+# Default list of reporters to receive the outcome and phase timings of each
+# synchronization.  (List necessarily cast as a string here to emulate
+# retrieval from configuration file.)
+DEFAULT_REPORTERS = '["log"]'
+
+# Default lists of rsync options to be added to and removed from those of
+# a mirror or its profiles.  (Lists necessarily cast as strings here to emulate
+# retrieval from configuration file.)
+DEFAULT_RSYNC_OPTIONS_ADD = '[]'
+DEFAULT_RSYNC_OPTIONS_REMOVE = '[]'
+
+# Default list of the names of the rsync profiles of a mirror.  (List
+# necessarily cast as a string here to emulate retrieval from configuration
+# file.)
+DEFAULT_RSYNC_PROFILES = '[]'
+
+# Default manner of collecting log records centrally.
+DEFAULT_LOG_COLLECTOR = 'none'
+
+# Default manner of estimating the bytes a mirror will receive for the
+# pre-flight space check.
+DEFAULT_SPACE_CHECK = 'history'
+
+# Default bytes to be kept free on a target filesystem beyond those a mirror
+# will receive.
+DEFAULT_SPACE_RESERVE = 0
+
+# Default time limit, in seconds, on the inactivity of a mirror's rsync or
+# zero for no limit.
+DEFAULT_STALL_TIMEOUT = 0
+
+# Default state of the staged synchronization feature for a mirror.
+DEFAULT_STAGED = False
+
 # Default rsync proxy to use in 'HOST:PORT' format or None if no proxy is
 # required.
 DEFAULT_PROXY = None
@@ -44,6 +195,39 @@ DEFAULT_SUMMARY_RECIPIENTS = '["root"]'
 # Default threshold to force premature sending of operations summary.
 DEFAULT_SUMMARY_SIZE = 20000
 
+# Default trash directory of a mirror or None for a hidden sibling of its
+# target.
+DEFAULT_TRASH_DIRECTORY = None
+
+# Default number of files to be hashed concurrently for verification.
+DEFAULT_VERIFY_WORKERS = 4
+
+# Default interval, in seconds, at which 'mirrmaid watch' checks for triggers.
+DEFAULT_WATCH_INTERVAL = 5
+
+# Default level of the log records that a worker process forwards to the
+# manager, when workers are run as processes, beyond the levels of the
+# loggers themselves.
+DEFAULT_WORKER_LOG_LEVEL = 'NOTSET'
+
+# Default manner in which synchronization workers are run.
+DEFAULT_WORKER_MODE = 'thread'
+
+# Where the cgroup (v2) filesystem is mounted.
+CGROUP_FS = '/sys/fs/cgroup'
+
+# Where mirrmaid will persist its index of files for content deduplication.
+DEDUP_INDEX = '/var/lib/mirrmaid/dedup.sqlite'
+
+# Where mirrmaid will persist the state of incremental synchronization.
+INCREMENTAL_DIRECTORY = '/var/lib/mirrmaid/incremental'
+
+# Where mirrmaid will persist its journal of synchronization runs.
+JOURNAL_FILENAME = '/var/lib/mirrmaid/journal.sqlite'
+
+# Where mirrmaid will cache the compiled filter rules of each mirror.
+FILTER_DIRECTORY = '/var/lib/mirrmaid/filters'
+
 # The default run-time configuration file.
 LOGGING_CONFIG_FILENAME = '/etc/mirrmaid/logging.yaml'
 
@@ -53,9 +237,25 @@ LOGGING_FORMATTER = Formatter(
     '%(asctime)s %(name)s[%(process)d] %(levelname)-8s %(message)s'
 )
 
+# Where the ionice executable can be found.
+IONICE = '/usr/bin/ionice'
+
+# Where mirrmaid will spool outgoing mail until it is delivered.
+MAIL_SPOOL = '/var/lib/mirrmaid/mail_spool'
+
+# Where the nice executable can be found.
+NICE = '/usr/bin/nice'
+
 # Where run-time advisory lock files are created.
 LOCK_DIRECTORY = '/run/lock/mirrmaid/'
 
+# The manners in which log records may be collected centrally.
+LOG_COLLECTORS = ['none', 'queue', 'socket']
+
+# The local socket on which the log collector of overlapping mirrmaid
+# processes listens.
+LOG_SOCKET = '/run/lock/mirrmaid/.log-collector'
+
 # Where mirrmaid will persist internal data regarding the state of its
 # logging and operations summary features.
 LOG_STATE = '/var/lib/mirrmaid/log_state'
@@ -66,11 +266,26 @@ RSYNC = '/usr/bin/rsync'
 # Name of environment variable used to configure rsync for proxy usage.
 RSYNC_PROXY = 'RSYNC_PROXY'
 
+# Where mirrmaid queues the files of each mirror to be fetched again.
+REFETCH_DIRECTORY = '/var/lib/mirrmaid/refetch'
+
+# Where the POSIX shell can be found.
+SH = '/bin/sh'
+
 # mirrmaid will drop (root) privileges, if necessary, to the following at
 # startup.
 RUNTIME_GROUP = 'mirrmaid'
 RUNTIME_USER = 'mirrmaid'
 
+# Where requests for the immediate synchronization of mirrors are dropped.
+TRIGGER_DIRECTORY = '/var/lib/mirrmaid/triggers'
+
+# Where mirrmaid will persist the state of the verification of the mirrors.
+VERIFY_STATE = '/var/lib/mirrmaid/verify.sqlite'
+
+# The manners in which synchronization workers may be run.
+WORKER_MODES = ['thread', 'process', 'asyncio']
+
 # The operations summary log file, which captures only messages at level
 # ERROR or higher.
 SUMMARY_FILENAME = '/var/log/mirrmaid/summary'
@@ -0,0 +1,336 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements cross-mirror content deduplication.  Files having
+identical content, size, mode and modification time within the targets of
+different mirrors (on the same filesystem) are replaced with hard-links to a
+single copy.
+
+A persistent index records the identity and content hash of each file so that
+only new or changed files need to be hashed on subsequent runs.
+"""
+
+import logging
+import os
+import sqlite3
+import stat
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from doubledog.lock import LockException, LockFile
+
+from mirrmaid.constants import *
+from mirrmaid.hashing import file_digest
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.dedup')
+
+# Suffix given to the temporary hard-link that atomically replaces a duplicate.
+LINK_SUFFIX = '.mirrmaid-dedup'
+
+# Number of files hashed or awaiting hashing, per worker.
+_WINDOW_PER_WORKER = 4
+
+
+class DedupIndex(object):
+    """
+    A persistent index of the files within the mirror targets.
+
+    Each file is identified by its path and is recorded with the attributes
+    necessary to tell if it has changed since it was last hashed.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path        TEXT PRIMARY KEY,
+            device      INTEGER NOT NULL,
+            inode       INTEGER NOT NULL,
+            size        INTEGER NOT NULL,
+            mode        INTEGER NOT NULL,
+            mtime_ns    INTEGER NOT NULL,
+            digest      TEXT NOT NULL,
+            scan        INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS files_by_content
+            ON files (size, digest);
+        CREATE TABLE IF NOT EXISTS roots (
+            path        TEXT PRIMARY KEY,
+            scanned     REAL NOT NULL
+        );
+    """
+
+    def __init__(self, filename: str = DEDUP_INDEX):
+        """
+        Initialize the DedupIndex object, creating it as necessary.
+
+        :param filename:
+            Name of the SQLite database that holds the index.
+        """
+        self.filename = filename
+        self._db = sqlite3.connect(filename)
+        self._db.executescript(self.SCHEMA)
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def forget_missing(self, root: str, scan: int):
+        """
+        Discard all files beneath *root* that were not seen during *scan*.
+        """
+        self._db.execute(
+            'DELETE FROM files WHERE path >= ? AND path < ? AND scan != ?',
+            (root, root + '\uffff', scan)
+        )
+
+    def lookup(self, path: str):
+        """
+        :return:
+            The ``(device, inode, size, mode, mtime_ns, digest)`` tuple
+            recorded for *path* or ``None`` if *path* is not indexed.
+        """
+        return self._db.execute(
+            'SELECT device, inode, size, mode, mtime_ns, digest '
+            'FROM files WHERE path = ?',
+            (path,)
+        ).fetchone()
+
+    def matches(self, st: os.stat_result, digest: str, path: str) -> list:
+        """
+        :return:
+            A list of the paths of files that are content-identical to the one
+            described by *st* and *digest*, that could be hard-linked with it
+            and are not already.
+        """
+        return [row[0] for row in self._db.execute(
+            'SELECT path FROM files '
+            'WHERE size = ? AND digest = ? AND device = ? AND inode != ? '
+            'AND mode = ? AND mtime_ns = ? AND path != ? '
+            'ORDER BY rowid',
+            (st.st_size, digest, st.st_dev, st.st_ino,
+             stat.S_IMODE(st.st_mode), st.st_mtime_ns, path)
+        )]
+
+    def record(self, path: str, st: os.stat_result, digest: str, scan: int):
+        """Add or replace the entry for *path*."""
+        self._db.execute(
+            'INSERT OR REPLACE INTO files '
+            '(path, device, inode, size, mode, mtime_ns, digest, scan) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (path, st.st_dev, st.st_ino, st.st_size, stat.S_IMODE(st.st_mode),
+             st.st_mtime_ns, digest, scan)
+        )
+
+    def scanned(self, root: str) -> bool:
+        """
+        :return:
+            ``True`` iff *root* has ever been fully scanned.
+        """
+        return self._db.execute(
+            'SELECT 1 FROM roots WHERE path = ?', (root,)
+        ).fetchone() is not None
+
+    def set_scanned(self, root: str):
+        self._db.execute(
+            'INSERT OR REPLACE INTO roots (path, scanned) VALUES (?, ?)',
+            (root, time())
+        )
+        self._db.commit()
+
+    def touch(self, path: str, scan: int):
+        """Mark *path* as having been seen, unchanged, during *scan*."""
+        self._db.execute('UPDATE files SET scan = ? WHERE path = ?',
+                         (scan, path))
+
+
+class Deduplicator(object):
+    """
+    Replaces content-identical files across mirror targets with hard-links.
+
+    Only the targets that may have changed (i.e., those just synchronized or
+    never before scanned) are walked.  Within those, only files whose identity
+    differs from what was indexed are hashed, which is done concurrently.
+    """
+
+    def __init__(self, index: DedupIndex, workers: int, min_size: int):
+        """
+        Initialize the Deduplicator object.
+
+        :param index:
+            The persistent index of previously hashed files.
+
+        :param workers:
+            Number of files that may be hashed concurrently.
+
+        :param min_size:
+            Files smaller than this (in bytes) are ignored.
+        """
+        self.index = index
+        self.workers = workers
+        self.min_size = min_size
+        self.scan = int(time())
+        self.linked = 0
+        self.saved = 0
+
+    def _candidates(self, root: str):
+        """
+        Walk *root*, yielding the path and stat of every regular file that
+        has changed since it was indexed.
+        """
+        pending = [root]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                _log.warning('cannot scan %r because: %s', directory, e)
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if st.st_size < self.min_size:
+                    continue
+                known = self.index.lookup(entry.path)
+                if known and known[:5] == (
+                        st.st_dev, st.st_ino, st.st_size,
+                        stat.S_IMODE(st.st_mode), st.st_mtime_ns):
+                    self.index.touch(entry.path, self.scan)
+                else:
+                    yield entry.path, st
+
+    @staticmethod
+    def _identity(st: os.stat_result) -> tuple:
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+    @staticmethod
+    def _hash(candidate):
+        path, st = candidate
+        try:
+            return path, st, file_digest(path)
+        except OSError as e:
+            _log.warning('cannot hash %r because: %s', path, e)
+            return path, st, None
+
+    def _link(self, path: str, st: os.stat_result, digest: str) -> bool:
+        """
+        Replace *path* with a hard-link to an identical, indexed file.
+
+        :return:
+            ``True`` iff *path* was replaced.
+        """
+        for original in self.index.matches(st, digest, path):
+            known = self.index.lookup(original)
+            try:
+                current = os.stat(original, follow_symlinks=False)
+            except OSError:
+                continue
+            if self._identity(current) != (known[0], known[1], known[2],
+                                           known[4]):
+                # Changed since indexed; not to be trusted.
+                continue
+            temporary = path + LINK_SUFFIX
+            try:
+                os.link(original, temporary)
+                if (self._identity(os.stat(temporary, follow_symlinks=False))
+                        != self._identity(current)):
+                    # The original was replaced meanwhile.
+                    os.unlink(temporary)
+                    continue
+                # The file may have been updated since it was hashed, maybe
+                # minutes ago, and that update must not be undone.
+                if (self._identity(os.stat(path, follow_symlinks=False))
+                        != self._identity(st)):
+                    _log.debug('not linking %r since it changed', path)
+                    os.unlink(temporary)
+                    return False
+                os.replace(temporary, path)
+            except OSError as e:
+                _log.warning('cannot link %r to %r because: %s',
+                             path, original, e)
+                try:
+                    os.unlink(temporary)
+                except OSError:
+                    pass
+                return False
+            _log.debug('linked %r to %r', path, original)
+            self.index.record(path, current, digest, self.scan)
+            self.linked += 1
+            if st.st_nlink == 1:
+                self.saved += st.st_size
+            return True
+        return False
+
+    def _hashed(self, executor: ThreadPoolExecutor, candidates):
+        """
+        Hash the *candidates* concurrently, yet with only a bounded number
+        of them hashed or awaiting hashing at any time.
+
+        :return:
+            A generator of ``(path, stat, digest)`` tuples in the order of
+            the *candidates*.
+        """
+        window = self.workers * _WINDOW_PER_WORKER
+        pending = deque()
+        for candidate in candidates:
+            pending.append(executor.submit(self._hash, candidate))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _dedup_root(self, root: str):
+        root = os.path.join(os.path.realpath(root), '')
+        _log.info('deduplicating %r', root)
+        with ThreadPoolExecutor(self.workers) as executor:
+            for path, st, digest in self._hashed(executor,
+                                                 self._candidates(root)):
+                if digest is None:
+                    continue
+                self.index.record(path, st, digest, self.scan)
+                self._link(path, st, digest)
+        self.index.forget_missing(root, self.scan)
+        self.index.set_scanned(root)
+
+    def run(self, roots: list):
+        """
+        Deduplicate the files within *roots* against all indexed files.
+
+        Each mirror is locked while its target is deduplicated, just as while
+        it is synchronized, so that neither undoes the other's work.  A mirror
+        that is already locked is skipped.
+
+        :param roots:
+            A list of ``(mirror, target)`` tuples for the mirrors whose
+            targets may have changed since last indexed.
+        """
+        for mirror, root in roots:
+            lock = LockFile(os.path.join(LOCK_DIRECTORY, mirror),
+                            pid=os.getpid())
+            try:
+                lock.exclusive_lock()
+            except LockException:
+                _log.info('not deduplicating mirror %r since it is locked by '
+                          'another process', mirror)
+                continue
+            try:
+                self._dedup_root(root)
+            finally:
+                lock.unlock(delete_file=True)
+        _log.info('deduplication replaced %d files with hard-links, '
+                  'freeing %d bytes', self.linked, self.saved)
@@ -0,0 +1,313 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the asyncio-based worker mode, in which a single event
+loop spawns every rsync process, reads all of their output and handles
+scheduling, timeouts and signals.  This avoids the thread per mirror (plus
+the reader threads per rsync) of the default worker mode, making dozens of
+concurrent mirrors cheap.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+from asyncio.subprocess import PIPE
+
+from mirrmaid.exceptions import SignalException, SynchronizerException
+from mirrmaid.reporting import RunReport
+from mirrmaid.synchronizer import STOP_TIMEOUT, Synchronizer
+from mirrmaid.timing import (
+    LOCK_WAIT, RsyncPhaseTracker, SPAWN, UNLOCK, verbose,
+)
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.engine')
+
+# Maximum number of bytes taken from an rsync pipe per read.
+READ_SIZE = 256 * 1024
+
+# The signals that bring about a graceful shutdown.
+SIGNALS = [signal.SIGHUP, signal.SIGINT, signal.SIGQUIT, signal.SIGTERM]
+
+
+async def _drain(stream: asyncio.StreamReader, consume):
+    """
+    Pass each line read from *stream* to *consume* until end-of-file.
+
+    Reads are large and split into lines here rather than reading line by
+    line, which keeps the number of loop iterations low for verbose output.
+    """
+    pending = b''
+    while True:
+        chunk = await stream.read(READ_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            consume(line.decode(errors='replace'))
+    if pending:
+        consume(pending.decode(errors='replace'))
+
+
+class AsyncSynchronizer(Synchronizer):
+    """
+    A Synchronizer that runs as a task of the AsyncEngine's event loop
+    rather than as a thread of its own.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._active = False
+        self._loop = None
+        self._process = None
+
+    async def _update_replica_async(self) -> int:
+        """
+        Effect a one-time synchronization.
+
+        This is the equivalent of ``_update_replica`` for the event loop.
+
+        :return:
+            The exit code of the rsync process, where only a value of zero
+            indicates success.
+        """
+        self._watchdog.enforce()
+        self.log.info('mirror synchronization started')
+        cmd = self._resources.prefix + self.rsync_command
+        self.log.debug('spawning %r', cmd)
+        self.log.debug('AKA      %s', ' '.join(cmd))
+        self._timer.mark()
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=PIPE, stderr=PIPE)
+        except OSError as e:
+            raise SynchronizerException(
+                f'cannot spawn rsync because: {e}') from None
+        self._timer.attribute(SPAWN)
+        self.log.info('rsync pid=%r', self._process.pid)
+        self._watchdog.watch(self._process.pid)
+        tracker = RsyncPhaseTracker(self._timer, verbose(self._rsync_options))
+        await asyncio.gather(
+            _drain(self._process.stdout, self._output_collector(tracker)),
+            _drain(self._process.stderr, self._error_collector()),
+        )
+        exit_code = await self._process.wait()
+        self._watchdog.watch(None)
+        tracker.finish()
+        self._log_exit_code(exit_code)
+        return exit_code
+
+    async def _blocking(self, function, *args):
+        """
+        Call a *function* that blocks (e.g., on a subprocess, a lock or disk
+        I/O) within the loop's executor so that it does not hold the loop.
+
+        :return:
+            The result of the *function*.
+        """
+        return await self._loop.run_in_executor(None, function, *args)
+
+    def is_alive(self) -> bool:
+        return self._active
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    def _kill(self):
+        if self.is_running:
+            self.log.info('killing %s', self)
+            try:
+                self._process.kill()
+            except ProcessLookupError:
+                pass
+
+    def _stop_by_watchdog(self):
+        self._loop.call_soon_threadsafe(self.stop)
+
+    async def run_async(self, slots: asyncio.Semaphore):
+        """
+        Acquire a lock and if successful, update the target replica.
+
+        :param slots:
+            The semaphore, already acquired on behalf of this Synchronizer,
+            limiting the number of concurrent rsync processes.  It is
+            released once rsync concludes so that any post-sync hooks do not
+            occupy it.
+        """
+        self._active = True
+        self._loop = asyncio.get_event_loop()
+        released = False
+        try:
+            self.log.info('starting task')
+            self.report = RunReport(self.mirror_conf.mirror_name,
+                                    self._source_uri, self._target_uri,
+                                    self.dry_run)
+            self._timer.mark()
+            locked = self._lock_replica()
+            self._timer.attribute(LOCK_WAIT)
+            if locked:
+                try:
+                    # The dry-run estimate of the space check blocks.
+                    permitted = await self._blocking(self._space_permits)
+                    self.deferred = not permitted
+                    stages = []
+                    if not self.deferred:
+                        self._watchdog.start()
+                        # Creating the cgroup writes to the cgroup filesystem.
+                        await self._blocking(self._resources.prepare)
+                        self._prepare_trash()
+                        # Fetching the upstream file list blocks.
+                        await self._blocking(self._prepare_incremental)
+                        await self._blocking(self._prepare_refetch)
+                        stages = self._stages
+                        for stage in stages:
+                            self._begin_stage(stage)
+                            self.exit_code = await self._update_replica_async()
+                            self._end_stage()
+                            if (self.exit_code != os.EX_OK
+                                    or self._watchdog.verdict):
+                                break
+                        # Concluding writes the index of the file list.
+                        await self._blocking(self._conclude_incremental)
+                        await self._blocking(self._conclude_refetch)
+                    slots.release()
+                    released = True
+                    if self.exit_code == os.EX_OK and stages:
+                        # The HookPool blocks, so it must not hold the loop.
+                        await self._blocking(self._run_post_sync_hooks)
+                except SynchronizerException as e:
+                    self.log.error('mirror synchronization failed because: %s',
+                                   e)
+                finally:
+                    # Cancelling joins the watchdog's thread.
+                    await self._blocking(self._watchdog.cancel)
+                    await self._blocking(self._resources.release)
+                    self._timer.mark()
+                    self._unlock_replica()
+                    self._timer.attribute(UNLOCK)
+            # Reporters write to the journal, leases, etc.
+            await self._blocking(self._report, locked)
+        finally:
+            if not released:
+                slots.release()
+            self._active = False
+
+    def stop(self):
+        """
+        Begin termination of the rsync subprocess, killing it if it has not
+        ended within STOP_TIMEOUT seconds.
+        """
+        if not self.is_running:
+            return
+        self.log.info('stopping %s', self)
+        try:
+            self._process.terminate()
+        except ProcessLookupError:
+            return
+        asyncio.get_event_loop().call_later(STOP_TIMEOUT, self._kill)
+
+
+class AsyncEngine(object):
+    """
+    Runs AsyncSynchronizers as the tasks of a single event loop, no more
+    than *max_workers* of which may have rsync running at once.
+    """
+
+    def __init__(self, factory, max_workers: int, hook_pool=None):
+        """
+        Initialize the AsyncEngine object.
+
+        :param factory:
+            A function that returns a new AsyncSynchronizer given the name of
+            a mirror.
+
+        :param max_workers:
+            Maximum number of rsync processes to be run concurrently.
+
+        :param hook_pool:
+            The HookPool used by the AsyncSynchronizers, if any, which is to
+            be stopped upon a signal.
+        """
+        self.factory = factory
+        self.max_workers = max_workers
+        self.hook_pool = hook_pool
+        self.signalled = None
+        self.workers = []
+
+    async def _main(self, mirrors, on_start):
+        loop = asyncio.get_event_loop()
+        slots = asyncio.Semaphore(self.max_workers)
+        mirrors = iter(mirrors)
+        tasks = {}
+        while self.signalled is None:
+            await slots.acquire()
+            # Only take the next mirror once it can be started, since that may
+            # claim it on behalf of this node.
+            mirror = None if self.signalled else next(mirrors, None)
+            if mirror is None:
+                slots.release()
+                break
+            _log.debug('processing mirror: %r', mirror)
+            worker = self.factory(mirror)
+            self.workers.append(worker)
+            tasks[loop.create_task(worker.run_async(slots))] = worker
+            if on_start:
+                on_start(mirror, worker)
+        if tasks:
+            await asyncio.wait(list(tasks))
+        for task, worker in tasks.items():
+            if task.exception():
+                _log.error('mirror %r failed unexpectedly', worker.name,
+                           exc_info=task.exception())
+
+    def _signal_handler(self, signal_):
+        """React to signals to bring about graceful shutdown of workers."""
+        _log.debug('caught signal %r; halting all workers', signal_)
+        self.signalled = signal_
+        for worker in self.workers:
+            worker.stop()
+        if self.hook_pool:
+            self.hook_pool.stop()
+
+    def run(self, mirrors, on_start=None):
+        """
+        Synchronize mirrors until all have concluded.
+
+        :param mirrors:
+            An iterable of the names of the mirrors to be synchronized.  The
+            next name is taken only once a worker is available for it.
+
+        :param on_start:
+            A function that is to be called with the name of each mirror and
+            its AsyncSynchronizer once the latter has started.
+
+        :raises SignalException:
+            If the run was cut short by a signal.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        previous = {signal_: signal.getsignal(signal_) for signal_ in SIGNALS}
+        for signal_ in SIGNALS:
+            _log.debug('setting trap for signal %r', signal_)
+            loop.add_signal_handler(signal_, self._signal_handler, signal_)
+        try:
+            loop.run_until_complete(self._main(mirrors, on_start))
+        finally:
+            for signal_, handler in previous.items():
+                loop.remove_signal_handler(signal_)
+                signal.signal(signal_, handler)
+            loop.close()
+        if self.signalled is not None:
+            _log.debug('all workers stopped or killed; shutting down')
+            raise SignalException(f'caught signal {self.signalled!r}')
@@ -0,0 +1,251 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the compact, cached index of an upstream file list.
+
+Upstream trees of millions of files would make for dictionaries of millions of
+strings, so instead the index is a file of fixed-size records, sorted by path,
+followed by the paths themselves.  It is memory-mapped rather than read, thus
+costing only the pages touched, and two indexes are compared by merging them
+in a single pass.
+
+Neither is the file list sorted in memory as a whole while the index is
+written; it is sorted in runs of bounded length, which are then merged.
+"""
+
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# magic, number of records and the size and time of modification of the file
+# list from which the index was built
+_HEADER = struct.Struct('<8sQqq')
+_MAGIC = b'MMFLIDX1'
+# offset and length of the path, size and time of modification
+_RECORD = struct.Struct('<QQqq')
+
+# The number of entries of a file list sorted in memory at once.
+_RUN_LENGTH = 100000
+# length of the path, size and time of modification of an entry in a run
+_RUN_RECORD = struct.Struct('<Iqq')
+
+# The value of a size or time of modification that a file list lacks.
+UNKNOWN = -1
+
+
+def _spill(run: list, directory: str):
+    """
+    :return:
+        A temporary file within *directory* holding the *run* of entries,
+        sorted and ready to be read back.
+    """
+    f = tempfile.TemporaryFile(dir=directory)
+    # Timsort makes light work of a run that is already (nearly) sorted, as
+    # upstream file lists usually are.
+    for path, size, mtime in sorted(run):
+        f.write(_RUN_RECORD.pack(len(path), size, mtime))
+        f.write(path)
+    f.seek(0)
+    return f
+
+
+def _unspill(f):
+    """Read back the entries spilled to *f*."""
+    while True:
+        header = f.read(_RUN_RECORD.size)
+        if not header:
+            break
+        length, size, mtime = _RUN_RECORD.unpack(header)
+        yield f.read(length), size, mtime
+
+
+def _sorted(entries, directory: str):
+    """
+    Sort the *entries* of a file list by path, holding no more than
+    _RUN_LENGTH of them in memory at once.
+
+    :return:
+        A generator of ``(path, size, mtime)`` tuples, where *path* is in
+        bytes.
+    """
+    runs = []
+    try:
+        run = []
+        for path, size, mtime in entries:
+            run.append((path.encode('utf-8', 'surrogateescape'), size, mtime))
+            if len(run) == _RUN_LENGTH:
+                runs.append(_spill(run, directory))
+                run = []
+        if not runs:
+            yield from sorted(run)
+            return
+        if run:
+            runs.append(_spill(run, directory))
+            run = []
+        yield from heapq.merge(*[_unspill(f) for f in runs])
+    finally:
+        for f in runs:
+            f.close()
+
+
+class FileListIndex(object):
+    """
+    A read-only, memory-mapped index of a file list, mapping each path to its
+    size and time of modification.
+    """
+
+    def __init__(self, filename: str):
+        """
+        Initialize the FileListIndex object.
+
+        :param filename:
+            Name of the index, as written by :func:`write_index`.
+
+        :raises OSError:
+            If the index cannot be opened.
+
+        :raises ValueError:
+            If the file is not an index.
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.count, self.source_size, self.source_mtime = (
+                _HEADER.unpack_from(self._map, 0))
+        except struct.error:
+            magic = None
+        if magic != _MAGIC:
+            self._map.close()
+            raise ValueError(f'{filename!r} is not a file list index')
+        self._paths = _HEADER.size + self.count * _RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __iter__(self):
+        """
+        :return:
+            An iterator of ``(path, size, mtime)`` tuples, sorted by path,
+            where *path* is in bytes.
+        """
+        for i in range(self.count):
+            yield self[i]
+
+    def __getitem__(self, i: int) -> tuple:
+        offset, length, size, mtime = _RECORD.unpack_from(
+            self._map, _HEADER.size + i * _RECORD.size)
+        start = self._paths + offset
+        return self._map[start:start + length], size, mtime
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._map.close()
+
+    def find(self, path: bytes) -> tuple:
+        """
+        :return:
+            The ``(size, mtime)`` tuple of the *path* or ``None`` if it is
+            not listed.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle][0] < path:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            found, size, mtime = self[low]
+            if found == path:
+                return size, mtime
+        return None
+
+    def describes(self, filename: str) -> bool:
+        """
+        :return:
+            ``True`` iff the index was built from the file list *filename* as
+            it is now, judging by its size and time of modification.
+        """
+        st = os.stat(filename)
+        return (st.st_size, int(st.st_mtime)) == (self.source_size,
+                                                  self.source_mtime)
+
+
+def write_index(filename: str, entries, source: str):
+    """
+    Write an index, replacing any existing one atomically.
+
+    :param filename:
+        Name of the index to be written.
+
+    :param entries:
+        An iterable of ``(path, size, mtime)`` tuples in any order, where
+        *path* is a string.  Either number may be :data:`UNKNOWN`.
+
+    :param source:
+        Name of the file list from which the *entries* were read.
+    """
+    st = os.stat(source)
+    directory = os.path.dirname(os.path.abspath(filename))
+    temporary = f'{filename}.{os.getpid()}'
+    # The records precede the paths, so the paths are set aside until all of
+    # the records have been written.
+    with open(temporary, 'wb') as f, \
+            tempfile.TemporaryFile(dir=directory) as paths:
+        f.write(_HEADER.pack(_MAGIC, 0, st.st_size, int(st.st_mtime)))
+        count = offset = 0
+        for path, size, mtime in _sorted(entries, directory):
+            f.write(_RECORD.pack(offset, len(path), size, mtime))
+            paths.write(path)
+            count += 1
+            offset += len(path)
+        paths.seek(0)
+        shutil.copyfileobj(paths, f)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, count, st.st_size, int(st.st_mtime)))
+    os.replace(temporary, filename)
+
+
+def changes(previous: FileListIndex, current: FileListIndex):
+    """
+    Compare two indexes by merging them in a single pass.
+
+    :return:
+        A generator of ``(path, deleted)`` tuples, sorted by path, for each
+        path that is new or changed (*deleted* being ``False``) or gone
+        (*deleted* being ``True``) in the *current* index.
+    """
+    old = iter(previous)
+    new = iter(current)
+    a = next(old, None)
+    b = next(new, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a[0] < b[0]):
+            yield a[0], True
+            a = next(old, None)
+        elif a is None or b[0] < a[0]:
+            yield b[0], False
+            b = next(new, None)
+        else:
+            if a[1:] != b[1:]:
+                yield b[0], False
+            a = next(old, None)
+            b = next(new, None)
@@ -0,0 +1,50 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements efficient content hashing of (potentially very large)
+mirrored files.
+"""
+
+import hashlib
+import mmap
+import os
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# Size, in bytes, of each chunk fed to the hash algorithm.
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def file_digest(path: str, algorithm: str = 'sha256') -> str:
+    """
+    Compute the digest of a file's content.
+
+    The file is memory-mapped and hashed in large chunks, which is far cheaper
+    than many small reads and allows hashlib to release the GIL so that
+    multiple files may be hashed concurrently by threads.
+
+    :param path:
+        Name of the file to be hashed.
+
+    :param algorithm:
+        Name of any algorithm supported by :mod:`hashlib`.
+
+    :return:
+        The hexadecimal digest of the file's content.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for offset in range(0, size, CHUNK_SIZE):
+                digest.update(m[offset:offset + CHUNK_SIZE])
+    return digest.hexdigest()
@@ -0,0 +1,177 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the post-synchronization hook pipeline, which runs
+mirror-specific commands (e.g., metadata regeneration, cache purges) once
+a mirror has been successfully synchronized.
+
+Hooks are run within a bounded pool that is distinct from the pool of rsync
+workers so that slow hooks do not deprive other mirrors of synchronization.
+"""
+
+import errno
+import os
+import shlex
+from collections import namedtuple
+from subprocess import PIPE, STDOUT, Popen
+from threading import BoundedSemaphore, Lock, Timer
+from time import monotonic
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# Conventional exit code for a command that could not be executed.
+EX_NOEXEC = 127
+
+HookResult = namedtuple('HookResult', 'command exit_code elapsed')
+HookResult.__doc__ = """
+The outcome of a single post-synchronization hook command.
+
+*command* is the command as configured, *exit_code* is that of the hook
+process (negative if terminated by a signal) and *elapsed* is the wall-clock
+duration of the hook, in seconds.
+"""
+
+
+class HookPool(object):
+    """
+    A bounded pool of slots in which post-synchronization hooks may run.
+
+    One HookPool is shared by all Synchronizers of a MirrorManager.  Each
+    mirror's hooks occupy a single slot and are run sequentially, in the order
+    configured, until one fails.
+    """
+
+    def __init__(self, size: int, semaphore=None):
+        """
+        Initialize the HookPool object.
+
+        :param size:
+            Maximum number of mirrors whose hooks may be running concurrently.
+
+        :param semaphore:
+            An alternative semaphore implementation to limit concurrency.  If
+            omitted, a ``threading.BoundedSemaphore`` of *size* is used.
+        """
+        self.size = size
+        self._slots = semaphore or BoundedSemaphore(size)
+        self._processes = set()
+        self._processes_lock = Lock()
+        self._stopped = False
+
+    def __getstate__(self) -> dict:
+        # Only the slots are shared with a child process, which requires
+        # that they be a multiprocessing semaphore.
+        return {'size': self.size, 'semaphore': self._slots}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state['size'], state['semaphore'])
+
+    @staticmethod
+    def _halt(method):
+        try:
+            method()
+        except OSError as e:
+            if e.errno != errno.ESRCH:  # no such process
+                raise
+
+    def _run_one(self, log, command: str, env: dict,
+                 timeout: int) -> HookResult:
+        started = monotonic()
+        log.info('post-sync hook %r started', command)
+        try:
+            process = Popen(shlex.split(command), env=env, stdout=PIPE,
+                            stderr=STDOUT, universal_newlines=True)
+        except (OSError, ValueError) as e:
+            log.error('post-sync hook %r could not be started because:\n%s',
+                      command, e)
+            return HookResult(command, EX_NOEXEC, monotonic() - started)
+        with self._processes_lock:
+            self._processes.add(process)
+        timer = None
+        if timeout:
+            timer = Timer(timeout, self._timed_out, (log, command, process))
+            timer.start()
+        try:
+            for line in process.stdout:
+                log.info('hook: %s', line.rstrip('\n'))
+            exit_code = process.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            with self._processes_lock:
+                self._processes.discard(process)
+        result = HookResult(command, exit_code, monotonic() - started)
+        self._log_result(log, result)
+        return result
+
+    @staticmethod
+    def _log_result(log, result: HookResult):
+        if result.exit_code == os.EX_OK:
+            log.info('post-sync hook %r exit code=%r after %.1fs',
+                     result.command, result.exit_code, result.elapsed)
+        else:
+            log.error('post-sync hook %r exit code=%r after %.1fs',
+                      result.command, result.exit_code, result.elapsed)
+
+    def _timed_out(self, log, command: str, process: Popen):
+        log.error('post-sync hook %r exceeded its time limit; killing',
+                  command)
+        self._halt(process.kill)
+
+    def run(self, log, commands: list, env: dict = None,
+            timeout: int = 0) -> list:
+        """
+        Run a mirror's post-synchronization hooks.
+
+        This blocks until a slot within the pool becomes available and then
+        until all of the hooks have completed.  All output of the hooks is
+        injected into the logger.
+
+        :param log:
+            The mirror's logger.
+
+        :param commands:
+            The hook commands to be run, in order.  Each is split into
+            arguments according to shell-like syntax, but no shell is
+            involved.
+
+        :param env:
+            Additional environment variables for the hook processes.
+
+        :param timeout:
+            Time limit, in seconds, for each hook or zero for no limit.
+
+        :return:
+            A list of HookResult objects, one for each hook that was
+            attempted.
+        """
+        results = []
+        hook_env = dict(os.environ)
+        hook_env.update(env or {})
+        log.debug('waiting for one of %d post-sync hook slots', self.size)
+        with self._slots:
+            for command in commands:
+                if self._stopped:
+                    log.info('post-sync hooks halted')
+                    break
+                result = self._run_one(log, command, hook_env, timeout)
+                results.append(result)
+                if result.exit_code != os.EX_OK:
+                    log.error('remaining post-sync hooks skipped')
+                    break
+        return results
+
+    def stop(self):
+        """Prevent further hooks and force termination of any running."""
+        self._stopped = True
+        with self._processes_lock:
+            processes = list(self._processes)
+        for process in processes:
+            self._halt(process.terminate)
@@ -0,0 +1,305 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements incremental synchronization for upstreams that
+publish a list of their files along with the times of modification, such as
+Fedora's ``fullfiletimelist-*``.  The upstream list is fetched and compared
+with the list as of the last successful run, so that rsync need only be given
+the paths that changed rather than walk the entire tree.
+
+The fetched list is kept so that rsync refreshes it by transferring only
+its differences, or nothing at all if it is unchanged, in which case neither
+is there anything to synchronize.  The list as of the last successful run is
+kept as a compact FileListIndex.
+"""
+
+import json
+import logging
+import os
+from subprocess import PIPE, TimeoutExpired, run
+
+from mirrmaid.constants import *
+from mirrmaid.exceptions import SynchronizerException
+from mirrmaid.filelist import FileListIndex, UNKNOWN, changes, write_index
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# Supported formats of upstream file lists.
+FEDORA = 'fedora'
+PLAIN = 'plain'
+FORMATS = [FEDORA, PLAIN]
+
+# Seconds spent connecting or without any transfer, and seconds in all, after
+# which fetching the file list is abandoned in favour of a full run.
+FETCH_TIMEOUT = 5 * 60
+FETCH_LIMIT = 30 * 60
+
+
+def _read_fedora(f):
+    """
+    Read a Fedora ``fullfiletimelist``, whose ``[Files]`` section has lines
+    of the form ``MTIME<TAB>TYPE<TAB>SIZE<TAB>PATH``.  Directories are
+    omitted.
+    """
+    in_files = False
+    for line in f:
+        line = line.rstrip('\n')
+        if line.startswith('[') and line.endswith(']'):
+            in_files = line == '[Files]'
+        elif in_files and line:
+            mtime, kind, size, path = line.split('\t', 3)
+            if not kind.startswith('d'):
+                yield path, int(size), int(mtime)
+
+
+def _read_plain(f):
+    """
+    Read a plain file list, having lines of the form ``MTIME<TAB>PATH``.
+    """
+    for line in f:
+        line = line.rstrip('\n')
+        if line:
+            mtime, path = line.split('\t', 1)
+            yield path, UNKNOWN, int(mtime)
+
+
+def read_file_list(filename: str, format_: str):
+    """
+    :return:
+        A generator of ``(path, size, mtime)`` tuples for the files within
+        the file list, where the size may be :data:`UNKNOWN`.
+
+    :raises ValueError:
+        If the file list is malformed.
+    """
+    reader = _read_fedora if format_ == FEDORA else _read_plain
+    with open(filename, encoding='utf-8', errors='surrogateescape') as f:
+        yield from reader(f)
+
+
+class IncrementalSync(object):
+    """
+    The incremental synchronization state of a single mirror.
+
+    The list of the upstream's files is kept as of the last successful run,
+    when it matched the target.  A run is incremental if such a list exists
+    and fewer than ``full_sync_interval`` incremental runs have happened
+    since the last full run; otherwise the run is full, which also
+    reconciles anything the upstream list does not reveal.
+    """
+
+    def __init__(self, mirror_conf, log: logging.Logger):
+        """
+        Initialize the IncrementalSync object.
+
+        :param mirror_conf:
+            The MirrorConfig of the mirror.
+
+        :param log:
+            The logger of the mirror's Synchronizer.
+        """
+        self.mirror_conf = mirror_conf
+        self.log = log
+        self.directory = os.path.join(
+            INCREMENTAL_DIRECTORY,
+            mirror_conf.mirror_name.replace(os.sep, '_'),
+        )
+        self.files_from = None
+        self.unchanged = False
+        self._built = False
+        self._fetched = False
+
+    @property
+    def _fetched_filename(self) -> str:
+        return os.path.join(self.directory, 'upstream.fetched')
+
+    @property
+    def _files_from_filename(self) -> str:
+        return os.path.join(self.directory, 'files-from')
+
+    @property
+    def _index_filename(self) -> str:
+        return os.path.join(self.directory, 'upstream.index')
+
+    @property
+    def _new_index_filename(self) -> str:
+        return os.path.join(self.directory, 'upstream.index.new')
+
+    @property
+    def _state_filename(self) -> str:
+        return os.path.join(self.directory, 'state.json')
+
+    @property
+    def _runs_since_full(self) -> int:
+        try:
+            with open(self._state_filename) as f:
+                return json.load(f)['runs_since_full']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @_runs_since_full.setter
+    def _runs_since_full(self, runs: int):
+        temporary = f'{self._state_filename}.{os.getpid()}'
+        with open(temporary, 'w') as f:
+            json.dump({'runs_since_full': runs}, f)
+        os.replace(temporary, self._state_filename)
+
+    def _fetch(self, source_uri: str) -> bool:
+        """
+        Fetch the upstream file list.
+
+        :return:
+            ``True`` iff the list was fetched.
+        """
+        cmd = [RSYNC, '--no-motd', '--times', f'--timeout={FETCH_TIMEOUT}']
+        if source_uri.startswith('rsync://') or '::' in source_uri:
+            cmd.append(f'--contimeout={FETCH_TIMEOUT}')
+        cmd += [source_uri + self.mirror_conf.file_list,
+                self._fetched_filename]
+        self.log.debug('spawning %r', cmd)
+        try:
+            result = run(cmd, stdout=PIPE, stderr=PIPE,
+                         universal_newlines=True, timeout=FETCH_LIMIT)
+        except TimeoutExpired:
+            self.log.warning('fetching file list: not done within %ds',
+                             FETCH_LIMIT)
+            return False
+        if result.returncode != os.EX_OK:
+            for line in result.stderr.splitlines():
+                self.log.warning('fetching file list: %s', line)
+            return False
+        return True
+
+    @property
+    def options(self) -> list:
+        """
+        :return:
+            The additional rsync options for an incremental run, if this is
+            one.
+        """
+        if self.files_from is None:
+            return []
+        return ['--files-from', self.files_from, '--delete-missing-args']
+
+    def conclude(self, exit_code: int):
+        """
+        Record the outcome of the run.
+
+        Only upon success does the index of the fetched file list become the
+        index against which the next run is compared.
+        """
+        if exit_code != os.EX_OK or not self._fetched:
+            return
+        try:
+            if self._built:
+                os.replace(self._new_index_filename, self._index_filename)
+            if self.files_from is None and not self.unchanged:
+                self._runs_since_full = 0
+            else:
+                self._runs_since_full = (self._runs_since_full or 0) + 1
+        except OSError as e:
+            self.log.error('cannot record file list because: %s', e)
+
+    def _open_index(self) -> FileListIndex:
+        """
+        :return:
+            The index of the file list as of the last successful run or
+            ``None`` if there is none.
+        """
+        try:
+            return FileListIndex(self._index_filename)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            self.log.warning('cannot read prior file list because: %s', e)
+            return None
+
+    def _compare(self, previous: FileListIndex, format_: str) -> bool:
+        """
+        Index the fetched file list, unless it is unchanged, and compare it
+        with that of the last successful run.
+
+        :return:
+            ``True`` iff the run is to be incremental.
+        """
+        unchanged = (previous is not None
+                     and previous.describes(self._fetched_filename))
+        if not unchanged:
+            try:
+                write_index(self._new_index_filename,
+                            read_file_list(self._fetched_filename, format_),
+                            self._fetched_filename)
+            except ValueError as e:
+                self.log.warning('cannot read file list because: %s; '
+                                 'running in full', e)
+                return False
+            self._built = True
+        runs = self._runs_since_full
+        if runs is None or previous is None:
+            self.log.info('no prior file list; running in full')
+            return False
+        if runs >= self.mirror_conf.full_sync_interval:
+            self.log.info('%d incremental runs since the last full run; '
+                          'running in full', runs)
+            return False
+        if unchanged:
+            self.log.info('upstream file list unchanged; nothing to '
+                          'synchronize')
+            self.unchanged = True
+            return True
+        changed = deleted = 0
+        with FileListIndex(self._new_index_filename) as current, \
+                open(self._files_from_filename, 'wb') as f:
+            # The list itself must be kept current on the target too.
+            f.write(os.fsencode(self.mirror_conf.file_list) + b'\n')
+            for path, gone in changes(previous, current):
+                f.write(path + b'\n')
+                if gone:
+                    deleted += 1
+                else:
+                    changed += 1
+        self.log.info('incremental run: %d changed and %d deleted paths',
+                      changed, deleted)
+        self.files_from = self._files_from_filename
+        return True
+
+    def prepare(self, source_uri: str) -> bool:
+        """
+        Decide whether this run is to be incremental and if so, determine the
+        paths that it must transfer or delete, if any.
+
+        :param source_uri:
+            The rsync URI of the source, ending with a ``/``.
+
+        :return:
+            ``True`` iff the run is to be incremental.
+
+        :raises SynchronizerException:
+            If the format of the file list is not supported.
+        """
+        self.files_from = None
+        self.unchanged = False
+        self._built = False
+        os.makedirs(self.directory, exist_ok=True)
+        self._fetched = self._fetch(source_uri)
+        if not self._fetched:
+            self.log.warning('cannot fetch file list %r; running in full',
+                             self.mirror_conf.file_list)
+            return False
+        format_ = self.mirror_conf.file_list_format
+        if format_ not in FORMATS:
+            raise SynchronizerException(
+                f'file_list_format {format_!r} is not one of {FORMATS!r}')
+        previous = self._open_index()
+        try:
+            return self._compare(previous, format_)
+        finally:
+            if previous is not None:
+                previous.close()
@@ -0,0 +1,344 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the run journal, a persistent SQLite database holding
+one record for every Synchronizer run, along with the queries used to
+examine trends within it.
+"""
+
+import json
+import logging
+import sqlite3
+from collections import OrderedDict
+from queue import Empty, Queue
+from threading import Thread
+from time import monotonic, time
+
+from mirrmaid.constants import *
+from mirrmaid.exceptions import MirrmaidRuntimeException
+from mirrmaid.reporting import (
+    DEFERRED, LOCKED, Reporter, RunReport, SUCCESS,
+)
+from mirrmaid.stats import RsyncStats
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.journal')
+
+# Maximum number of records written per transaction.
+BATCH_SIZE = 100
+
+# Maximum number of seconds a record may wait to be batched with others.
+BATCH_DELAY = 5
+
+# Seconds to wait on a database locked by another mirrmaid process.
+BUSY_TIMEOUT = 60
+
+# Each element upgrades the schema by one version; see PRAGMA user_version.
+_MIGRATIONS = [
+    """
+    CREATE TABLE runs (
+        id                  INTEGER PRIMARY KEY,
+        mirror              TEXT NOT NULL,
+        source              TEXT,
+        target              TEXT,
+        dry_run             INTEGER NOT NULL,
+        started             REAL NOT NULL,
+        finished            REAL,
+        elapsed             REAL,
+        exit_code           INTEGER,
+        outcome             TEXT,
+        bytes_received      INTEGER,
+        bytes_sent          INTEGER,
+        files_transferred   INTEGER,
+        transferred_size    INTEGER,
+        total_size          INTEGER,
+        phases              TEXT,
+        stats               TEXT
+    );
+    CREATE INDEX runs_by_mirror ON runs (mirror, started);
+    CREATE INDEX runs_by_start ON runs (started);
+    """,
+    """
+    ALTER TABLE runs ADD COLUMN target_device INTEGER;
+    ALTER TABLE runs ADD COLUMN target_free INTEGER;
+    """,
+]
+
+
+def open_journal(filename: str = JOURNAL_FILENAME) -> sqlite3.Connection:
+    """
+    Open the journal database, creating or upgrading its schema as necessary.
+
+    :param filename:
+        Name of the SQLite database file.
+
+    :return:
+        A connection to the database.
+    """
+    db = sqlite3.connect(filename, timeout=BUSY_TIMEOUT)
+    version = db.execute('PRAGMA user_version').fetchone()[0]
+    for number, migration in enumerate(_MIGRATIONS[version:], version + 1):
+        with db:
+            db.executescript(migration)
+            db.execute(f'PRAGMA user_version = {number:d}')
+    return db
+
+
+class RunJournal(Reporter):
+    """
+    A Reporter that records each RunReport in the journal.
+
+    Records are queued and written by a background thread in batches so that
+    the Synchronizers never wait on the database.
+    """
+
+    INSERT = """
+        INSERT INTO runs (
+            mirror, source, target, dry_run, started, finished, elapsed,
+            exit_code, outcome, bytes_received, bytes_sent, files_transferred,
+            transferred_size, total_size, phases, stats, target_device,
+            target_free
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    def __init__(self, filename: str = JOURNAL_FILENAME):
+        """
+        Initialize the RunJournal object and start its writer.
+
+        :param filename:
+            Name of the SQLite database file.
+        """
+        self.filename = filename
+        self._queue = Queue()
+        self._writer = Thread(target=self._write, name='journal',
+                              daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _row(run_report: RunReport) -> tuple:
+        stats = run_report.stats
+        return (
+            run_report.mirror,
+            run_report.source,
+            run_report.target,
+            int(run_report.dry_run),
+            run_report.started,
+            run_report.finished,
+            run_report.elapsed,
+            run_report.exit_code,
+            run_report.outcome,
+            stats.get(RsyncStats.TOTAL_BYTES_RECEIVED),
+            stats.get(RsyncStats.TOTAL_BYTES_SENT),
+            stats.get(RsyncStats.FILES_TRANSFERRED),
+            stats.get(RsyncStats.TOTAL_TRANSFERRED_FILE_SIZE),
+            stats.get(RsyncStats.TOTAL_FILE_SIZE),
+            json.dumps(run_report.phases),
+            json.dumps(stats),
+            run_report.target_device,
+            run_report.target_free,
+        )
+
+    def _write(self):
+        try:
+            db = open_journal(self.filename)
+        except sqlite3.Error as e:
+            _log.error('cannot open run journal %r because: %s',
+                       self.filename, e)
+            return
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = monotonic() + BATCH_DELAY
+            while len(batch) < BATCH_SIZE and batch[-1] is not None:
+                try:
+                    batch.append(
+                        self._queue.get(timeout=max(0, deadline - monotonic()))
+                    )
+                except Empty:
+                    break
+            if batch[-1] is None:
+                stopping = True
+                batch.pop()
+            try:
+                with db:
+                    db.executemany(self.INSERT, batch)
+            except sqlite3.Error as e:
+                _log.error('cannot write %d records to run journal %r '
+                           'because: %s', len(batch), self.filename, e)
+        db.close()
+
+    def close(self):
+        """Write any queued records and stop the writer."""
+        self._queue.put(None)
+        self._writer.join()
+
+    def report(self, run_report: RunReport):
+        self._queue.put(self._row(run_report))
+
+
+class JournalQuery(object):
+    """Queries for trends within the run journal."""
+
+    def __init__(self, filename: str = JOURNAL_FILENAME):
+        """
+        :raises MirrmaidRuntimeException:
+            If the journal cannot be opened.
+        """
+        try:
+            self.db = open_journal(filename)
+        except sqlite3.Error as e:
+            raise MirrmaidRuntimeException(
+                f'cannot open run journal {filename!r} because: {e}'
+            ) from None
+
+    @staticmethod
+    def _since(days: int) -> float:
+        return time() - days * 24 * 60 * 60
+
+    def bytes_per_day(self, days: int, mirror: str = None) -> list:
+        """
+        :return:
+            A list of ``(day, runs, bytes_received, files_transferred)``
+            tuples for each day having runs within the last *days*.
+        """
+        return self.db.execute(
+            """
+            SELECT date(started, 'unixepoch', 'localtime') AS day, COUNT(*),
+                   SUM(bytes_received), SUM(files_transferred)
+            FROM runs
+            WHERE started >= ? AND dry_run = 0
+                AND (? IS NULL OR mirror = ?)
+            GROUP BY day ORDER BY day
+            """,
+            (self._since(days), mirror, mirror)
+        ).fetchall()
+
+    def capacity(self, days: int) -> list:
+        """
+        :return:
+            A list of ``(device, targets, samples)`` tuples for each
+            filesystem holding targets within the last *days*, where
+            *targets* is a sorted list of those targets and *samples* is
+            a chronological list of ``(time, free_bytes)`` tuples.
+        """
+        result = OrderedDict()
+        for device, target, finished, free in self.db.execute(
+                """
+                SELECT target_device, target, finished, target_free
+                FROM runs
+                WHERE started >= ? AND dry_run = 0
+                    AND target_free IS NOT NULL
+                ORDER BY target_device, finished
+                """,
+                (self._since(days),)
+        ):
+            targets, samples = result.setdefault(device, (set(), []))
+            targets.add(target)
+            samples.append((finished, free))
+        return [(device, sorted(targets), samples)
+                for device, (targets, samples) in result.items()]
+
+    def failure_rates(self, days: int, mirror: str = None) -> list:
+        """
+        :return:
+            A list of ``(mirror, runs, failures, rate)`` tuples within the
+            last *days*, with the highest failure rates first.  Runs skipped
+            because the mirror was locked or deferred by its space check are
+            not counted.
+        """
+        return self.db.execute(
+            """
+            SELECT mirror, COUNT(*) AS n, SUM(outcome != ?) AS failures,
+                   ROUND(100.0 * SUM(outcome != ?) / COUNT(*), 1) AS rate
+            FROM runs
+            WHERE started >= ? AND dry_run = 0 AND outcome NOT IN (?, ?)
+                AND (? IS NULL OR mirror = ?)
+            GROUP BY mirror ORDER BY rate DESC, n DESC
+            """,
+            (SUCCESS, SUCCESS, self._since(days), LOCKED, DEFERRED, mirror,
+             mirror)
+        ).fetchall()
+
+    def max_transferred(self, days: int) -> dict:
+        """
+        :return:
+            A dictionary mapping each mirror name to the most bytes of files
+            transferred by any of its successful runs within the last *days*.
+        """
+        return dict(self.db.execute(
+            """
+            SELECT mirror, MAX(transferred_size) FROM runs
+            WHERE started >= ? AND dry_run = 0 AND outcome = ?
+                AND transferred_size IS NOT NULL
+            GROUP BY mirror
+            """,
+            (self._since(days), SUCCESS)
+        ).fetchall())
+
+    def mean_elapsed(self, days: int) -> dict:
+        """
+        :return:
+            A dictionary mapping each mirror name to its mean duration, in
+            seconds, among successful runs within the last *days*.
+        """
+        return dict(self.db.execute(
+            """
+            SELECT mirror, AVG(elapsed) FROM runs
+            WHERE started >= ? AND dry_run = 0 AND outcome = ?
+            GROUP BY mirror
+            """,
+            (self._since(days), SUCCESS)
+        ).fetchall())
+
+    def throughput(self, days: int) -> dict:
+        """
+        :return:
+            A dictionary mapping each mirror name to its mean rate of
+            transfer, in bytes per second, among successful runs within the
+            last *days* that transferred anything.  The rate across all
+            mirrors is given for the key ``None``.
+        """
+        where = """
+            WHERE started >= ? AND dry_run = 0 AND outcome = ?
+                AND bytes_received > 0 AND elapsed > 0
+        """
+        since = self._since(days)
+        result = dict(self.db.execute(
+            'SELECT mirror, 1.0 * SUM(bytes_received) / SUM(elapsed) '
+            f'FROM runs {where} GROUP BY mirror',
+            (since, SUCCESS)
+        ).fetchall())
+        result[None] = self.db.execute(
+            'SELECT 1.0 * SUM(bytes_received) / SUM(elapsed) '
+            f'FROM runs {where}',
+            (since, SUCCESS)
+        ).fetchone()[0]
+        return result
+
+    def slowest(self, days: int, mirror: str = None) -> list:
+        """
+        :return:
+            A list of ``(mirror, runs, mean_elapsed, max_elapsed,
+            mean_bytes_received)`` tuples within the last *days*, with the
+            slowest mirrors first.
+        """
+        return self.db.execute(
+            """
+            SELECT mirror, COUNT(*), AVG(elapsed) AS mean, MAX(elapsed),
+                   AVG(bytes_received)
+            FROM runs
+            WHERE started >= ? AND dry_run = 0
+                AND outcome NOT IN (?, ?)
+                AND (? IS NULL OR mirror = ?)
+            GROUP BY mirror ORDER BY mean DESC
+            """,
+            (self._since(days), LOCKED, DEFERRED, mirror, mirror)
+        ).fetchall()
@@ -0,0 +1,297 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the central collection of log records.  Those logging
+merely enqueue their records; a single listener thread formats them and
+writes the log files.
+
+In the ``queue`` mode, the collection is confined to one mirrmaid process.
+In the ``socket`` mode, overlapping mirrmaid processes elect one of their
+number as the collector, which alone owns the log files and their rotation;
+the others send their records to it over a local socket.  Should the
+collector exit, the remaining processes elect a successor.
+"""
+
+import fcntl
+import json
+import logging
+import logging.handlers
+import os
+import socket
+import struct
+from queue import Queue
+from threading import Thread
+
+from mirrmaid.constants import *
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# The loggers whose file handlers are taken over by the LogCollector.
+_LOGGERS = ['', 'mirrmaid']
+
+# Each record sent to the collector is framed by its length, as packed here.
+_FRAME = struct.Struct('!I')
+
+# Attempts made to reach a collector before handling a record locally.
+_ATTEMPTS = 3
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records as they are, since they never leave the process; all
+    formatting is left to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _encode(record: logging.LogRecord) -> bytes:
+    content = dict(record.__dict__)
+    content['msg'] = record.getMessage()
+    content['args'] = None
+    if record.exc_info and not record.exc_text:
+        content['exc_text'] = logging.Formatter().formatException(
+            record.exc_info)
+    content['exc_info'] = None
+    data = json.dumps(content, default=str).encode()
+    return _FRAME.pack(len(data)) + data
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+class _CollectorClientHandler(logging.Handler):
+    """Sends records to the collector of another mirrmaid process."""
+
+    def __init__(self, collector):
+        super().__init__()
+        self.collector = collector
+
+    def emit(self, record: logging.LogRecord):
+        frame = _encode(record)
+        for _ in range(_ATTEMPTS):
+            if self.collector.is_collector:
+                break
+            connection = self.collector.connection
+            if connection is None:
+                self.collector.reelect()
+                continue
+            try:
+                connection.sendall(frame)
+                return
+            except OSError:
+                # The collector has exited; elect or find its successor.
+                self.collector.reelect()
+        # This process may now be the collector; otherwise none could be
+        # reached, so the record is written locally as a last resort.
+        for handler in self.collector.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class LogCollector(object):
+    """
+    Takes over the file handlers of the root and ``mirrmaid`` loggers so
+    that records are collected centrally.  Any others, notably those writing
+    to the console, are left to each process.
+    """
+
+    def __init__(self, mode: str, socket_name: str = LOG_SOCKET):
+        """
+        Initialize the LogCollector object.
+
+        :param mode:
+            Either ``'queue'`` or ``'socket'``.
+
+        :param socket_name:
+            Name of the local socket on which the collector listens, in the
+            ``socket`` mode.
+        """
+        self.mode = mode
+        self.socket_name = socket_name
+        self.connection = None
+        self.handlers = []
+        self._detached = []
+        self._election = None
+        self._listener = None
+        self._queue = Queue()
+        self._server = None
+
+    @property
+    def is_collector(self) -> bool:
+        """
+        :return:
+            ``True`` iff this process writes the log files.
+        """
+        return self.mode == 'queue' or self._server is not None
+
+    def _accept(self):
+        server = self._server
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                break
+            Thread(target=self._collect, args=(connection,),
+                   name='log-collector', daemon=True).start()
+
+    def _collect(self, connection: socket.socket):
+        with connection:
+            try:
+                while True:
+                    size, = _FRAME.unpack(
+                        _receive_exactly(connection, _FRAME.size))
+                    content = json.loads(
+                        _receive_exactly(connection, size).decode())
+                    self._queue.put(logging.makeLogRecord(content))
+            except (EOFError, OSError, ValueError):
+                pass
+
+    def _elect(self):
+        """
+        Become the collector, if no other process is, or else connect to it.
+        """
+        directory = os.path.dirname(self.socket_name)
+        os.makedirs(directory, exist_ok=True)
+        if self._election is None:
+            self._election = open(f'{self.socket_name}.lock', 'a')
+        try:
+            fcntl.flock(self._election, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._connect()
+            return
+        try:
+            os.unlink(self.socket_name)
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_name)
+        server.listen(16)
+        self._server = server
+        Thread(target=self._accept, name='log-collector',
+               daemon=True).start()
+        if self._listener:
+            self._listener.handlers = tuple(self.handlers)
+
+    def _connect(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.socket_name)
+        except OSError:
+            # The collector is starting or stopping.
+            connection.close()
+            self.connection = None
+        else:
+            self.connection = connection
+
+    def _detach(self):
+        for name in _LOGGERS:
+            logger = logging.getLogger(name or None)
+            for handler in list(logger.handlers):
+                # This includes the rotating handlers.
+                if not isinstance(handler, logging.FileHandler):
+                    continue
+                logger.removeHandler(handler)
+                filter_ = logging.Filter(name) if name else None
+                if filter_:
+                    # The root logger handles the records of every logger.
+                    handler.addFilter(filter_)
+                self._detached.append((logger, handler, filter_))
+                self.handlers.append(handler)
+
+    def _listener_handlers(self) -> list:
+        if self.is_collector:
+            return self.handlers
+        handler = _CollectorClientHandler(self)
+        handler.setLevel(min(h.level for h in self.handlers))
+        return [handler]
+
+    def _resign(self):
+        """Cease being (or being connected to) the collector."""
+        if self._server:
+            try:
+                os.unlink(self.socket_name)
+            except FileNotFoundError:
+                pass
+            self._server.close()
+            self._server = None
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        if self._election:
+            self._election.close()
+            self._election = None
+
+    def _restore(self):
+        for logger, handler, filter_ in self._detached:
+            if filter_:
+                handler.removeFilter(filter_)
+            logger.addHandler(handler)
+        self._detached = []
+        self.handlers = []
+
+    def reelect(self):
+        """Replace the connection to a collector that has exited."""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        try:
+            self._elect()
+        except OSError:
+            self.connection = None
+
+    def start(self):
+        """Take over the handlers and begin collecting."""
+        self._detach()
+        if not self.handlers:
+            return
+        failure = None
+        if self.mode == 'socket':
+            try:
+                self._elect()
+            except OSError as e:
+                self._resign()
+                self.mode = 'queue'
+                failure = e
+        self._listener = logging.handlers.QueueListener(
+            self._queue, *self._listener_handlers(),
+            respect_handler_level=True)
+        self._listener.start()
+        logging.getLogger().addHandler(_LocalQueueHandler(self._queue))
+        if failure:
+            logging.getLogger('mirrmaid').warning(
+                'cannot collect logs via %r because: %s; using the queue '
+                'mode instead', self.socket_name, failure)
+
+    def stop(self):
+        """
+        Write all records collected so far and restore the handlers.
+
+        Another process then takes over as the collector, as needed.
+        """
+        if self._listener is None:
+            return
+        for handler in list(logging.getLogger().handlers):
+            if isinstance(handler, _LocalQueueHandler):
+                logging.getLogger().removeHandler(handler)
+        # Records still in transit from other processes are lost, but those
+        # processes will find the successor for their subsequent records.
+        self._resign()
+        self._listener.stop()
+        self._listener = None
+        self._restore()
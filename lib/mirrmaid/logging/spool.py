@@ -0,0 +1,219 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements a local spool for outgoing mail so that those logging
+never wait on an SMTP server.  Messages are written to the spool directory
+and delivered by a background sender, which retries with exponential backoff.
+Messages still undelivered when mirrmaid exits remain spooled for the next
+run.
+"""
+
+import fcntl
+import json
+import os
+import sys
+from threading import Event, Thread
+from time import time
+
+from doubledog.mail import MiniMailer
+
+from mirrmaid.constants import *
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# Seconds to wait before the first retry of a failed delivery; this doubles
+# with each further failure up to RETRY_MAX_DELAY.
+RETRY_DELAY = 60
+RETRY_MAX_DELAY = 60 * 60
+
+# Seconds after which an undeliverable message is moved aside to the failed
+# sub-directory.
+MAX_AGE = 7 * 24 * 60 * 60
+
+# Maximum seconds the sender will wait between passes over the spool.
+POLL_INTERVAL = 60
+
+# Seconds to wait on a final delivery pass when the sender is stopped.
+STOP_TIMEOUT = 30
+
+
+class MailSpool(object):
+    """A directory of messages awaiting delivery, one JSON file each."""
+
+    def __init__(self, directory: str = MAIL_SPOOL):
+        """
+        Initialize the MailSpool object.
+
+        :param directory:
+            Name of the spool directory.
+        """
+        self.directory = directory
+
+    @property
+    def _failed_directory(self) -> str:
+        return os.path.join(self.directory, 'failed')
+
+    def _write(self, path: str, message: dict):
+        temporary = os.path.join(self.directory,
+                                 f'.{os.path.basename(path)}.{os.getpid()}')
+        try:
+            with open(temporary, 'w') as f:
+                json.dump(message, f)
+            os.replace(temporary, path)
+        except OSError:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            raise
+
+    def put(self, sender: str, recipients: list, subject: str, body: str):
+        """
+        Spool a message for delivery.
+
+        :raises OSError:
+            If the message cannot be written to the spool.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        now = time()
+        name = f'{int(now * 1000000):020d}.{os.getpid()}.json'
+        self._write(os.path.join(self.directory, name), {
+            'sender': sender,
+            'recipients': recipients,
+            'subject': subject,
+            'body': body,
+            'created': now,
+            'attempts': 0,
+            'next_attempt': now,
+        })
+
+    def _deliver(self, path: str) -> float:
+        """
+        Attempt delivery of the spooled message at *path*, if due.
+
+        The file is locked for the duration so that concurrent mirrmaid
+        processes never deliver the same message twice.
+
+        :return:
+            The time at which the next attempt is due or ``None`` if the
+            message is no longer spooled.
+        """
+        try:
+            f = open(path)
+        except FileNotFoundError:
+            return None
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            if os.fstat(f.fileno()).st_nlink == 0:
+                # Delivered by another process meanwhile.
+                return None
+            try:
+                message = json.load(f)
+            except ValueError:
+                sys.stderr.write(f'Discarding damaged mail spool file: '
+                                 f'{path}\n')
+                self._move_aside(path)
+                return None
+            now = time()
+            if message['next_attempt'] > now:
+                return message['next_attempt']
+            try:
+                MiniMailer().send(message['sender'], message['recipients'],
+                                  message['subject'], message['body'])
+            except OSError as e:
+                message['attempts'] += 1
+                if now - message['created'] > MAX_AGE:
+                    sys.stderr.write(f'Giving up on mail after '
+                                     f'{message["attempts"]} attempts: {e}\n')
+                    self._move_aside(path)
+                    return None
+                delay = min(RETRY_MAX_DELAY,
+                            RETRY_DELAY * 2 ** (message['attempts'] - 1))
+                message['next_attempt'] = now + delay
+                sys.stderr.write(f'Unable to mail log summary (will retry '
+                                 f'in {delay}s): {e}\n')
+                self._write(path, message)
+                return message['next_attempt']
+            os.unlink(path)
+            return None
+
+    def _move_aside(self, path: str):
+        os.makedirs(self._failed_directory, exist_ok=True)
+        os.replace(path, os.path.join(self._failed_directory,
+                                      os.path.basename(path)))
+
+    def deliver_due(self) -> float:
+        """
+        Attempt delivery of every spooled message that is due.
+
+        :return:
+            The time at which the next spooled message is due or ``None`` if
+            the spool is empty (as far as this process knows).
+        """
+        try:
+            names = sorted(name for name in os.listdir(self.directory)
+                           if name.endswith('.json'))
+        except FileNotFoundError:
+            return None
+        next_due = None
+        for name in names:
+            try:
+                due = self._deliver(os.path.join(self.directory, name))
+            except OSError as e:
+                sys.stderr.write(f'Unable to process mail spool file '
+                                 f'{name}: {e}\n')
+                continue
+            if due is not None:
+                next_due = due if next_due is None else min(next_due, due)
+        return next_due
+
+
+class SpoolSender(object):
+    """Delivers the messages of a MailSpool from a background thread."""
+
+    def __init__(self, spool: MailSpool):
+        """
+        Initialize the SpoolSender object and start its thread.
+
+        :param spool:
+            The MailSpool whose messages are to be delivered.
+        """
+        self.spool = spool
+        self._stopping = Event()
+        self._wake = Event()
+        # A daemon so that a hung SMTP server cannot prevent mirrmaid from
+        # exiting; the message simply remains spooled.
+        self._thread = Thread(target=self._send, name='mail-spool',
+                              daemon=True)
+        self._thread.start()
+
+    def _send(self):
+        while True:
+            self._wake.clear()
+            next_due = self.spool.deliver_due()
+            if self._stopping.is_set():
+                break
+            timeout = POLL_INTERVAL
+            if next_due is not None:
+                timeout = min(timeout, max(0.0, next_due - time()))
+            self._wake.wait(timeout)
+
+    def stop(self):
+        """Make a final delivery pass and stop the thread."""
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(STOP_TIMEOUT)
+
+    def wake(self):
+        """Prompt delivery of any newly spooled message."""
+        self._wake.set()
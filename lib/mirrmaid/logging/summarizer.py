@@ -20,9 +20,8 @@ from socket import getfqdn
 from time import asctime, ctime, time
 from typing import Optional
 
-from doubledog.mail import MiniMailer
-
 from mirrmaid.constants import *
+from mirrmaid.logging.spool import MailSpool, SpoolSender
 
 __author__ = """John Florian <jflorian@doubledog.org>"""
 __copyright__ = """Copyright 2012-2020 John Florian"""
@@ -97,7 +96,9 @@ class LogSummarizingHandler(logging.handlers.RotatingFileHandler):
 
     When a rollover does occur, the log content just displaced will be
     delivered via email as a means of summarizing the important messages that
-    had occurred during this most recent summary interval.
+    had occurred during this most recent summary interval.  The email is only
+    spooled during the rollover and is delivered by a background sender, so
+    that those logging never wait on the mail server.
     """
 
     def __init__(self, mirrmaid_config):
@@ -105,6 +106,8 @@ class LogSummarizingHandler(logging.handlers.RotatingFileHandler):
         self.summary_group = SummaryGroup(self.mirrmaid_config.summary_group)
         self._log_state = LogState(self.summary_group)
         self._reset_reasons()
+        self._spool = MailSpool()
+        self._sender = SpoolSender(self._spool)
         super().__init__(
             self.__log_filename,
             maxBytes=self.mirrmaid_config.summary_size,
@@ -176,20 +179,30 @@ class LogSummarizingHandler(logging.handlers.RotatingFileHandler):
     def _mail_summary(self):
         sender = f'mirrmaid@{getfqdn()}'
         try:
-            MiniMailer().send(
+            self._spool.put(
                 sender,
                 self.mirrmaid_config.summary_recipients,
                 self.__subject,
                 self._summary_body
             )
-        except ConnectionError as e:
-            sys.stderr.write(f'Unable to mail log summary: {e}\n')
+        except OSError as e:
+            sys.stderr.write(f'Unable to spool log summary: {e}\n')
+        else:
+            self._sender.wake()
         self._reset_reasons()
 
     def _reset_reasons(self):
         self._rolled_for_age = False
         self._rolled_for_size = False
 
+    def close(self):
+        """
+        Overridden method.  Perform all inherited behavior and make a final
+        attempt to deliver any spooled summaries.
+        """
+        super().close()
+        self._sender.stop()
+
     def doRollover(self):
         """
         Overridden method.  Perform all inherited behavior and mail any content
@@ -18,18 +18,37 @@ import logging.handlers
 import os
 import pwd
 from signal import SIGHUP, SIGINT, SIGQUIT, SIGTERM, signal
-from time import sleep
+from time import sleep, time
 
 import yaml
 from doubledog.config.sectioned import DefaultConfig
+from doubledog.lock import LockException, LockFile
 
-from mirrmaid.config import MirrmaidConfig, MirrorConfig, MirrorsConfig
+from mirrmaid.capacity import format_device, forecast
+from mirrmaid.cluster import ClusterCoordinator, LeaseStore
+from mirrmaid.config import (
+    ExpandedMirrorConfig, MirrmaidConfig, MirrorsConfig, MirrorTable,
+)
 from mirrmaid.constants import *
+from mirrmaid.dedup import DedupIndex, Deduplicator
+from mirrmaid.engine import AsyncEngine, AsyncSynchronizer
 from mirrmaid.exceptions import MirrmaidRuntimeException, SignalException
+from mirrmaid.hooks import HookPool
+from mirrmaid.journal import JournalQuery, RunJournal
+from mirrmaid.logging.collector import LogCollector
 from mirrmaid.logging.handlers import ConsoleHandler
 from mirrmaid.logging.kludge import race_friendly_rotator
 from mirrmaid.logging.summarizer import LogSummarizingHandler
+from mirrmaid.planner import Planner
+from mirrmaid.preflight import Preflight
+from mirrmaid.process import CONTEXT, ProcessEvents, SynchronizerProcess
+from mirrmaid.reporting import LOCKED, get_reporters
+from mirrmaid.resources import ResourceControls, delegate
 from mirrmaid.synchronizer import Synchronizer
+from mirrmaid.table import format_bytes, format_duration, format_table
+from mirrmaid.trash import Purger, trash_directory
+from mirrmaid.trigger import LOCKED_RETRY_DELAY, TriggerQueue, TriggerSpool
+from mirrmaid.verify import Verifier, VerifyState
 
 __author__ = """John Florian <jflorian@doubledog.org>"""
 __copyright__ = """Copyright 2009-2020 John Florian"""
@@ -46,20 +65,37 @@ class MirrorManager(object):
         self.cli = cli
         self.mirrmaid_conf = None
         self.default_conf = None
-        self.mirrors_conf = None
+        self.mirror_table = None
+        self._coordinator = None
+        self._events = None
+        self._expected_incoming = {}
+        self._hook_pool = None
+        self._log_collector = None
+        self._reporters = []
         self._workers = None
         self._drop_privileges()
         self._init_logger()
 
     @property
     def _number_of_active_workers(self) -> int:
+        # Workers that have moved on to their post-sync hooks are no longer
+        # consuming an rsync slot; the HookPool limits them separately.
         worker: Synchronizer
         count = 0
         for worker in self._workers:
-            if worker.is_alive():
+            if worker.is_alive() and not worker.running_hooks:
                 count += 1
         return count
 
+    def _config_log_collector(self):
+        """Collect log records centrally, if so configured."""
+        mode = self.mirrmaid_conf.log_collector
+        if mode == 'none':
+            return
+        self._log_collector = LogCollector(mode)
+        self._log_collector.start()
+        _log.debug('collecting log records via: %s', mode)
+
     def _config_logger(self):
         for handler in logging.getLogger().handlers:
             if isinstance(handler, ConsoleHandler):
@@ -67,6 +103,78 @@ class MirrorManager(object):
             if isinstance(handler, logging.handlers.BaseRotatingHandler):
                 handler.rotator = race_friendly_rotator
 
+    def _config_capacity(self):
+        """
+        Gather the history needed by the pre-flight space checks and warn of
+        any target filesystem forecast to be full soon.
+        """
+        if not self.mirrmaid_conf.journal or self.cli.args.dry_run:
+            return
+        query = JournalQuery()
+        self._expected_incoming = query.max_transferred(DEFAULT_HISTORY_DAYS)
+        horizon = self.mirrmaid_conf.forecast_days
+        if not horizon:
+            return
+        for device, targets, samples in query.capacity(DEFAULT_HISTORY_DAYS):
+            result = forecast(samples)
+            if result and result[1] is not None and result[1] <= horizon:
+                _log.error('filesystem %s holding %s is forecast to be full '
+                           'in %.1f days', format_device(device),
+                           ', '.join(targets), result[1])
+
+    def _config_cluster(self):
+        """Join the cluster of nodes sharing the mirrors, if configured."""
+        directory = self.mirrmaid_conf.cluster_directory
+        if directory is None or self.cli.args.dry_run:
+            return
+        if self.mirrmaid_conf.journal:
+            costs = JournalQuery().mean_elapsed(DEFAULT_HISTORY_DAYS)
+        else:
+            costs = {}
+        try:
+            store = LeaseStore(directory, self.mirrmaid_conf.cluster_node,
+                               self.mirrmaid_conf.cluster_lease_ttl)
+        except OSError as e:
+            raise MirrmaidRuntimeException(
+                f'cannot use cluster directory {directory!r} because: {e}'
+            ) from None
+        _log.debug('joining cluster at %r as node %r', directory, store.node)
+        self._coordinator = ClusterCoordinator(
+            store, costs, self.mirrmaid_conf.cluster_node_window)
+        self._reporters.append(self._coordinator)
+
+    def _config_cgroups(self):
+        """
+        Prepare to run the mirrors' rsync within cgroups of their own, if any
+        enabled mirror has cgroup controls.
+        """
+        controllers = set()
+        for mirror in self.mirror_table.enabled:
+            try:
+                controllers |= ResourceControls(self._mirror_config(mirror),
+                                                _log).controllers
+            except (MirrmaidRuntimeException, ValueError):
+                # The mirror fails on its own account later.
+                continue
+        if controllers:
+            _log.debug('enabling cgroup controllers: %r',
+                       sorted(controllers))
+            delegate(sorted(controllers))
+
+    def _config_workers(self):
+        """Prepare for the configured manner of running the workers."""
+        mode = self.mirrmaid_conf.worker_mode
+        _log.debug('running workers as: %s', mode)
+        if mode == 'process':
+            # The children of all workers must share the limit on hooks.
+            self._hook_pool = HookPool(
+                self.mirrmaid_conf.max_hook_workers,
+                CONTEXT.BoundedSemaphore(self.mirrmaid_conf.max_hook_workers),
+            )
+            self._events = ProcessEvents(self._reporters)
+        else:
+            self._hook_pool = HookPool(self.mirrmaid_conf.max_hook_workers)
+
     def _config_proxy(self):
         """Configure the rsync proxy."""
         proxy = self.mirrmaid_conf.proxy
@@ -101,6 +209,40 @@ class MirrorManager(object):
         if handler.summary_due:
             handler.force_rollover()
 
+    def _close_reporters(self):
+        if self._events:
+            self._events.close()
+            self._events = None
+        for reporter in self._reporters:
+            reporter.close()
+
+    def _deduplicate(self):
+        """
+        Hard-link identical content across the mirror targets.
+
+        Only the targets of mirrors that were just successfully synchronized,
+        or that have never been indexed, need to be walked.
+        """
+        worker: Synchronizer
+        if not self.mirrmaid_conf.dedup or self.cli.args.dry_run:
+            return
+        index = DedupIndex()
+        try:
+            roots = []
+            for worker in self._workers:
+                target = worker.mirror_conf.target
+                if (worker.exit_code == os.EX_OK
+                        or not index.scanned(os.path.join(
+                            os.path.realpath(target), ''))):
+                    roots.append((worker.mirror_conf.mirror_name, target))
+            Deduplicator(
+                index,
+                self.mirrmaid_conf.dedup_workers,
+                self.mirrmaid_conf.dedup_min_size,
+            ).run(roots)
+        finally:
+            index.close()
+
     @staticmethod
     def _drop_privileges():
         """Drop privileges, if necessary, to run as correct user/group."""
@@ -136,12 +278,71 @@ class MirrorManager(object):
         for k in sorted(os.environ):
             _log.debug('environment: %s=%r', k, os.environ[k])
 
+    def _claims(self):
+        """
+        :return:
+            An iterator of the names of the mirrors to be synchronized by this
+            node.  In a cluster, each mirror is claimed as it is taken from
+            the iterator, so this should happen only once it can be started;
+            other nodes are free to take it in the meantime.
+        """
+        if self._coordinator is None:
+            return iter(self.mirror_table.enabled)
+        return self._coordinator.claims(self.mirror_table.enabled)
+
+    def _run_engine(self):
+        """Run all workers as the tasks of a single asyncio event loop."""
+        engine = AsyncEngine(
+            lambda mirror: self._synchronizer(
+                mirror,
+                AsyncSynchronizer,
+                dry_run=self.cli.args.dry_run,
+                hook_pool=self._hook_pool,
+                reporters=self._reporters,
+            ),
+            self.mirrmaid_conf.max_workers,
+            self._hook_pool,
+        )
+        self._workers = engine.workers
+        try:
+            engine.run(self._claims(),
+                       self._coordinator.attach if self._coordinator else None)
+        except SignalException:
+            self._close_reporters()
+            raise
+
+    def _run_workers(self):
+        """Run each worker as a thread or a child process."""
+        self._workers = []
+        for mirror in self._schedule():
+            worker = self._start_worker(mirror)
+            if self._coordinator:
+                self._coordinator.attach(mirror, worker)
+        self._wait_for_workers()
+
+    def _schedule(self):
+        """
+        :return:
+            A generator of the names of the mirrors to be synchronized by this
+            node, each yielded once a worker is available for it.
+        """
+        claims = self._claims()
+        while True:
+            self._wait_for_worker_limits()
+            mirror = next(claims, None)
+            if mirror is None:
+                break
+            yield mirror
+
     def _signal_handler(self, signal_, _):
         """React to signals to bring about graceful shutdown of workers."""
         worker: Synchronizer
         _log.debug('caught signal %r; halting all workers', signal_)
         for worker in self._workers:
             worker.stop()
+        if self._hook_pool:
+            self._hook_pool.stop()
+        self._close_reporters()
         _log.debug('all workers stopped or killed; shutting down')
         raise SignalException(f'caught signal {signal_!r}')
 
@@ -154,25 +355,375 @@ class MirrorManager(object):
             _log.debug('waiting for a worker to retire before starting more')
             sleep(60)
 
-    def run(self):
+    def _load_mirrors(self):
+        """
+        Load the configuration that declares the mirrors, expanding any
+        templates and bulk declarations into the table of mirrors.
+        """
+        filename = self.cli.args.config_filename
+        self.default_conf = DefaultConfig(filename)
+        self.mirror_table = MirrorTable(filename,
+                                        MirrorsConfig(filename).mirrors)
+        _log.debug('enabled mirrors: %r', self.mirror_table.enabled)
+
+    def _mirror_config(self, mirror: str) -> ExpandedMirrorConfig:
+        """
+        :return:
+            The configuration for the named mirror.
+        """
+        return self.mirror_table[mirror]
+
+    def _preflight(self):
+        """
+        Check every enabled mirror concurrently, if so configured, and drop
+        from the cycle those that would surely fail.
+        """
+        if not self.mirrmaid_conf.preflight:
+            return
+        preflight = Preflight(
+            lambda mirror: self._synchronizer(
+                mirror, dry_run=self.cli.args.dry_run),
+            self.mirrmaid_conf.preflight_workers,
+            self.mirrmaid_conf.preflight_timeout,
+            self._expected_incoming,
+        )
+        preflight.run(self.mirror_table.enabled)
+        dropped = len(preflight.checks) - len(preflight.passed)
+        if dropped:
+            _log.error('pre-flight check dropped %d of %d mirrors:\n%s',
+                       dropped, len(preflight.checks), preflight)
+        else:
+            _log.info('pre-flight check passed all %d mirrors:\n%s',
+                      len(preflight.checks), preflight)
+        self.mirror_table.enabled = preflight.passed
+
+    def _prepare(self):
+        """Establish the configuration common to all commands."""
         self._config_logger()
         _log.debug('using config file: %r', self.cli.args.config_filename)
         self.mirrmaid_conf = MirrmaidConfig(self.cli.args.config_filename)
+
+    def _start_worker(self, mirror: str):
+        """
+        Start a worker, as a thread or a child process, for the named mirror.
+
+        :return:
+            The worker.
+        """
+        _log.debug('processing mirror: %r', mirror)
+        worker = self._synchronizer(
+            mirror,
+            dry_run=self.cli.args.dry_run,
+            hook_pool=self._hook_pool,
+            reporters=self._reporters,
+        )
+        if self._events:
+            worker = SynchronizerProcess(
+                worker, self._events,
+                self.mirrmaid_conf.worker_log_level,
+            )
+        self._workers.append(worker)
+        worker.start()
+        return worker
+
+    def _synchronizer(self, mirror: str, cls=Synchronizer,
+                      **kwargs) -> Synchronizer:
+        """
+        :param cls:
+            The class of Synchronizer to be created.
+
+        :return:
+            A new Synchronizer for the named mirror.
+        """
+        kwargs.setdefault('expected_incoming',
+                          self._expected_incoming.get(mirror))
+        return cls(self.default_conf, self._mirror_config(mirror), **kwargs)
+
+    def _wait_for_workers(self):
+        """Block until all workers have retired."""
+        worker: Synchronizer
+        for worker in self._workers:
+            worker.join()
+
+    def _watch(self, spool: TriggerSpool, queue: TriggerQueue):
+        worker: Synchronizer
+        self._workers = []
+        _log.info('watching for triggers in %r', spool.directory)
+        while True:
+            for mirror in spool.take():
+                if mirror in self.mirror_table.enabled:
+                    _log.info('mirror %r triggered', mirror)
+                    queue.add(mirror)
+                else:
+                    _log.warning('ignoring trigger for mirror %r, which is '
+                                 'not enabled', mirror)
+            for worker in list(self._workers):
+                if not worker.is_alive():
+                    self._workers.remove(worker)
+                    if worker.report and worker.report.outcome == LOCKED:
+                        queue.add(worker.name, time() + LOCKED_RETRY_DELAY)
+            running = {worker.name for worker in self._workers}
+            while (self._number_of_active_workers
+                   < self.mirrmaid_conf.max_workers):
+                mirror = queue.take(running)
+                if mirror is None:
+                    break
+                self._start_worker(mirror)
+                running.add(mirror)
+            sleep(self.mirrmaid_conf.watch_interval)
+
+    def history(self):
+        """Show trends from the run journal, as requested via the CLI."""
+        self._prepare()
+        args = self.cli.args
+        query = JournalQuery()
+        if args.report == 'slowest':
+            headers = ['MIRROR', 'RUNS', 'MEAN', 'MAX', 'MEAN RECEIVED']
+            rows = [
+                (m, n, format_duration(mean), format_duration(max_),
+                 format_bytes(received))
+                for m, n, mean, max_, received in query.slowest(
+                    args.days, args.mirror)
+            ]
+        elif args.report == 'failures':
+            headers = ['MIRROR', 'RUNS', 'FAILURES', 'RATE %']
+            rows = query.failure_rates(args.days, args.mirror)
+        elif args.report == 'capacity':
+            headers = ['FILESYSTEM', 'FREE', 'PER DAY', 'DAYS LEFT',
+                       'TARGETS']
+            rows = []
+            for device, targets, samples in query.capacity(args.days):
+                per_day, days_left = forecast(samples) or (None, None)
+                rows.append((
+                    format_device(device),
+                    format_bytes(samples[-1][1]),
+                    format_bytes(per_day),
+                    None if days_left is None else round(days_left, 1),
+                    ', '.join(targets),
+                ))
+        else:
+            headers = ['DAY', 'RUNS', 'RECEIVED', 'FILES']
+            rows = [
+                (day, n, format_bytes(received), files)
+                for day, n, received, files in query.bytes_per_day(
+                    args.days, args.mirror)
+            ]
+        print(format_table(headers, rows))
+
+    def list(self):
+        """Show the mirrors as expanded, as requested via the CLI."""
+        self._prepare()
+        self._load_mirrors()
+        table = self.mirror_table
+        enabled = set(table.enabled)
+        headers = ['MIRROR', 'TEMPLATE', 'SOURCE', 'TARGET']
+        if self.cli.args.all:
+            headers.insert(1, 'ENABLED')
+            mirrors = table.enabled + [m for m in table if m not in enabled]
+        else:
+            mirrors = table.enabled
+        rows = []
+        for mirror in mirrors:
+            conf = table[mirror]
+            row = [mirror, table.template(mirror),
+                   conf.get('source', required=False),
+                   conf.get('target', required=False)]
+            if self.cli.args.all:
+                row.insert(1, 'yes' if mirror in enabled else 'no')
+            rows.append(row)
+        print(format_table(headers, rows))
+
+    def plan(self):
+        """Estimate the cost of the next cycle, as requested via the CLI."""
+        self._prepare()
+        self._config_proxy()
+        self._load_mirrors()
+        if self.mirrmaid_conf.journal:
+            throughput = JournalQuery().throughput(DEFAULT_HISTORY_DAYS)
+        else:
+            throughput = {}
+        planner = Planner(
+            [self._synchronizer(m) for m in self.mirror_table.enabled],
+            self.mirrmaid_conf.plan_workers,
+            self.mirrmaid_conf.max_workers,
+            throughput,
+        )
+        planner.run()
+        print(planner)
+
+    def purge(self):
+        """
+        Empty the trash directories of mirrors deferring their deletions, as
+        requested via the CLI.
+
+        Purging happens at idle priority, in throttled batches and only within
+        the purge window.  A mirror's trash is never purged while the mirror
+        is synchronized.
+        """
+        self._prepare()
+        self._load_mirrors()
+        mirrors = self.cli.args.mirrors or self.mirror_table.enabled
+        for mirror in mirrors:
+            if mirror not in self.mirror_table.enabled:
+                raise MirrmaidRuntimeException(
+                    f'mirror {mirror!r} is not enabled')
+        purger = Purger(
+            self.mirrmaid_conf.purge_batch_size,
+            self.mirrmaid_conf.purge_batch_pause,
+            self.mirrmaid_conf.purge_window,
+        )
+        if not purger.within_window:
+            _log.info('not purging outside of the purge window')
+            return
+        lock = LockFile(os.path.join(LOCK_DIRECTORY, '.purge'),
+                        pid=os.getpid())
+        try:
+            lock.exclusive_lock()
+        except LockException:
+            _log.info('not purging since another process is purging')
+            return
+        rows = []
+        try:
+            purger.lower_priority()
+            for mirror in mirrors:
+                if not purger.within_window:
+                    break
+                directory = trash_directory(self._mirror_config(mirror))
+                if not os.path.isdir(directory):
+                    continue
+                files, size, seconds, finished = purger.purge(mirror,
+                                                              directory)
+                rows.append((mirror, files, format_bytes(size),
+                             format_duration(seconds),
+                             'yes' if finished else 'no'))
+        finally:
+            lock.unlock(delete_file=True)
+        print(format_table(
+            ['MIRROR', 'FILES', 'BYTES', 'DURATION', 'FINISHED'], rows))
+
+    def trigger(self):
+        """Request immediate runs of mirrors, as requested via the CLI."""
+        self._prepare()
+        self._load_mirrors()
+        spool = TriggerSpool()
+        for mirror in self.cli.args.mirrors:
+            if mirror not in self.mirror_table.enabled:
+                raise MirrmaidRuntimeException(
+                    f'mirror {mirror!r} is not enabled')
+            spool.add(mirror)
+
+    def verify(self):
+        """
+        Verify the integrity of mirror targets, as requested via the CLI.
+
+        Each mirror is locked while it is verified so that a synchronization
+        in progress cannot be mistaken for corruption.  Any files that fail
+        verification are queued to be fetched again and the mirror is
+        triggered.
+
+        :raises MirrmaidRuntimeException:
+            If any files failed verification.
+        """
+        self._prepare()
+        self._load_mirrors()
+        mirrors = self.cli.args.mirrors or self.mirror_table.enabled
+        for mirror in mirrors:
+            if mirror not in self.mirror_table.enabled:
+                raise MirrmaidRuntimeException(
+                    f'mirror {mirror!r} is not enabled')
+        state = VerifyState()
+        verifier = Verifier(state, self.mirrmaid_conf.verify_workers,
+                            self.cli.args.all)
+        results = []
+        try:
+            for mirror in mirrors:
+                lock = LockFile(os.path.join(LOCK_DIRECTORY, mirror),
+                                pid=os.getpid())
+                try:
+                    lock.exclusive_lock()
+                except LockException:
+                    _log.warning('not verifying mirror %r since it is locked '
+                                 'by another process', mirror)
+                    continue
+                try:
+                    results.append(verifier.run(self._mirror_config(mirror)))
+                finally:
+                    lock.unlock(delete_file=True)
+        finally:
+            state.close()
+        print(format_table(
+            ['MIRROR', 'MANIFESTS', 'LISTED', 'MISSING', 'UNCHANGED',
+             'VERIFIED', 'MISMATCHED', 'ERRORS'],
+            [(r.mirror, r.manifests, r.listed, r.missing, r.unchanged,
+              r.verified, len(r.mismatched), r.errors) for r in results]
+        ))
+        mismatched = [r for r in results if r.mismatched]
+        if mismatched:
+            spool = TriggerSpool()
+            for result in mismatched:
+                spool.add(result.mirror)
+            raise MirrmaidRuntimeException(
+                f'{sum(len(r.mismatched) for r in mismatched)} files failed '
+                f'verification and are queued to be fetched again')
+
+    def watch(self):
+        """
+        Synchronize mirrors as they are triggered, until signalled to stop.
+
+        Each triggered mirror is started as soon as it is not already running
+        and a worker is available for it.  A mirror found locked by another
+        mirrmaid process (e.g., one run by cron) is retried later.
+
+        :raises MirrmaidRuntimeException:
+            If the workers are configured to run within an asyncio event loop,
+            which does not take triggers.
+        """
+        self._prepare()
+        if self.mirrmaid_conf.worker_mode == 'asyncio':
+            raise MirrmaidRuntimeException(
+                "worker_mode 'asyncio' is not supported by the watch command; "
+                "use 'thread' or 'process' instead")
         self._config_proxy()
         self._config_summarizer()
-        self._log_environment()
-        self.default_conf = DefaultConfig(self.cli.args.config_filename)
-        self.mirrors_conf = MirrorsConfig(self.cli.args.config_filename)
-        _log.debug('enabled mirrors: %r', self.mirrors_conf.mirrors)
-        self._config_signal_handler()
-        self._workers = []
-        for mirror in self.mirrors_conf.mirrors:
-            self._wait_for_worker_limits()
-            _log.debug('processing mirror: %r', mirror)
-            worker = Synchronizer(
-                self.default_conf,
-                MirrorConfig(self.cli.args.config_filename, mirror),
-                dry_run=self.cli.args.dry_run,
-            )
-            self._workers.append(worker)
-            worker.start()
+        self._config_log_collector()
+        try:
+            self._log_environment()
+            self._load_mirrors()
+            self._config_signal_handler()
+            self._reporters = get_reporters(self.mirrmaid_conf.reporters)
+            if self.mirrmaid_conf.journal:
+                self._reporters.append(RunJournal())
+            self._config_capacity()
+            self._config_cgroups()
+            self._config_workers()
+            self._watch(TriggerSpool(), TriggerQueue())
+        finally:
+            if self._log_collector:
+                self._log_collector.stop()
+
+    def run(self):
+        self._prepare()
+        self._config_proxy()
+        self._config_summarizer()
+        self._config_log_collector()
+        try:
+            self._log_environment()
+            self._load_mirrors()
+            self._config_signal_handler()
+            self._reporters = get_reporters(self.mirrmaid_conf.reporters)
+            if self.mirrmaid_conf.journal:
+                self._reporters.append(RunJournal())
+            self._config_capacity()
+            self._preflight()
+            self._config_cluster()
+            self._config_cgroups()
+            self._config_workers()
+            if self.mirrmaid_conf.worker_mode == 'asyncio':
+                self._run_engine()
+            else:
+                self._run_workers()
+            self._close_reporters()
+            self._deduplicate()
+        finally:
+            if self._log_collector:
+                self._log_collector.stop()
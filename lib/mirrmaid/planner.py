@@ -0,0 +1,205 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the planner, which estimates the cost of the next
+synchronization cycle by means of concurrent rsync dry-runs.
+"""
+
+import heapq
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import PIPE, Popen
+from time import monotonic
+
+from mirrmaid.stats import RsyncStats
+from mirrmaid.synchronizer import Synchronizer
+from mirrmaid.table import format_bytes, format_duration, format_table
+from mirrmaid.timing import PHASE_OPTIONS, VERBOSE_PHASE_OPTIONS
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.planner')
+
+# rsync options that only add output volume, which the planner does not need.
+_QUIET_OPTIONS = {'--verbose', '-v', '--progress', '--itemize-changes', '-i',
+                  *PHASE_OPTIONS, *VERBOSE_PHASE_OPTIONS}
+
+
+class MirrorEstimate(object):
+    """The estimated cost of synchronizing a single mirror."""
+
+    def __init__(self, mirror: str):
+        self.mirror = mirror
+        self.exit_code = None
+        self.errors = []
+        self.probe_time = None
+        self.stats = RsyncStats()
+        self.duration = None
+
+    @property
+    def bytes(self):
+        return self.stats.get(RsyncStats.TOTAL_TRANSFERRED_FILE_SIZE)
+
+    @property
+    def deletions(self):
+        return self.stats.get(RsyncStats.DELETED_FILES)
+
+    @property
+    def files(self):
+        return self.stats.get(RsyncStats.FILES_TRANSFERRED)
+
+
+def dry_run_stats(synchronizer: Synchronizer) -> MirrorEstimate:
+    """
+    Run rsync for a mirror in its dry-run mode with statistics.
+
+    :param synchronizer:
+        A (not started) Synchronizer for the mirror, from which the rsync
+        command is derived.
+
+    :return:
+        The MirrorEstimate for the mirror, lacking only its duration.
+    """
+    estimate = MirrorEstimate(synchronizer.name)
+    cmd = [arg for arg in synchronizer.rsync_command
+           if arg not in _QUIET_OPTIONS]
+    for option in ['--dry-run', '--stats']:
+        if option not in cmd:
+            cmd.insert(1, option)
+    _log.debug('spawning %r', cmd)
+    started = monotonic()
+    try:
+        process = Popen(cmd, stdout=PIPE, stderr=PIPE,
+                        universal_newlines=True)
+    except OSError as e:
+        estimate.errors.append(str(e))
+        return estimate
+    out, err = process.communicate()
+    estimate.probe_time = monotonic() - started
+    estimate.exit_code = process.returncode
+    for line in out.splitlines():
+        estimate.stats.feed(line)
+    estimate.errors = [line for line in err.splitlines() if line.strip()]
+    return estimate
+
+
+def makespan(durations: list, workers: int) -> float:
+    """
+    Project the wall-clock duration of a cycle.
+
+    The mirrors are started in order, each as soon as one of the *workers*
+    is free, just as the MirrorManager does.
+
+    :param durations:
+        The estimated duration of each mirror, in cycle order.
+
+    :param workers:
+        The number of concurrent workers.
+
+    :return:
+        The projected duration of the entire cycle, in seconds.
+    """
+    finish_times = [0.0] * workers
+    for duration in durations:
+        start = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, start + duration)
+    return max(finish_times)
+
+
+class Planner(object):
+    """
+    Estimates the cost of the next synchronization cycle.
+
+    Every mirror is dry-run concurrently, since dry-runs write nothing to the
+    targets, and the volume that would be transferred is combined with the
+    historical rates of transfer (from the run journal) to estimate how long
+    each mirror, and therefore the cycle, would take.
+    """
+
+    def __init__(self, synchronizers: list, workers: int, max_workers: int,
+                 throughput: dict = None):
+        """
+        Initialize the Planner object.
+
+        :param synchronizers:
+            A (not started) Synchronizer for each mirror in cycle order.
+
+        :param workers:
+            The number of dry-runs to be run concurrently.
+
+        :param max_workers:
+            The number of concurrent workers for a real cycle.
+
+        :param throughput:
+            A dictionary mapping mirror names to their historical rate of
+            transfer, in bytes per second.  The rate for key ``None``, if
+            any, applies to mirrors lacking their own.
+        """
+        self.synchronizers = synchronizers
+        self.workers = workers
+        self.max_workers = max_workers
+        self.throughput = throughput or {}
+        self.estimates = []
+
+    def _estimate_duration(self, estimate: MirrorEstimate):
+        if estimate.exit_code != 0 or estimate.probe_time is None:
+            return
+        # The dry-run costs roughly what the file-list exchange of a real
+        # run will cost; the transfer comes on top of that.
+        rate = self.throughput.get(estimate.mirror,
+                                   self.throughput.get(None))
+        estimate.duration = estimate.probe_time
+        if estimate.bytes and rate:
+            estimate.duration += estimate.bytes / rate
+
+    def run(self) -> list:
+        """
+        Perform the dry-runs.
+
+        :return:
+            The list of MirrorEstimate objects in cycle order.
+        """
+        with ThreadPoolExecutor(self.workers) as executor:
+            self.estimates = list(
+                executor.map(dry_run_stats, self.synchronizers)
+            )
+        for estimate in self.estimates:
+            self._estimate_duration(estimate)
+        return self.estimates
+
+    def __str__(self):
+        headers = ['MIRROR', 'FILES', 'BYTES', 'DELETIONS', 'ESTIMATE',
+                   'STATUS']
+        rows = []
+        for e in self.estimates:
+            if e.exit_code == 0:
+                status = 'ok'
+            elif e.errors:
+                status = e.errors[-1]
+            else:
+                status = f'rsync exit code={e.exit_code}'
+            rows.append((e.mirror, e.files, format_bytes(e.bytes),
+                         e.deletions, format_duration(e.duration), status))
+        durations = [e.duration for e in self.estimates
+                     if e.duration is not None]
+        total = sum(e.bytes or 0 for e in self.estimates)
+        lines = [
+            format_table(headers, rows),
+            '',
+            f'total to transfer: {format_bytes(total)}',
+            f'projected cycle duration with max_workers={self.max_workers}: '
+            f'{format_duration(makespan(durations, self.max_workers))}',
+        ]
+        if len(durations) < len(self.estimates):
+            lines.append('(mirrors without an estimate are not included)')
+        elif not self.throughput.get(None):
+            lines.append('(no transfer history in the run journal; '
+                         'estimates include file-list time only)')
+        return '\n'.join(lines)
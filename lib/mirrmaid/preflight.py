@@ -0,0 +1,239 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the pre-flight check, which validates every enabled
+mirror concurrently before a cycle begins.  Otherwise a bad ``source``,
+a missing target or wrong permissions only come to light once a worker
+finally reaches the mirror, which may be hours into the cycle.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from configparser import Error
+from subprocess import DEVNULL, PIPE, TimeoutExpired, run
+from time import monotonic
+
+from mirrmaid.capacity import HISTORY, NONE, SPACE_CHECKS, free_space
+from mirrmaid.constants import *
+from mirrmaid.exceptions import (
+    MirrmaidRuntimeException,
+    SynchronizerException,
+)
+from mirrmaid.table import format_bytes, format_table
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.preflight')
+
+
+def _is_remote(uri: str) -> bool:
+    """
+    :return:
+        ``True`` iff the *uri* names a remote location, being either of the
+        ``rsync://HOST/...``, ``HOST::MODULE`` or ``HOST:PATH`` forms.
+    """
+    return ':' in uri.split('/', 1)[0]
+
+
+def _existing_ancestor(path: str) -> str:
+    """
+    :return:
+        The *path* or else, its nearest ancestor that exists.
+    """
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return path
+
+
+class MirrorCheck(object):
+    """The outcome of the pre-flight check of a single mirror."""
+
+    def __init__(self, mirror: str):
+        self.mirror = mirror
+        self.problems = []
+        self.free = None
+        self.locked = None
+        self.probe_time = None
+
+    @property
+    def passed(self) -> bool:
+        """
+        :return:
+            ``True`` iff the mirror may be synchronized.
+        """
+        return not self.problems
+
+
+class Preflight(object):
+    """
+    Checks every mirror concurrently for what would surely make its
+    synchronization fail: an invalid configuration, a target that cannot be
+    written or whose filesystem lacks the space to be reserved, and an
+    upstream that cannot be reached.  The lock of each mirror is noted too,
+    though it may well be released by the time the mirror's turn comes.
+    """
+
+    def __init__(self, synchronizer, workers: int, timeout: int,
+                 expected_incoming: dict = None):
+        """
+        Initialize the Preflight object.
+
+        :param synchronizer:
+            A function returning a new (not started) Synchronizer for the
+            named mirror.
+
+        :param workers:
+            The number of mirrors to be checked concurrently.
+
+        :param timeout:
+            Seconds after which the upstream of a mirror is deemed
+            unreachable.
+
+        :param expected_incoming:
+            A dictionary mapping mirror names to the bytes they are expected
+            to receive according to the run journal.
+        """
+        self.synchronizer = synchronizer
+        self.workers = workers
+        self.timeout = timeout
+        self.expected_incoming = expected_incoming or {}
+        self.checks = []
+
+    def _check_space(self, check: MirrorCheck, mirror_conf):
+        free = free_space(mirror_conf.target)
+        if free is None:
+            return
+        _, check.free = free
+        if mirror_conf.space_check == NONE:
+            return
+        needed = mirror_conf.space_reserve
+        if mirror_conf.space_check == HISTORY:
+            needed += self.expected_incoming.get(check.mirror) or 0
+        if needed > check.free:
+            check.problems.append(
+                f'about {format_bytes(needed)} is needed but only '
+                f'{format_bytes(check.free)} is free on the target '
+                f'filesystem')
+
+    @staticmethod
+    def _check_target(check: MirrorCheck, target: str):
+        if _is_remote(target):
+            return
+        if os.path.exists(target) and not os.path.isdir(target):
+            check.problems.append(f'target {target!r} is not a directory')
+            return
+        # A missing target is created by rsync within its nearest ancestor.
+        path = _existing_ancestor(target)
+        if not os.access(path, os.W_OK | os.X_OK):
+            check.problems.append(f'{path!r} is not writable')
+
+    def _probe(self, check: MirrorCheck, source: str):
+        """
+        Ask the upstream to list just the source directory itself, which is
+        about as cheap as a connection to the upstream can be.
+        """
+        if not _is_remote(source):
+            if not os.path.isdir(source):
+                check.problems.append(f'source {source!r} is not a directory')
+            return
+        cmd = [RSYNC, '--list-only', '--dirs', '--no-motd',
+               f'--timeout={self.timeout}']
+        if source.startswith('rsync://') or '::' in source:
+            cmd.append(f'--contimeout={self.timeout}')
+        cmd.append(source.rstrip('/') or source)
+        _log.debug('spawning %r', cmd)
+        started = monotonic()
+        try:
+            result = run(cmd, stdin=DEVNULL, stdout=DEVNULL, stderr=PIPE,
+                         universal_newlines=True, timeout=self.timeout)
+        except TimeoutExpired:
+            check.problems.append(
+                f'upstream did not respond within {self.timeout}s')
+            return
+        except OSError as e:
+            check.problems.append(f'cannot probe upstream because: {e}')
+            return
+        if result.returncode != os.EX_OK:
+            errors = [line for line in result.stderr.splitlines()
+                      if line.strip()]
+            check.problems.append(
+                errors[0] if errors
+                else f'upstream probe exit code={result.returncode}')
+            return
+        check.probe_time = monotonic() - started
+
+    def check(self, mirror: str) -> MirrorCheck:
+        """
+        Check a single mirror.
+
+        :return:
+            The MirrorCheck for the mirror.
+        """
+        check = MirrorCheck(mirror)
+        try:
+            synchronizer = self.synchronizer(mirror)
+            mirror_conf = synchronizer.mirror_conf
+            # Deriving the command validates every option that shapes it.
+            synchronizer.rsync_command
+            if mirror_conf.space_check not in SPACE_CHECKS:
+                raise SynchronizerException(
+                    f'space_check {mirror_conf.space_check!r} is not one of '
+                    f'{SPACE_CHECKS!r}')
+        except (Error, KeyError, MirrmaidRuntimeException,
+                SynchronizerException, ValueError) as e:
+            check.problems.append(f'invalid configuration: {e}')
+            return check
+        self._check_target(check, mirror_conf.target)
+        self._check_space(check, mirror_conf)
+        check.locked = os.path.exists(synchronizer.lock_file.name)
+        self._probe(check, mirror_conf.source)
+        return check
+
+    def run(self, mirrors: list) -> list:
+        """
+        Check the mirrors.
+
+        :param mirrors:
+            The names of the mirrors in cycle order.
+
+        :return:
+            The list of MirrorCheck objects in cycle order.
+        """
+        with ThreadPoolExecutor(self.workers) as executor:
+            self.checks = list(executor.map(self.check, mirrors))
+        return self.checks
+
+    @property
+    def passed(self) -> list:
+        """
+        :return:
+            The names of the mirrors that passed, in cycle order.
+        """
+        return [c.mirror for c in self.checks if c.passed]
+
+    def __str__(self):
+        headers = ['MIRROR', 'RESULT', 'FREE', 'LOCK', 'PROBE_SECS',
+                   'PROBLEMS']
+        rows = []
+        for c in self.checks:
+            if c.locked is None:
+                lock = None
+            else:
+                lock = 'held' if c.locked else 'free'
+            if c.probe_time is None:
+                probe = None
+            else:
+                probe = round(c.probe_time, 2)
+            rows.append((c.mirror, 'ok' if c.passed else 'dropped',
+                         format_bytes(c.free), lock, probe,
+                         '; '.join(c.problems) or None))
+        return format_table(headers, rows)
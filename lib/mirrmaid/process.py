@@ -0,0 +1,277 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the process-based worker mode, in which each
+Synchronizer runs within its own child process.  The child drains the output
+of its rsync process itself, so the manager process need not compete for the
+GIL with dozens of reader threads.  Log records and the RunReport flow back
+to the manager through a queue.
+
+The children are spawned, rather than forked, since the manager has threads
+of its own (e.g., the receiver of those events) whose locks a forked child
+could inherit while held.  A child therefore builds its Synchronizer anew
+from the (pickled) configuration.
+"""
+
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import signal
+from threading import Event, Thread
+
+from mirrmaid.reporting import Reporter, RunReport
+from mirrmaid.synchronizer import STOP_TIMEOUT, Synchronizer
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.process')
+
+CONTEXT = multiprocessing.get_context('spawn')
+
+# Kinds of events sent from a child process to the manager.
+_LOG = 'log'
+_REPORT = 'report'
+# The kind of event sent by the manager itself once a child has exited.
+_EXITED = 'exited'
+
+
+class _QueueReporter(Reporter):
+    """Forwards each RunReport from a child process to the manager."""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def report(self, run_report: RunReport):
+        self.queue.put((_REPORT, run_report))
+
+
+class _QueueLogHandler(logging.handlers.QueueHandler):
+    """Forwards each log record from a child process to the manager."""
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put((_LOG, record))
+
+
+class _FlaggingHookPool(object):
+    """
+    Wraps a HookPool to make known to the manager when the child process is
+    running its post-sync hooks.
+    """
+
+    def __init__(self, hook_pool, flag):
+        self.hook_pool = hook_pool
+        self.flag = flag
+
+    def run(self, *args, **kwargs) -> list:
+        self.flag.value = 1
+        try:
+            return self.hook_pool.run(*args, **kwargs)
+        finally:
+            self.flag.value = 0
+
+    def stop(self):
+        self.hook_pool.stop()
+
+
+def _configured_levels() -> dict:
+    """
+    :return:
+        A dictionary mapping the name of each logger having a level of its
+        own to that level, with the root logger named ``''``.
+    """
+    levels = {'': logging.getLogger().level}
+    for name, logger in logging.Logger.manager.loggerDict.items():
+        if isinstance(logger, logging.Logger) and logger.level:
+            levels[name] = logger.level
+    return levels
+
+
+def _child(args: tuple, kwargs: dict, queue, hooks_flag, levels: dict,
+           log_level: int):
+    """Run a Synchronizer; this is the child process."""
+    synchronizer = Synchronizer(*args, **kwargs)
+
+    def stop(*_):
+        synchronizer.stop()
+        if synchronizer.hook_pool:
+            synchronizer.hook_pool.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    for signal_ in [signal.SIGHUP, signal.SIGINT, signal.SIGQUIT]:
+        # The manager will see these and stop the child as appropriate.
+        signal.signal(signal_, signal.SIG_IGN)
+    # Records pass the same loggers as they would have within the manager and
+    # all that do are forwarded, unless limited further by the log_level.
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level)
+    handler = _QueueLogHandler(queue)
+    handler.setLevel(log_level)
+    logging.getLogger().addHandler(handler)
+    synchronizer.reporters = [_QueueReporter(queue)]
+    if synchronizer.hook_pool:
+        synchronizer.hook_pool = _FlaggingHookPool(synchronizer.hook_pool,
+                                                   hooks_flag)
+    synchronizer.run()
+
+
+class ProcessEvents(object):
+    """
+    Receives the events of all SynchronizerProcess children on behalf of the
+    manager.
+
+    Log records are handled as though they had been logged within the
+    manager process and RunReports are delivered to the manager's reporters.
+    """
+
+    def __init__(self, reporters: list):
+        """
+        Initialize the ProcessEvents object and start receiving.
+
+        :param reporters:
+            The Reporter objects that are to receive each RunReport.
+        """
+        self.reporters = reporters
+        self.queue = CONTEXT.Queue()
+        self._workers = {}
+        self._receiver = Thread(target=self._receive, name='process-events',
+                                daemon=True)
+        self._receiver.start()
+
+    def _receive(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                break
+            kind, payload = event
+            if kind == _LOG:
+                logging.getLogger(payload.name).handle(payload)
+            elif kind == _REPORT:
+                self._report(payload)
+            elif kind == _EXITED:
+                self._workers[payload].handled.set()
+
+    def _report(self, run_report: RunReport):
+        worker = self._workers.get(run_report.mirror)
+        if worker:
+            worker.report = run_report
+            worker.exit_code = run_report.exit_code
+        for reporter in self.reporters:
+            # noinspection PyBroadException
+            try:
+                reporter.report(run_report)
+            except Exception as e:
+                _log.error('reporter %r failed because: %s', reporter, e)
+
+    def close(self):
+        """
+        Handle all events already sent and stop receiving.
+
+        This must only be called once all children have exited.
+        """
+        self.queue.put(None)
+        self._receiver.join()
+
+    def register(self, worker):
+        self._workers[worker.name] = worker
+
+
+class SynchronizerProcess(object):
+    """
+    Runs a Synchronizer within a child process.
+
+    This provides the same interface as a Synchronizer thread, as far as the
+    MirrorManager is concerned.
+    """
+
+    def __init__(self, synchronizer: Synchronizer, events: ProcessEvents,
+                 log_level: int):
+        """
+        Initialize the SynchronizerProcess object.
+
+        :param synchronizer:
+            The (not started) Synchronizer to be run within the child process.
+            The child builds its own from the same arguments, except that its
+            reporters are replaced with one that forwards to *events*.  Any
+            HookPool must therefore limit its slots with a semaphore of
+            CONTEXT.
+
+        :param events:
+            The receiver of events from the child process.
+
+        :param log_level:
+            Only log records at this level or higher are forwarded by the
+            child process, in addition to the levels configured for the
+            loggers.
+        """
+        self.synchronizer = synchronizer
+        self.mirror_conf = synchronizer.mirror_conf
+        self.name = synchronizer.name
+        self.events = events
+        self.log_level = log_level
+        self.exit_code = None
+        self.report = None
+        # Set once every event of the child has been handled.
+        self.handled = Event()
+        self._exit_noted = False
+        self._hooks_flag = CONTEXT.Value('b', 0, lock=False)
+        args = (synchronizer.default_conf, synchronizer.mirror_conf)
+        kwargs = {
+            'dry_run': synchronizer.dry_run,
+            'hook_pool': synchronizer.hook_pool,
+            'expected_incoming': synchronizer.expected_incoming,
+        }
+        self._process = CONTEXT.Process(
+            target=_child, name=f'mirrmaid-{self.name}',
+            args=(args, kwargs, events.queue, self._hooks_flag,
+                  _configured_levels(), log_level),
+        )
+        events.register(self)
+
+    @property
+    def running_hooks(self) -> bool:
+        return bool(self._hooks_flag.value)
+
+    def _note_exit(self):
+        """
+        Follow the events of the exited child with one of the manager's own.
+
+        The child flushes its events before it exits, so the receiver handles
+        them, including the RunReport, before this one.
+        """
+        if not self._exit_noted:
+            self._exit_noted = True
+            self.events.queue.put((_EXITED, self.name))
+
+    def is_alive(self) -> bool:
+        if self._process.is_alive():
+            return True
+        self._note_exit()
+        return not self.handled.is_set()
+
+    def join(self, timeout=None):
+        self._process.join(timeout)
+        if not self._process.is_alive():
+            self._note_exit()
+            self.handled.wait(timeout)
+
+    def start(self):
+        self._process.start()
+
+    def stop(self):
+        """Force termination of the child process and its rsync."""
+        if self._process.pid is None:
+            return
+        self._process.terminate()
+        self._process.join(STOP_TIMEOUT + 5)
+        if self._process.is_alive():
+            _log.info('killing %s', self._process.name)
+            os.kill(self._process.pid, signal.SIGKILL)
+            self._process.join()
@@ -0,0 +1,181 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the reporting of each Synchronizer run, including its
+outcome, phase timings and transfer statistics, through a pluggable
+interface of reporters.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from importlib import import_module
+from threading import Lock
+from time import time
+
+from mirrmaid.exceptions import MirrmaidRuntimeException
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# Outcomes of a Synchronizer run.
+DEFERRED = 'deferred'
+FAILURE = 'failure'
+LOCKED = 'locked'
+SIGNALLED = 'signalled'
+STALLED = 'stalled'
+SUCCESS = 'success'
+TIMEOUT = 'timeout'
+
+
+class RunReport(object):
+    """The outcome of a single Synchronizer run."""
+
+    def __init__(self, mirror: str, source: str, target: str,
+                 dry_run: bool = False):
+        self.mirror = mirror
+        self.source = source
+        self.target = target
+        self.dry_run = dry_run
+        self.started = time()
+        self.finished = None
+        self.exit_code = None
+        self.outcome = None
+        self.phases = OrderedDict()
+        self.stats = {}
+        self.hooks = []
+        self.target_device = None
+        self.target_free = None
+
+    @property
+    def elapsed(self) -> float:
+        """
+        :return:
+            The wall-clock duration of the run, in seconds.
+        """
+        return (self.finished or time()) - self.started
+
+    def as_dict(self) -> dict:
+        """
+        :return:
+            The report as a dictionary suitable for JSON serialization.
+        """
+        return OrderedDict([
+            ('mirror', self.mirror),
+            ('source', self.source),
+            ('target', self.target),
+            ('dry_run', self.dry_run),
+            ('started', self.started),
+            ('finished', self.finished),
+            ('elapsed', self.elapsed),
+            ('exit_code', self.exit_code),
+            ('outcome', self.outcome),
+            ('phases', self.phases),
+            ('stats', self.stats),
+            ('hooks', [h._asdict() for h in self.hooks]),
+            ('target_device', self.target_device),
+            ('target_free', self.target_free),
+        ])
+
+    def finish(self, exit_code, outcome: str):
+        self.finished = time()
+        self.exit_code = exit_code
+        self.outcome = outcome
+
+
+class Reporter(ABC):
+    """
+    The interface for receiving a RunReport at the conclusion of each
+    Synchronizer run.
+
+    Reporters may be called concurrently from several Synchronizers.
+    """
+
+    def close(self):
+        """Release any resources held by the reporter."""
+        pass
+
+    @abstractmethod
+    def report(self, run_report: RunReport):
+        """Receive the RunReport of a concluded Synchronizer run."""
+
+
+class CallableReporter(Reporter):
+    """Passes each RunReport to an arbitrary Python callable."""
+
+    def __init__(self, name: str):
+        """
+        :param name:
+            The callable's name in ``'MODULE:ATTRIBUTE'`` form.
+        """
+        module, _, attribute = name.partition(':')
+        try:
+            self.function = getattr(import_module(module), attribute)
+        except (ImportError, AttributeError, ValueError) as e:
+            raise MirrmaidRuntimeException(
+                f'cannot load reporter {name!r} because: {e}') from None
+
+    def report(self, run_report: RunReport):
+        self.function(run_report)
+
+
+class FileReporter(Reporter):
+    """Appends each RunReport as a line of JSON to a metrics file."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._lock = Lock()
+
+    def report(self, run_report: RunReport):
+        line = json.dumps(run_report.as_dict())
+        with self._lock:
+            with open(self.filename, 'a') as f:
+                f.write(line + '\n')
+
+
+class LogReporter(Reporter):
+    """Logs each RunReport's phase timings."""
+
+    def report(self, run_report: RunReport):
+        timings = ', '.join(f'{phase}={seconds:.1f}s'
+                            for phase, seconds in run_report.phases.items())
+        logging.getLogger(f'mirrmaid.{run_report.mirror}').info(
+            'run %s after %.1fs: %s',
+            run_report.outcome, run_report.elapsed, timings,
+        )
+
+
+def get_reporters(specs: list) -> list:
+    """
+    Instantiate the reporters as configured.
+
+    :param specs:
+        A list of reporter specifications, each being one of: ``'log'``,
+        ``'file:FILENAME'`` or ``'callable:MODULE:ATTRIBUTE'``.
+
+    :return:
+        A list of Reporter instances.
+
+    :raises MirrmaidRuntimeException:
+        If any specification is invalid.
+    """
+    result = []
+    for spec in specs:
+        kind, _, argument = spec.partition(':')
+        if kind == 'log' and not argument:
+            result.append(LogReporter())
+        elif kind == 'file' and argument:
+            result.append(FileReporter(argument))
+        elif kind == 'callable' and argument:
+            result.append(CallableReporter(argument))
+        else:
+            raise MirrmaidRuntimeException(
+                f'invalid reporter specification: {spec!r}')
+    return result
@@ -0,0 +1,245 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the per-mirror controls over the resources consumed by
+rsync: its CPU scheduling priority, its I/O scheduling class and priority and
+optionally, a cgroup (v2) of its own with CPU and I/O weights and I/O limits.
+
+All are effected by prefixing the rsync command so that they apply from the
+moment rsync starts and are inherited by every process it spawns.
+
+The cgroups of the mirrors are created within the cgroup in which mirrmaid
+itself was started, which must have been delegated to the user mirrmaid runs
+as, since rsync can only be moved between cgroups whose common ancestor that
+user may write.
+"""
+
+import errno
+import logging
+import os
+
+from mirrmaid.constants import *
+from mirrmaid.exceptions import MirrmaidRuntimeException, SynchronizerException
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# The I/O scheduling classes, as known to ionice(1), that mirrmaid may use.
+# The realtime class is not among them since it requires CAP_SYS_NICE, which
+# mirrmaid lacks once it has dropped its privileges.
+IONICE_CLASSES = {
+    'none': 0,
+    'best-effort': 2,
+    'idle': 3,
+}
+
+# The I/O scheduling classes that have priorities.
+_PRIORITIZED_CLASSES = ['best-effort']
+
+# Within the delegated cgroup, the leaf into which mirrmaid moves itself and
+# the parent of the mirrors' cgroups.  A cgroup whose children have
+# controllers enabled may not hold any processes itself.
+_MANAGER = 'manager'
+_MIRRORS = 'mirrors'
+
+# Moves the shell into the cgroup whose cgroup.procs is named by $0 and then
+# becomes the command given by the remaining arguments.
+_JOIN_CGROUP = 'echo $$ > "$0" && exec "$@"'
+
+
+def _write(path: str, value: str):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _enable(cgroup: str, controllers):
+    """Enable the *controllers* for the children of the *cgroup*."""
+    path = os.path.join(cgroup, 'cgroup.subtree_control')
+    with open(path) as f:
+        enabled = f.read().split()
+    for controller in sorted(set(controllers) - set(enabled)):
+        _write(path, f'+{controller}')
+
+
+def _own_cgroup() -> str:
+    """
+    :return:
+        The directory of the cgroup (v2) in which this process runs.
+    """
+    with open('/proc/self/cgroup') as f:
+        for line in f:
+            hierarchy, _, path = line.rstrip('\n').split(':', 2)
+            if hierarchy == '0':
+                return os.path.join(CGROUP_FS, path.lstrip('/'))
+    raise OSError(errno.ENOENT, 'not within a cgroup (v2) hierarchy')
+
+
+def delegate(controllers: list):
+    """
+    Prepare the cgroup in which mirrmaid was started to hold the cgroups of
+    the mirrors, by moving mirrmaid into a leaf of its own and enabling the
+    *controllers* for the mirrors.  This is harmless when repeated.
+
+    :raises MirrmaidRuntimeException:
+        If the cgroup has not been delegated to the user mirrmaid runs as,
+        e.g., by systemd's ``Delegate=`` setting.
+    """
+    try:
+        own = _own_cgroup()
+        base = own
+        if os.path.basename(own) == _MANAGER:
+            base = os.path.dirname(own)
+        for name in ['cgroup.procs', 'cgroup.subtree_control']:
+            if not os.access(os.path.join(base, name), os.W_OK):
+                raise OSError(errno.EACCES,
+                              f'cgroup {base!r} has not been delegated')
+        for name in [_MANAGER, _MIRRORS]:
+            os.makedirs(os.path.join(base, name), exist_ok=True)
+        if own == base:
+            # All threads move along with the process.
+            _write(os.path.join(base, _MANAGER, 'cgroup.procs'),
+                   str(os.getpid()))
+        _enable(base, controllers)
+        _enable(os.path.join(base, _MIRRORS), controllers)
+    except OSError as e:
+        raise MirrmaidRuntimeException(
+            f'cannot use cgroup controls because: {e}') from None
+
+
+class ResourceControls(object):
+    """The resource controls of a single mirror's rsync process."""
+
+    def __init__(self, mirror_conf, log: logging.Logger):
+        """
+        Initialize the ResourceControls object.
+
+        :param mirror_conf:
+            The MirrorConfig of the mirror.
+
+        :param log:
+            The logger of the mirror's Synchronizer.
+        """
+        self.mirror_conf = mirror_conf
+        self.log = log
+        self.directory = None
+        self.prefix = []
+        self._cgroup = False
+
+    @property
+    def _cgroup_settings(self) -> list:
+        """
+        :return:
+            A list of (name, value) tuples for the cgroup interface files to
+            be written, in order.
+        """
+        settings = []
+        cpu_weight = self.mirror_conf.cgroup_cpu_weight
+        if cpu_weight:
+            settings.append(('cpu.weight', str(cpu_weight)))
+        io_weight = self.mirror_conf.cgroup_io_weight
+        if io_weight:
+            settings.append(('io.weight', f'default {io_weight}'))
+        for limit in self.mirror_conf.cgroup_io_max:
+            # The kernel accepts the limits of only one device per write.
+            settings.append(('io.max', limit))
+        return settings
+
+    @property
+    def controllers(self) -> set:
+        """
+        :return:
+            The cgroup controllers needed by the mirror's settings.
+        """
+        return {name.split('.')[0] for name, _ in self._cgroup_settings}
+
+    @property
+    def _ionice_prefix(self) -> list:
+        class_ = self.mirror_conf.ionice_class
+        if class_ == 'realtime':
+            raise SynchronizerException(
+                "ionice_class 'realtime' requires privileges that mirrmaid "
+                "does not retain")
+        if class_ not in IONICE_CLASSES:
+            raise SynchronizerException(
+                f'ionice_class {class_!r} is not one of '
+                f'{list(IONICE_CLASSES)!r}')
+        if class_ == 'none':
+            return []
+        prefix = [IONICE, '-c', str(IONICE_CLASSES[class_])]
+        if class_ in _PRIORITIZED_CLASSES:
+            prefix += ['-n', str(self.mirror_conf.ionice_priority)]
+        return prefix
+
+    @property
+    def _nice_prefix(self) -> list:
+        nice = self.mirror_conf.nice
+        if nice < 0:
+            raise SynchronizerException(
+                f'nice {nice!r} is negative, which requires privileges that '
+                f'mirrmaid does not retain')
+        if not nice:
+            return []
+        return [NICE, '-n', str(nice)]
+
+    def _create_cgroup(self, settings: list) -> str:
+        """
+        Create the mirror's cgroup, enabling the controllers it needs.
+
+        :return:
+            The name of the cgroup's ``cgroup.procs`` file.
+        """
+        own = _own_cgroup()
+        if os.path.basename(own) != _MANAGER:
+            raise OSError(errno.EPERM,
+                          'mirrmaid has not moved into a delegated cgroup')
+        parent = os.path.join(os.path.dirname(own), _MIRRORS)
+        self.directory = os.path.join(
+            parent, self.mirror_conf.mirror_name.replace(os.sep, '_'))
+        _enable(parent, {name.split('.')[0] for name, _ in settings})
+        os.makedirs(self.directory, exist_ok=True)
+        for name, value in settings:
+            _write(os.path.join(self.directory, name), value)
+        self.log.debug('cgroup %r configured with %r', self.directory,
+                       settings)
+        return os.path.join(self.directory, 'cgroup.procs')
+
+    def prepare(self):
+        """
+        Determine the prefix for the rsync command and create the mirror's
+        cgroup, if any.
+
+        :raises SynchronizerException:
+            If the controls are misconfigured or the cgroup cannot be
+            created.
+        """
+        prefix = []
+        settings = self._cgroup_settings
+        if settings:
+            try:
+                procs = self._create_cgroup(settings)
+            except OSError as e:
+                raise SynchronizerException(
+                    f'cannot configure cgroup because: {e}') from None
+            self._cgroup = True
+            prefix += [SH, '-c', _JOIN_CGROUP, procs]
+        prefix += self._nice_prefix
+        prefix += self._ionice_prefix
+        self.prefix = prefix
+
+    def release(self):
+        """Remove the mirror's cgroup, if any, now that rsync has exited."""
+        if not self._cgroup:
+            return
+        self._cgroup = False
+        try:
+            os.rmdir(self.directory)
+        except OSError as e:
+            # Harmless; it is reused by the next run.
+            self.log.debug('cannot remove cgroup %r because: %s',
+                           self.directory, e)
@@ -0,0 +1,144 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the compilation of a mirror's include and exclude
+patterns into an rsync filter file, which is then merged into rsync's rules
+via a single ``--filter`` option rather than one command-line option per
+pattern.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from glob import escape, glob
+
+from mirrmaid.constants import *
+from mirrmaid.exceptions import SynchronizerException
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.rules')
+
+INCLUDE = '+'
+EXCLUDE = '-'
+
+# Patterns that match every path, beyond which no rule can ever match.
+_CATCH_ALL = {'*', '**', '***'}
+
+
+class FilterRules(object):
+    """
+    The compiled filter rules of a single mirror.
+
+    Rules are compiled in the order rsync would have evaluated the equivalent
+    command-line options: all inclusions, then all exclusions.  Since rsync
+    acts on the first rule that matches, any rule whose pattern duplicates
+    that of an earlier rule or that follows a catch-all rule can never match
+    and is dropped.
+    """
+
+    def __init__(self, mirror: str, includes: list, excludes: list):
+        """
+        Initialize the FilterRules object.
+
+        :param mirror:
+            Name of the mirror.
+
+        :param includes:
+            The inclusion patterns of the mirror.
+
+        :param excludes:
+            The exclusion patterns of the mirror.
+
+        :raises SynchronizerException:
+            If any pattern is invalid.
+        """
+        self.mirror = mirror
+        self.digest = hashlib.sha256(
+            json.dumps([includes, excludes]).encode()
+        ).hexdigest()
+        self.rules = self._compile(
+            [(INCLUDE, p) for p in includes]
+            + [(EXCLUDE, p) for p in excludes]
+        )
+
+    def _compile(self, rules: list) -> list:
+        result = []
+        seen = {}
+        for kind, pattern in rules:
+            self._validate(pattern)
+            if pattern in seen:
+                _log.debug('mirror %r: dropped rule %r, unreachable after %r',
+                           self.mirror, f'{kind} {pattern}',
+                           f'{seen[pattern]} {pattern}')
+                continue
+            if result and result[-1][1] in _CATCH_ALL:
+                _log.debug('mirror %r: dropped rule %r, unreachable after %r',
+                           self.mirror, f'{kind} {pattern}',
+                           ' '.join(result[-1]))
+                continue
+            seen[pattern] = kind
+            result.append((kind, pattern))
+        return result
+
+    def _validate(self, pattern):
+        if not isinstance(pattern, str) or pattern == '':
+            raise SynchronizerException(
+                f'mirror {self.mirror!r} has invalid pattern {pattern!r}')
+        if '\n' in pattern or '\r' in pattern:
+            raise SynchronizerException(
+                f'mirror {self.mirror!r} has pattern {pattern!r} '
+                f'containing a line break')
+        if pattern != pattern.strip():
+            _log.warning('mirror %r has pattern %r with leading or trailing '
+                         'white-space, which rsync treats as significant',
+                         self.mirror, pattern)
+
+    @property
+    def filename(self) -> str:
+        """
+        :return:
+            The name of the cached filter file for these exact rules.
+        """
+        return os.path.join(FILTER_DIRECTORY,
+                            f'{self._safe_mirror}.{self.digest[:16]}.rules')
+
+    @property
+    def _safe_mirror(self) -> str:
+        return self.mirror.replace(os.sep, '_')
+
+    def install(self) -> str:
+        """
+        Write the filter file, unless it is already cached, and discard any
+        stale versions for the mirror.
+
+        :return:
+            The name of the filter file.
+        """
+        filename = self.filename
+        if not os.path.exists(filename):
+            os.makedirs(FILTER_DIRECTORY, exist_ok=True)
+            temporary = f'{filename}.{os.getpid()}'
+            with open(temporary, 'w') as f:
+                f.write(f'# mirrmaid filter rules for {self.mirror}\n')
+                for kind, pattern in self.rules:
+                    f.write(f'{kind} {pattern}\n')
+            os.replace(temporary, filename)
+            _log.debug('compiled %d filter rules for mirror %r into %r',
+                       len(self.rules), self.mirror, filename)
+        pattern = f'{escape(self._safe_mirror)}.{"[0-9a-f]" * 16}.rules'
+        for stale in glob(os.path.join(FILTER_DIRECTORY, pattern)):
+            if stale != filename:
+                try:
+                    os.unlink(stale)
+                except OSError:
+                    pass
+        return filename
@@ -0,0 +1,76 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the stages of a mirror synchronization.  Ordinarily
+a single rsync run does everything, but package repositories are better
+served in stages so that their metadata never refers to packages that have
+not yet arrived or have already been deleted.
+"""
+
+from collections import namedtuple
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# A stage of a synchronization, being one run of rsync.
+#
+# name:
+#     Name of the stage, for logging.
+# filters_first:
+#     rsync filter options preceding the mirror's own filter rules, thus
+#     taking precedence over them.
+# filters_last:
+#     rsync filter options following the mirror's own filter rules.
+# delete:
+#     If false, any deletion options are omitted from the run.
+# options:
+#     Additional rsync options for the run.
+Stage = namedtuple('Stage', 'name filters_first filters_last delete options')
+
+# The single stage of an ordinary synchronization.
+FULL = Stage('full', [], [], True, [])
+
+
+def staged(metadata: list) -> list:
+    """
+    :param metadata:
+        The rsync patterns matching the repository metadata.
+
+    :return:
+        The stages of a staged synchronization: first the payload without
+        the metadata, then the metadata, and finally the deletions; none
+        deletes until the last.
+    """
+    payload_filters = []
+    metadata_filters = ['--include', '*/']
+    for pattern in metadata:
+        payload_filters += ['--exclude', pattern]
+        metadata_filters += ['--include', pattern]
+    metadata_filters += ['--exclude', '*']
+    return [
+        Stage('payload', payload_filters, [], False, []),
+        Stage('metadata', [], metadata_filters, False, []),
+        Stage('delete', [], [], True, []),
+    ]
+
+
+def refetch(files_from: str) -> Stage:
+    """
+    :param files_from:
+        Name of a file listing the files to be fetched again, relative to the
+        mirror's target.
+
+    :return:
+        The stage that fetches the listed files again, regardless of their
+        sizes and times of modification, such as those that failed
+        verification.  Listed files no longer upstream are ignored.
+    """
+    return Stage('refetch', [], [], False, [
+        '--files-from', files_from, '--ignore-times', '--ignore-missing-args',
+    ])
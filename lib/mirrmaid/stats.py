@@ -0,0 +1,99 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements a parser for the transfer statistics that rsync emits
+when given its ``--stats`` option.
+"""
+
+import re
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# Multipliers for the suffixes rsync may use with --human-readable.
+_SUFFIXES = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15}
+
+_STAT_LINE = re.compile(r'^(?P<name>[A-Z][A-Za-z ]+):\s+(?P<value>[\d.,]+)'
+                        r'(?P<suffix>[KMGTP]?)')
+
+
+class RsyncStats(object):
+    """
+    The statistics reported by rsync, as gathered from its output.
+
+    Each recognized statistic is available by its name as it appears in the
+    rsync output, normalized to lower case, e.g., ``'total bytes received'``.
+    """
+
+    # Well-known statistics names.
+    CREATED_FILES = 'number of created files'
+    DELETED_FILES = 'number of deleted files'
+    FILE_LIST_GENERATION_TIME = 'file list generation time'
+    FILE_LIST_TRANSFER_TIME = 'file list transfer time'
+    FILES = 'number of files'
+    FILES_TRANSFERRED = 'number of regular files transferred'
+    LITERAL_DATA = 'literal data'
+    TOTAL_BYTES_RECEIVED = 'total bytes received'
+    TOTAL_BYTES_SENT = 'total bytes sent'
+    TOTAL_FILE_SIZE = 'total file size'
+    TOTAL_TRANSFERRED_FILE_SIZE = 'total transferred file size'
+
+    # Statistics that describe the tree rather than the work done, which are
+    # therefore not summed by merge().
+    _DESCRIPTIVE = {FILES, TOTAL_FILE_SIZE}
+
+    def __init__(self):
+        self.values = {}
+
+    def __getitem__(self, name: str):
+        return self.values[name]
+
+    def __len__(self):
+        return len(self.values)
+
+    def feed(self, line: str) -> bool:
+        """
+        Consider one line of rsync output for statistics.
+
+        :return:
+            ``True`` iff the line contained a statistic.
+        """
+        match = _STAT_LINE.match(line)
+        if not match:
+            return False
+        try:
+            value = float(match.group('value').replace(',', ''))
+        except ValueError:
+            return False
+        value *= _SUFFIXES[match.group('suffix')]
+        if value.is_integer():
+            value = int(value)
+        self.values[match.group('name').strip().lower()] = value
+        return True
+
+    def merge(self, other: 'RsyncStats'):
+        """
+        Combine the statistics of another rsync run over the same tree.
+
+        Statistics of the work done are summed while those that describe the
+        tree are taken from *other*, being the more recent.
+        """
+        for name, value in other.values.items():
+            if name in self._DESCRIPTIVE or name not in self.values:
+                self.values[name] = value
+            else:
+                self.values[name] += value
+
+    def get(self, name: str, default=None):
+        """
+        :return:
+            The value of the named statistic or *default* if it was not
+            reported.
+        """
+        return self.values.get(name, default)
@@ -22,13 +22,73 @@ from time import sleep
 from doubledog.asynchronous import AsynchronousStreamingSubprocess
 from doubledog.lock import LockException, LockFile
 
+from mirrmaid.capacity import SpaceCheck, free_space
 from mirrmaid.constants import *
+from mirrmaid.exceptions import SynchronizerException
+from mirrmaid.incremental import IncrementalSync
+from mirrmaid.reporting import (
+    DEFERRED, FAILURE, LOCKED, RunReport, SIGNALLED, SUCCESS,
+)
+from mirrmaid.resources import ResourceControls
+from mirrmaid.rules import FilterRules
+from mirrmaid.staging import FULL, Stage, refetch, staged
+from mirrmaid.stats import RsyncStats
+from mirrmaid.timing import (
+    LOCK_WAIT, POST_SYNC, PhaseTimer, RsyncPhaseTracker, SPAWN, UNLOCK,
+    phase_options, verbose,
+)
+from mirrmaid.trash import Trash
+from mirrmaid.verify import RefetchQueue
+from mirrmaid.watchdog import Watchdog
 
 __author__ = """John Florian <jflorian@doubledog.org>"""
 __copyright__ = """Copyright 2009-2020 John Florian"""
 
 STOP_TIMEOUT = 30
 
+# The rsync options taking a value, which may be given as the next argument
+# rather than as --option=value.
+_VALUE_OPTIONS = {
+    '--address', '--backup-dir', '--block-size', '--bwlimit', '--cc',
+    '--checksum-choice', '--checksum-seed', '--chmod', '--chown',
+    '--compare-dest', '--compress-choice', '--compress-level', '--contimeout',
+    '--copy-as', '--copy-dest', '--debug', '--early-input', '--exclude',
+    '--exclude-from', '--files-from', '--filter', '--groupmap', '--iconv',
+    '--include', '--include-from', '--info', '--link-dest', '--log-file',
+    '--log-file-format', '--max-alloc', '--max-delete', '--max-size',
+    '--min-size', '--modify-window', '--only-write-batch', '--out-format',
+    '--outbuf', '--partial-dir', '--password-file', '--port', '--protocol',
+    '--read-batch', '--remote-option', '--rsh', '--rsync-path',
+    '--skip-compress', '--sockopts', '--stderr', '--stop-after', '--stop-at',
+    '--suffix', '--temp-dir', '--timeout', '--usermap', '--write-batch',
+    '--zc', '-@', '-B', '-M', '-T', '-e', '-f',
+}
+
+
+def _arguments(opts: list) -> list:
+    """
+    :return:
+        The rsync options *opts* as a list of tuples, each holding an option
+        and also its value if that is given as the next argument.
+    """
+    arguments = []
+    i = 0
+    while i < len(opts):
+        width = 2 if opts[i] in _VALUE_OPTIONS else 1
+        arguments.append(tuple(opts[i:i + width]))
+        i += width
+    return arguments
+
+
+def _deletes(opt: str) -> bool:
+    """
+    :return:
+        ``True`` iff the rsync option *opt* deletes files, unlike (e.g.)
+        ``--delay-updates``, which merely shares its prefix.
+    """
+    return opt.startswith('--delete') or opt in ('--del',
+                                                 '--remove-source-files')
+
 
 class Synchronizer(Thread):
     """
@@ -40,7 +100,8 @@ class Synchronizer(Thread):
     a per-mirror basis.
     """
 
-    def __init__(self, default_conf, mirror_conf, dry_run=False):
+    def __init__(self, default_conf, mirror_conf, dry_run=False,
+                 hook_pool=None, reporters=None, expected_incoming=None):
         """
         Initialize the Synchronizer object.
 
@@ -49,15 +110,51 @@ class Synchronizer(Thread):
 
         :param dry_run:
             If true, rsync will be run in its dry-run mode.
+
+        :param hook_pool:
+            The HookPool in which any post-synchronization hooks are to be
+            run.  If omitted, no hooks will be run.
+
+        :param reporters:
+            A list of Reporter objects that are to receive the RunReport at
+            the conclusion of the run.
+
+        :param expected_incoming:
+            The bytes the run is expected to receive according to the run
+            journal, for the pre-flight space check, or ``None`` if unknown.
         """
         super().__init__()
         self.default_conf = default_conf
         self.mirror_conf = mirror_conf
         self.dry_run = dry_run
+        self.expected_incoming = expected_incoming
+        self.hook_pool = hook_pool
+        self.exit_code = None
+        self.hook_results = []
+        self.report = None
+        self.reporters = reporters or []
+        self.running_hooks = False
+        self.deferred = False
         self.log = logging.getLogger(f'mirrmaid.{self.mirror_conf.mirror_name}')
         self.lock_file = LockFile(self._lock_name, pid=os.getpid())
         self.name = self.mirror_conf.mirror_name
+        self._incremental = None
+        if self.mirror_conf.file_list:
+            self._incremental = IncrementalSync(self.mirror_conf, self.log)
+        self._refetch = RefetchQueue(self.mirror_conf.mirror_name)
+        self._refetching = None
+        self._resources = ResourceControls(self.mirror_conf, self.log)
+        self._space_check = SpaceCheck(self.mirror_conf, self.log,
+                                       expected_incoming)
         self._subprocess = None
+        self._timer = PhaseTimer()
+        self._trash = Trash(self.mirror_conf, self.log)
+        self._watchdog = Watchdog(self.mirror_conf.stall_timeout,
+                                  self.mirror_conf.max_runtime,
+                                  self._stop_by_watchdog, self.log)
+        self._stage = FULL
+        self._stage_stats = RsyncStats()
+        self._stats = RsyncStats()
 
     @property
     def _lock_name(self) -> str:
@@ -68,36 +165,70 @@ class Synchronizer(Thread):
         return os.path.join(LOCK_DIRECTORY, self.mirror_conf.mirror_name)
 
     @property
-    def _rsync_excludes(self) -> list:
+    def _rsync_filters(self) -> list:
         """
         :return:
-            The rsync options to effect the mirror's list of exclusions.
+            The rsync options to effect the mirror's lists of inclusions and
+            exclusions.
+
+        :raises SynchronizerException:
+            If any pattern is invalid.
         """
-        result = []
-        for exclude in self.mirror_conf.excludes:
-            result.append('--exclude')
-            result.append(exclude)
-        return result
+        rules = FilterRules(self.mirror_conf.mirror_name,
+                            self.mirror_conf.includes,
+                            self.mirror_conf.excludes)
+        if not rules.rules:
+            return []
+        try:
+            return ['--filter', f'merge {rules.install()}']
+        except OSError as e:
+            raise SynchronizerException(
+                f'cannot write filter rules because: {e}') from None
 
-    @property
-    def _rsync_includes(self) -> list:
+    @staticmethod
+    def _tune(opts: list, add: list, remove: list) -> list:
         """
         :return:
-            The rsync options to effect the mirror's list of inclusions.
+            The rsync options *opts* less those to *remove*, whether given
+            with their value as ``--option=value``, as ``--option value`` or
+            without, and then with those to *add* moved or appended to the
+            end, so that they take precedence.
         """
-        result = []
-        for include in self.mirror_conf.includes:
-            result.append('--include')
-            result.append(include)
-        return result
+        added = _arguments(add)
+
+        def kept(argument):
+            opt = argument[0]
+            return not (argument in added or any(
+                r in (opt, opt.split('=', 1)[0], '='.join(argument))
+                for r in remove))
+
+        return [opt for argument in _arguments(opts) if kept(argument)
+                for opt in argument] + add
 
     @property
     def _rsync_options(self) -> list:
         """
         :return:
-            The rsync options to be used.
+            The rsync options to be used: those of the mirror, or else of the
+            DEFAULT section, tuned by each of its profiles in turn and lastly
+            by its own additions and removals.
         """
-        opts: list = self.default_conf.get_list('rsync_options')
+        conf = self.mirror_conf
+        opts: list = conf.rsync_options
+        for profile in conf.rsync_profiles:
+            opts = self._tune(opts, *conf.rsync_profile(profile))
+        opts = self._tune(opts, conf.rsync_options_add,
+                          conf.rsync_options_remove)
+        if self._stage.options:
+            # The stage lists its own files, in place of any incremental list.
+            opts += self._stage.options
+        elif self._incremental and self._incremental.files_from:
+            # Deletions are effected only via the list of paths.
+            opts = [opt for opt in opts if not _deletes(opt)]
+            opts += self._incremental.options
+        if not self._stage.delete:
+            opts = [opt for opt in opts if not _deletes(opt)]
+        opts += self._trash.options
         if self.dry_run:
             opts.append('--dry-run')
         return opts
@@ -126,6 +257,19 @@ class Synchronizer(Thread):
             target += '/'
         return target
 
+    @property
+    def _hook_environment(self) -> dict:
+        """
+        :return:
+            The environment variables that describe the mirror to its
+            post-synchronization hooks.
+        """
+        return {
+            'MIRRMAID_MIRROR': self.mirror_conf.mirror_name,
+            'MIRRMAID_SOURCE': self._source_uri,
+            'MIRRMAID_TARGET': self._target_uri,
+        }
+
     def _lock_replica(self) -> bool:
         """
         Attempt to gain a lock on the target replica.
@@ -146,6 +290,142 @@ class Synchronizer(Thread):
             self.log.info('gained exclusive-lock on %r', self.lock_file.name)
             return True
 
+    def _run_post_sync_hooks(self):
+        """
+        Run the mirror's post-synchronization hooks, if any.
+
+        The hooks run while the lock on the target replica is still held, but
+        within the HookPool rather than counting against the rsync workers.
+        """
+        commands = self.mirror_conf.post_sync
+        if not commands or self.hook_pool is None:
+            return
+        if self.dry_run:
+            self.log.info('post-sync hooks skipped for dry-run')
+            return
+        self._watchdog.enforce()
+        self.running_hooks = True
+        self._timer.mark()
+        try:
+            self.hook_results = self.hook_pool.run(
+                self.log,
+                commands,
+                env=self._hook_environment,
+                timeout=self.mirror_conf.post_sync_timeout,
+            )
+        finally:
+            self._timer.attribute(POST_SYNC)
+            self.running_hooks = False
+
+    @property
+    def _stages(self) -> list:
+        """
+        :return:
+            The stages of the synchronization, each being one rsync run.
+        """
+        stages = [FULL]
+        if self._incremental and self._incremental.unchanged:
+            stages = []
+        elif self.mirror_conf.staged:
+            stages = staged(self.mirror_conf.metadata)
+        if self._refetching:
+            stages.insert(0, refetch(self._refetching))
+        return stages
+
+    def _begin_stage(self, stage: Stage):
+        self._stage = stage
+        self._stage_stats = RsyncStats()
+        if stage is not FULL:
+            self.log.info('stage %r started', stage.name)
+
+    def _end_stage(self):
+        self._stats.merge(self._stage_stats)
+        self._stage = FULL
+
+    def _prepare_incremental(self):
+        """Decide whether this run is incremental, if so configured."""
+        if self._incremental is None:
+            return
+        self._watchdog.enforce()
+        try:
+            self._incremental.prepare(self._source_uri)
+        except OSError as e:
+            raise SynchronizerException(
+                f'cannot prepare incremental run because: {e}') from None
+        if self._incremental.unchanged:
+            # Nothing changed upstream, so there is nothing to synchronize.
+            self.exit_code = os.EX_OK
+
+    def _conclude_incremental(self):
+        """Record the outcome of the run for the next incremental run."""
+        if self._incremental and not self.dry_run:
+            self._incremental.conclude(self.exit_code)
+
+    def _prepare_refetch(self):
+        """Take any files queued to be fetched again."""
+        try:
+            self._refetching = self._refetch.take()
+        except OSError as e:
+            raise SynchronizerException(
+                f'cannot take files to be fetched again because: {e}'
+            ) from None
+        if self._refetching:
+            self.log.info('fetching again the files listed in %r',
+                          self._refetching)
+
+    def _conclude_refetch(self):
+        """Dequeue the files fetched again, if successfully."""
+        if (self._refetching and self.exit_code == os.EX_OK
+                and not self.dry_run):
+            self._refetch.done()
+
+    def _prepare_trash(self):
+        """Prepare to defer deletions to the trash, if so configured."""
+        try:
+            self._trash.prepare()
+        except OSError as e:
+            raise SynchronizerException(
+                f'cannot prepare trash directory because: {e}') from None
+
+    def _space_permits(self) -> bool:
+        """
+        :return:
+            ``True`` unless the run would likely exhaust the free space of the
+            target's filesystem.  Dry-runs are always permitted.
+        """
+        if self.dry_run:
+            return True
+        return self._space_check.permits(self.rsync_command)
+
+    def _report(self, locked: bool):
+        """Conclude the RunReport and deliver it to all reporters."""
+        if not locked:
+            outcome = LOCKED
+        elif self.deferred:
+            outcome = DEFERRED
+        elif self._watchdog.verdict:
+            outcome = self._watchdog.verdict
+        elif self.exit_code is None or self.exit_code < 0:
+            outcome = SIGNALLED
+        elif self.exit_code == os.EX_OK:
+            outcome = SUCCESS
+        else:
+            outcome = FAILURE
+        self.report.phases = self._timer.phases
+        self.report.stats = self._stats.values
+        self.report.hooks = self.hook_results
+        free = free_space(self.mirror_conf.target)
+        if free:
+            self.report.target_device, self.report.target_free = free
+        self.report.finish(self.exit_code, outcome)
+        for reporter in self.reporters:
+            # noinspection PyBroadException
+            try:
+                reporter.report(self.report)
+            except Exception as e:
+                self.log.error('reporter %r failed because: %s',
+                               reporter, e)
+
     def _unlock_replica(self):
         """Release the lock on the target replica."""
         try:
@@ -167,27 +447,82 @@ class Synchronizer(Thread):
             The exit code of the rsync process, where only a value of zero
             indicates success.
         """
+        self._watchdog.enforce()
         self.log.info('mirror synchronization started')
-        cmd = (
-                [RSYNC]
-                + self._rsync_options
-                + self._rsync_includes
-                + self._rsync_excludes
-        )
-        cmd.append(self._source_uri)
-        cmd.append(self._target_uri)
+        cmd = self._resources.prefix + self.rsync_command
         self.log.debug('spawning %r', cmd)
         self.log.debug('AKA      %s', ' '.join(cmd))
+        self._timer.mark()
         self._subprocess = AsynchronousStreamingSubprocess(cmd)
+        self._timer.attribute(SPAWN)
         self.log.info('rsync pid=%r', self._subprocess.pid)
-        exit_code = self._subprocess.collect(self.log.info, self.log.error)
+        self._watchdog.watch(self._subprocess.pid)
+        tracker = RsyncPhaseTracker(self._timer, verbose(self._rsync_options))
+        exit_code = self._subprocess.collect(self._output_collector(tracker),
+                                             self._error_collector())
+        self._watchdog.watch(None)
+        tracker.finish()
+        self._log_exit_code(exit_code)
+        return exit_code
+
+    def _log_exit_code(self, exit_code: int):
+        """Log the conclusion of the rsync process."""
         if exit_code < 0:
             self.log.warning('rsync terminated; caught signal %r', -exit_code)
         else:
             level = [logging.INFO, logging.DEBUG][exit_code == os.EX_OK]
             self.log.log(level, 'rsync exit code=%r', exit_code)
         self.log.info('mirror synchronization finished')
-        return exit_code
+
+    def _output_collector(self, tracker: RsyncPhaseTracker):
+        """
+        :return:
+            A function that consumes each line of rsync's standard output.
+        """
+
+        def collect_output(line):
+            self._watchdog.activity()
+            tracker.feed(line)
+            self._stage_stats.feed(line)
+            self.log.info(line)
+
+        return collect_output
+
+    def _error_collector(self):
+        """
+        :return:
+            A function that consumes each line of rsync's standard error.
+        """
+
+        def collect_error(line):
+            self._watchdog.activity()
+            self.log.error(line)
+
+        return collect_error
+
+    def _stop_by_watchdog(self):
+        """Stop the run on behalf of the Watchdog, from its thread."""
+        self.stop()
+
+    @property
+    def rsync_command(self) -> list:
+        """
+        :return:
+            The complete rsync command, with all options and arguments, that
+            will effect the synchronization.
+        """
+        options = self._rsync_options
+        cmd = (
+                [RSYNC]
+                + phase_options(options)
+                + options
+                + self._stage.filters_first
+                + self._rsync_filters
+                + self._stage.filters_last
+        )
+        cmd.append(self._source_uri)
+        cmd.append(self._target_uri)
+        return cmd
 
     @property
     def is_running(self) -> bool:
@@ -207,11 +542,42 @@ class Synchronizer(Thread):
     def run(self):
         """Acquire a lock and if successful, update the target replica."""
         self.log.info('starting thread')
-        if self._lock_replica():
+        self.report = RunReport(self.mirror_conf.mirror_name,
+                                self._source_uri, self._target_uri,
+                                self.dry_run)
+        self._timer.mark()
+        locked = self._lock_replica()
+        self._timer.attribute(LOCK_WAIT)
+        if locked:
             try:
-                self._update_replica()
+                self.deferred = not self._space_permits()
+                if not self.deferred:
+                    self._watchdog.start()
+                    self._resources.prepare()
+                    self._prepare_trash()
+                    self._prepare_incremental()
+                    self._prepare_refetch()
+                    stages = self._stages
+                    for stage in stages:
+                        self._begin_stage(stage)
+                        self.exit_code = self._update_replica()
+                        self._end_stage()
+                        if (self.exit_code != os.EX_OK
+                                or self._watchdog.verdict):
+                            break
+                    self._conclude_incremental()
+                    self._conclude_refetch()
+                    if self.exit_code == os.EX_OK and stages:
+                        self._run_post_sync_hooks()
+            except SynchronizerException as e:
+                self.log.error('mirror synchronization failed because: %s', e)
             finally:
+                self._watchdog.cancel()
+                self._resources.release()
+                self._timer.mark()
                 self._unlock_replica()
+                self._timer.attribute(UNLOCK)
+        self._report(locked)
 
     def stop(self):
         """Force termination of the rsync subprocess."""
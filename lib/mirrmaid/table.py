@@ -0,0 +1,75 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements simple formatting of tabular data for display by the
+command-line interface.
+"""
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+
+def format_bytes(value) -> str:
+    """
+    :return:
+        *value* (a number of bytes) in a compact, human-readable form.
+    """
+    if value is None:
+        return '-'
+    for unit in ['B', 'KiB', 'MiB', 'GiB', 'TiB']:
+        if abs(value) < 1024 or unit == 'TiB':
+            break
+        value /= 1024
+    # noinspection PyUnboundLocalVariable
+    return f'{value:.0f} {unit}' if unit == 'B' else f'{value:.1f} {unit}'
+
+
+def format_duration(seconds) -> str:
+    """
+    :return:
+        *seconds* in a compact, human-readable form.
+    """
+    if seconds is None:
+        return '-'
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:d}:{minutes:02d}:{seconds:02d}'
+
+
+def format_table(headers: list, rows: list) -> str:
+    """
+    Format rows of data as a plain-text table with aligned columns.
+
+    Columns whose values are all numeric are right-aligned.
+
+    :param headers:
+        The column headings.
+
+    :param rows:
+        A list of rows, each being a sequence of values, one per column.
+
+    :return:
+        The formatted table.
+    """
+    cells = [[str(h) for h in headers]]
+    cells += [['-' if v is None else str(v) for v in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    numeric = [
+        all(isinstance(row[i], (int, float)) or row[i] is None
+            for row in rows)
+        for i in range(len(headers))
+    ]
+    lines = []
+    for row in cells:
+        lines.append('  '.join(
+            cell.rjust(width) if right else cell.ljust(width)
+            for cell, width, right in zip(row, widths, numeric)
+        ).rstrip())
+    lines.insert(1, '  '.join('-' * width for width in widths))
+    return '\n'.join(lines)
@@ -0,0 +1,197 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the measurement of where the time of a mirror
+synchronization is spent.
+"""
+
+import re
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from mirrmaid.stats import RsyncStats
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# Phase names, in their typical order of occurrence.
+LOCK_WAIT = 'lock-wait'
+SPAWN = 'spawn'
+CONNECT = 'connect'
+FILE_LIST = 'file-list'
+TRANSFER = 'transfer'
+DELETE = 'delete'
+POST_SYNC = 'post-sync'
+UNLOCK = 'unlock'
+
+# rsync options that make its output reveal the phases of its work: the
+# start and end of the file list, each deletion and the statistics, including
+# the file-list timings.
+PHASE_OPTIONS = ['--info=flist2,del1,stats2']
+
+# The PHASE_OPTIONS that further reveal each file transferred, which are only
+# used when rsync is to be verbose anyway.
+VERBOSE_PHASE_OPTIONS = ['--info=flist2,name1,del1,stats2']
+
+
+def verbose(rsync_options: list) -> bool:
+    """
+    :return:
+        ``True`` iff the *rsync_options* include ``--verbose``, whether alone
+        or among bundled short options, such as ``-av``.
+    """
+    return any(opt == '--verbose'
+               or re.fullmatch(r'-[a-zA-Z]*v[a-zA-Z]*', opt)
+               for opt in rsync_options)
+
+
+def phase_options(rsync_options: list) -> list:
+    """
+    :return:
+        The options to be added to the *rsync_options* to reveal the phases
+        of its work, naming the files transferred only if rsync is to be
+        verbose anyway.
+    """
+    if verbose(rsync_options):
+        return VERBOSE_PHASE_OPTIONS
+    return PHASE_OPTIONS
+
+
+class PhaseTimer(object):
+    """
+    Accumulates the wall-clock time spent in named phases.
+
+    Time is measured from the most recent mark and attributed to a phase when
+    that phase is known, which permits phases to be identified after the
+    fact, as is the case when inferring them from rsync output.
+    """
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        self._lock = Lock()
+        self._mark = monotonic()
+
+    def attribute(self, phase: str):
+        """
+        Attribute the time elapsed since the last mark to *phase* and then
+        set a new mark.
+        """
+        with self._lock:
+            now = monotonic()
+            self.phases[phase] = self.phases.get(phase, 0.0) + now - self._mark
+            self._mark = now
+
+    def mark(self):
+        """Begin measuring time anew."""
+        with self._lock:
+            self._mark = monotonic()
+
+    def transfer(self, source: str, destination: str, seconds: float):
+        """
+        Move up to *seconds* from one phase to another, as when a phase turns
+        out to have included time spent in the other.
+        """
+        with self._lock:
+            seconds = min(seconds, self.phases.get(source, 0.0))
+            if seconds > 0:
+                self.phases[source] -= seconds
+                self.phases[destination] = (
+                    self.phases.get(destination, 0.0) + seconds)
+
+
+class RsyncPhaseTracker(object):
+    """
+    Infers the phases of an rsync run from the timing of its output, which
+    must be run with the options of :func:`phase_options`.
+
+    Each line of output is classified by the phase of work that produced it
+    and the time since the prior line is attributed to that phase.  Time
+    preceding the first line is attributed to connection and handshake.  With
+    incremental recursion, the file list arrives in chunks amid the transfer,
+    so the file-list time that rsync reports in its statistics is moved from
+    the transfer to the file-list phase once the run finishes.  Without the
+    names of the files transferred, the time preceding the statistics is
+    attributed to the transfer.
+    """
+
+    _FILE_LIST_HEADERS = (
+        'building file list',
+        'receiving file list',
+        'receiving incremental file list',
+        'sending incremental file list',
+    )
+    _SUMMARY_PREFIXES = (
+        'Number of ',
+        'Total ',
+        'Literal data:',
+        'Matched data:',
+        'File list ',
+        'sent ',
+        'total size is ',
+    )
+
+    def __init__(self, timer: PhaseTimer, names: bool = False):
+        """
+        Initialize the RsyncPhaseTracker object.
+
+        :param timer:
+            The PhaseTimer to which the phases are attributed.
+
+        :param names:
+            If true, the output names each file transferred, as it does with
+            the :data:`VERBOSE_PHASE_OPTIONS`.
+        """
+        self.timer = timer
+        self.names = names
+        self._phase = CONNECT
+        self._in_file_list = False
+        self._incremental = False
+        self._stats = RsyncStats()
+
+    def _classify(self, line: str) -> str:
+        summary = (line.startswith(self._SUMMARY_PREFIXES)
+                   or line.strip() == '')
+        if self._in_file_list:
+            # Incremental recursion: the first chunk of the file list has
+            # arrived once rsync has something more to say, unless it only
+            # says so after transferring files it does not name.
+            self._in_file_list = False
+            if (self.names or not self._incremental
+                    or not (summary or line.startswith('deleting '))):
+                return FILE_LIST
+            return TRANSFER
+        if self._phase == CONNECT:
+            if line.startswith(self._FILE_LIST_HEADERS):
+                if line.rstrip().endswith('done'):
+                    return FILE_LIST
+                self._in_file_list = True
+                self._incremental = 'incremental' in line
+            return CONNECT
+        if line.startswith('deleting '):
+            return DELETE
+        if summary:
+            return self._phase if self.names else TRANSFER
+        return TRANSFER
+
+    def feed(self, line: str):
+        """Consider one line of rsync output."""
+        phase = self._classify(line)
+        self.timer.attribute(phase)
+        self._phase = phase
+        self._stats.feed(line)
+
+    def finish(self):
+        """Attribute the time since the last line of output."""
+        self.timer.attribute(self._phase if self._phase != CONNECT
+                             else TRANSFER)
+        if self._incremental:
+            reported = self._stats.get(RsyncStats.FILE_LIST_TRANSFER_TIME)
+            if reported:
+                self.timer.transfer(TRANSFER, FILE_LIST, reported)
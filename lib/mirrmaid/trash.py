@@ -0,0 +1,248 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements deferred deletion.  Rather than unlinking whatever has
+vanished upstream during the synchronization, rsync merely moves it into
+a trash directory on the same filesystem, which costs one rename per file.
+The Purger empties the trash directories later, in throttled batches, at idle
+priority and outside of the synchronizations.
+"""
+
+import logging
+import os
+from datetime import datetime
+from subprocess import DEVNULL, run
+from time import monotonic, sleep, strftime
+
+from mirrmaid.constants import *
+from mirrmaid.exceptions import SynchronizerException
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.trash')
+
+
+def trash_directory(mirror_conf) -> str:
+    """
+    :return:
+        The trash directory of the mirror: that of its ``'trash_directory'``
+        setting or else, a hidden sibling of its target.
+    """
+    directory = mirror_conf.trash_directory
+    if directory:
+        return directory
+    target = os.path.normpath(mirror_conf.target)
+    return os.path.join(os.path.dirname(target),
+                        f'.{os.path.basename(target)}.trash')
+
+
+class Trash(object):
+    """The trash directory of a single mirror's synchronization."""
+
+    def __init__(self, mirror_conf, log: logging.Logger):
+        """
+        Initialize the Trash object.
+
+        :param mirror_conf:
+            The MirrorConfig of the mirror.
+
+        :param log:
+            The logger of the mirror's Synchronizer.
+        """
+        self.mirror_conf = mirror_conf
+        self.log = log
+        self.directory = trash_directory(mirror_conf)
+        self.backup_dir = None
+
+    @property
+    def options(self) -> list:
+        """
+        :return:
+            The additional rsync options to move deleted and replaced files
+            into the trash, if prepared to do so.
+        """
+        if self.backup_dir is None:
+            return []
+        return ['--backup', '--backup-dir', self.backup_dir]
+
+    def prepare(self):
+        """
+        Prepare a new subdirectory of the trash for this run, if deletions
+        are deferred.
+
+        Every stage of the run shares the subdirectory, which rsync creates
+        as needed.
+
+        :raises SynchronizerException:
+            If the trash directory is within the target.
+        """
+        self.backup_dir = None
+        if not self.mirror_conf.deferred_delete:
+            return
+        target = os.path.abspath(self.mirror_conf.target)
+        trash = os.path.abspath(self.directory)
+        if os.path.commonpath([target, trash]) == target:
+            raise SynchronizerException(
+                f'trash directory {self.directory!r} is within the target')
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            if (os.stat(self.directory).st_dev
+                    != os.stat(self.mirror_conf.target).st_dev):
+                self.log.warning('trash directory %r is not on the same '
+                                 'filesystem as the target, so deletions '
+                                 'will be copied there', self.directory)
+        except FileNotFoundError:
+            # The target is yet to be created.
+            pass
+        self.backup_dir = os.path.join(self.directory,
+                                       strftime('%Y%m%dT%H%M%S'))
+
+
+def _within(window: tuple) -> bool:
+    """
+    :param window:
+        A ``(start, end)`` tuple of minutes since midnight, which may wrap
+        past midnight, or ``None`` for no limit.
+
+    :return:
+        ``True`` iff the time of day is within the *window*.
+    """
+    if window is None:
+        return True
+    now = datetime.now()
+    minute = now.hour * 60 + now.minute
+    start, end = window
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+class Purger(object):
+    """
+    Empties trash directories in batches, pausing after each and yielding to
+    any synchronization of the mirror as well as to the end of the purge
+    window.
+    """
+
+    def __init__(self, batch_size: int, batch_pause: int, window: tuple):
+        """
+        Initialize the Purger object.
+
+        :param batch_size:
+            The number of files removed per batch.
+
+        :param batch_pause:
+            Seconds to pause after each batch.
+
+        :param window:
+            A ``(start, end)`` tuple of minutes since midnight, which may
+            wrap past midnight, limiting when purging may happen or ``None``
+            for no limit.
+        """
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.window = window
+        self._batched = 0
+
+    @property
+    def within_window(self) -> bool:
+        """
+        :return:
+            ``True`` iff the time of day permits purging.
+        """
+        return _within(self.window)
+
+    @staticmethod
+    def lower_priority():
+        """Lower this process's CPU and I/O priorities to the least."""
+        os.nice(19)
+        try:
+            run([IONICE, '-c', '3', '-p', str(os.getpid())],
+                stdout=DEVNULL, stderr=DEVNULL)
+        except OSError as e:
+            _log.warning('cannot lower I/O priority because: %s', e)
+
+    @staticmethod
+    def _syncing(mirror: str) -> bool:
+        """
+        :return:
+            ``True`` iff the lock-file of the mirror exists, as it does only
+            while the mirror is synchronized (or verified).
+        """
+        return os.path.exists(os.path.join(LOCK_DIRECTORY, mirror))
+
+    def _may_continue(self, mirror: str) -> bool:
+        """
+        Count one removal toward the batch, pausing once it is complete.
+
+        :return:
+            ``True`` iff purging may continue.
+        """
+        self._batched += 1
+        if self._batched < self.batch_size:
+            return True
+        self._batched = 0
+        sleep(self.batch_pause)
+        if not self.within_window:
+            _log.info('purge window closed')
+            return False
+        if self._syncing(mirror):
+            _log.info('purge of mirror %r yielding to its synchronization',
+                      mirror)
+            return False
+        return True
+
+    def purge(self, mirror: str, directory: str) -> tuple:
+        """
+        Empty the trash directory of a mirror, oldest runs first, unless or
+        until the mirror is synchronized or the purge window closes.
+
+        :param mirror:
+            The name of the mirror.
+
+        :param directory:
+            The trash directory of the mirror, which itself is kept.
+
+        :return:
+            A ``(files, bytes, seconds, finished)`` tuple, where *finished*
+            is ``False`` if the purge stopped early.
+        """
+        started = monotonic()
+        files = size = 0
+        if self._syncing(mirror):
+            _log.info('not purging mirror %r since it is being synchronized',
+                      mirror)
+            return files, size, 0.0, False
+        try:
+            runs = sorted(os.listdir(directory))
+        except FileNotFoundError:
+            runs = []
+        for stamp in runs:
+            for root, dirs, names in os.walk(os.path.join(directory, stamp),
+                                             topdown=False):
+                # Symbolic links to directories are listed among dirs.
+                names += [d for d in dirs
+                          if os.path.islink(os.path.join(root, d))]
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        size += os.lstat(path).st_size
+                        os.unlink(path)
+                    except OSError as e:
+                        _log.warning('cannot remove %r because: %s', path, e)
+                        continue
+                    files += 1
+                    if not self._may_continue(mirror):
+                        return files, size, monotonic() - started, False
+                try:
+                    os.rmdir(root)
+                except OSError as e:
+                    _log.warning('cannot remove %r because: %s', root, e)
+        return files, size, monotonic() - started, True
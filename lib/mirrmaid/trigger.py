@@ -0,0 +1,131 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements push-triggered synchronization.  A file named after
+a mirror, dropped into the trigger directory, requests an immediate run of
+that mirror by ``mirrmaid watch``.
+"""
+
+import logging
+import os
+from collections import OrderedDict
+from time import time
+
+from mirrmaid.constants import *
+from mirrmaid.exceptions import MirrmaidRuntimeException
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.trigger')
+
+# Seconds to wait before retrying a triggered mirror that was found locked by
+# another mirrmaid process.
+LOCKED_RETRY_DELAY = 60
+
+
+class TriggerSpool(object):
+    """The directory of triggers awaiting consumption."""
+
+    def __init__(self, directory: str = TRIGGER_DIRECTORY):
+        """
+        Initialize the TriggerSpool object.
+
+        :param directory:
+            Name of the trigger directory.
+        """
+        self.directory = directory
+
+    def add(self, mirror: str):
+        """
+        Request an immediate run of a mirror.
+
+        :raises MirrmaidRuntimeException:
+            If the trigger cannot be written.
+        """
+        if mirror.startswith('.') or os.sep in mirror:
+            raise MirrmaidRuntimeException(
+                f'cannot trigger mirror {mirror!r} by its name')
+        path = os.path.join(self.directory, mirror)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'a'):
+                os.utime(path)
+        except OSError as e:
+            raise MirrmaidRuntimeException(
+                f'cannot trigger mirror {mirror!r} because: {e}') from None
+        _log.debug('triggered mirror %r', mirror)
+
+    def take(self) -> list:
+        """
+        Consume all triggers.
+
+        :return:
+            The names of the triggered mirrors, oldest trigger first.
+        """
+        try:
+            entries = [e for e in os.scandir(self.directory)
+                       if not e.name.startswith('.') and e.is_file()]
+        except FileNotFoundError:
+            return []
+        triggers = []
+        for entry in entries:
+            try:
+                triggers.append((entry.stat().st_mtime, entry.name))
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+        return [name for _, name in sorted(triggers)]
+
+
+class TriggerQueue(object):
+    """
+    The mirrors awaiting a triggered run.
+
+    Each mirror is queued at most once, so duplicate triggers are merged.
+    A mirror triggered while it is running remains queued until that run
+    concludes, so that the content just published is picked up by exactly
+    one more run.
+    """
+
+    def __init__(self):
+        self._pending = OrderedDict()
+
+    def __contains__(self, mirror: str) -> bool:
+        return mirror in self._pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, mirror: str, not_before: float = 0):
+        """
+        Queue a mirror.
+
+        :param not_before:
+            The time before which the mirror must not be started.
+        """
+        if mirror in self._pending:
+            not_before = min(not_before, self._pending[mirror])
+        self._pending[mirror] = not_before
+
+    def take(self, running) -> str:
+        """
+        :param running:
+            The names of the mirrors that are running.
+
+        :return:
+            The name of the mirror queued longest that is due and not
+            running, which is no longer queued, or ``None`` if there is none.
+        """
+        now = time()
+        for mirror, not_before in self._pending.items():
+            if not_before <= now and mirror not in running:
+                del self._pending[mirror]
+                return mirror
+        return None
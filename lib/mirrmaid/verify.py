@@ -0,0 +1,489 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the verification of the integrity of the target
+replicas against the checksum manifests published by their upstreams, such
+as Fedora's ``*-CHECKSUM``, Debian and Ubuntu's ``SHA256SUMS`` and the
+``repodata/repomd.xml`` of package repositories.  This catches the silent
+corruption that rsync's quick check, which compares only sizes and times of
+modification, cannot.
+
+A persistent state records each file that was verified so that only files
+that have changed since need to be hashed again.  Files that fail
+verification are queued to be fetched again by the next synchronization of
+the mirror.
+"""
+
+import bz2
+import gzip
+import hashlib
+import logging
+import lzma
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+from xml.etree import ElementTree
+
+from mirrmaid.constants import *
+from mirrmaid.hashing import file_digest
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+_log = logging.getLogger('mirrmaid.verify')
+
+# Names of the checksum manifests of the '<ALGORITHM>SUMS' kind.
+_SUMS = re.compile(r'^(MD5|SHA1|SHA224|SHA256|SHA384|SHA512)SUMS$')
+
+# Names of the checksum manifests of Fedora's kind, e.g.,
+# 'Fedora-Server-39-1.5-x86_64-CHECKSUM'.
+_CHECKSUM = re.compile(r'(^|-)CHECKSUM$')
+
+# A line of Fedora's manifests, in the BSD style of coreutils.
+_BSD_LINE = re.compile(r'^(\w+) \((.+)\) = ([0-9a-fA-F]+)$')
+
+# A line of the '<ALGORITHM>SUMS' manifests, in the GNU style of coreutils.
+_GNU_LINE = re.compile(r'^([0-9a-fA-F]+) [ *](.+)$')
+
+_REPO = '{http://linux.duke.edu/metadata/repo}'
+_COMMON = '{http://linux.duke.edu/metadata/common}'
+
+# The xml:base attribute, as named by ElementTree, which locates a file
+# elsewhere than within the repository.
+_XML_BASE = '{http://www.w3.org/XML/1998/namespace}base'
+
+# Openers of repository metadata according to its compression.
+_OPENERS = {
+    '.bz2': bz2.open,
+    '.gz': gzip.open,
+    '.xml': open,
+    '.xz': lzma.open,
+}
+
+
+def _algorithm(name: str) -> str:
+    """
+    :return:
+        The name of the hashlib algorithm known in manifests as *name* or
+        ``None`` if it is not available.
+    """
+    name = name.lower().replace('-', '')
+    if name == 'sha':
+        name = 'sha1'
+    return name if name in hashlib.algorithms_available else None
+
+
+def _read_checksum(path: str) -> dict:
+    """Read a Fedora ``CHECKSUM`` manifest, which may be clear-signed."""
+    result = {}
+    directory = os.path.dirname(path)
+    with open(path, encoding='utf-8', errors='surrogateescape') as f:
+        for line in f:
+            match = _BSD_LINE.match(line.rstrip('\n'))
+            if match:
+                algorithm = _algorithm(match.group(1))
+                if algorithm:
+                    result[os.path.join(directory, match.group(2))] = (
+                        algorithm, match.group(3).lower())
+    return result
+
+
+def _read_sums(path: str) -> dict:
+    """Read a manifest such as ``SHA256SUMS``."""
+    result = {}
+    directory = os.path.dirname(path)
+    algorithm = _algorithm(_SUMS.match(os.path.basename(path)).group(1))
+    with open(path, encoding='utf-8', errors='surrogateescape') as f:
+        for line in f:
+            match = _GNU_LINE.match(line.rstrip('\n'))
+            if match:
+                result[os.path.join(directory, match.group(2))] = (
+                    algorithm, match.group(1).lower())
+    return result
+
+
+def _read_primary(path: str, root: str) -> dict:
+    """Read the packages of a repository's primary metadata."""
+    result = {}
+    opener = _OPENERS.get(os.path.splitext(path)[1])
+    if opener is None:
+        _log.warning('cannot read %r for lack of its decompressor', path)
+        return result
+    with opener(path, 'rb') as f:
+        for _, element in ElementTree.iterparse(f):
+            if element.tag != f'{_COMMON}package':
+                continue
+            checksum = element.find(f'{_COMMON}checksum')
+            location = element.find(f'{_COMMON}location')
+            if checksum is not None and location is not None:
+                algorithm = _algorithm(checksum.get('type', ''))
+                if algorithm and _XML_BASE not in location.attrib:
+                    result[os.path.join(root, location.get('href'))] = (
+                        algorithm, checksum.text.strip().lower())
+            element.clear()
+    return result
+
+
+def _read_repomd(path: str) -> dict:
+    """
+    Read a repository's ``repomd.xml`` along with the packages of its
+    primary metadata.
+    """
+    result = {}
+    root = os.path.dirname(os.path.dirname(path))
+    primary = None
+    for data in ElementTree.parse(path).getroot().iter(f'{_REPO}data'):
+        checksum = data.find(f'{_REPO}checksum')
+        location = data.find(f'{_REPO}location')
+        if checksum is None or location is None:
+            continue
+        algorithm = _algorithm(checksum.get('type', ''))
+        if algorithm and _XML_BASE not in location.attrib:
+            name = os.path.join(root, location.get('href'))
+            result[name] = (algorithm, checksum.text.strip().lower())
+            if data.get('type') == 'primary':
+                primary = name
+    if primary and os.path.exists(primary):
+        result.update(_read_primary(primary, root))
+    return result
+
+
+def read_manifest(path: str) -> dict:
+    """
+    :param path:
+        Name of a checksum manifest.
+
+    :return:
+        A dictionary mapping the name of each file listed within the
+        manifest to an ``(algorithm, digest)`` tuple, or ``None`` if *path*
+        is not a manifest.
+
+    :raises OSError:
+        If the manifest cannot be read.
+    :raises ValueError:
+        If the manifest is malformed.
+    """
+    name = os.path.basename(path)
+    try:
+        if _SUMS.match(name):
+            return _read_sums(path)
+        if _CHECKSUM.search(name):
+            return _read_checksum(path)
+        if (name == 'repomd.xml'
+                and os.path.basename(os.path.dirname(path)) == 'repodata'):
+            return _read_repomd(path)
+    except (ElementTree.ParseError, EOFError, lzma.LZMAError) as e:
+        raise ValueError(str(e)) from None
+    return None
+
+
+def _hash(job: tuple) -> tuple:
+    path, algorithm = job
+    try:
+        return file_digest(path, algorithm), None
+    except OSError as e:
+        return None, str(e)
+
+
+class RefetchQueue(object):
+    """
+    The files of a single mirror that failed verification and are to be
+    fetched again by its next synchronization.
+    """
+
+    def __init__(self, mirror: str, directory: str = REFETCH_DIRECTORY):
+        """
+        Initialize the RefetchQueue object.
+
+        :param mirror:
+            Name of the mirror.
+
+        :param directory:
+            Name of the directory holding the queues of all mirrors.
+        """
+        name = mirror.replace(os.sep, '_')
+        self.directory = directory
+        self.filename = os.path.join(directory, name)
+        self.taken_filename = os.path.join(directory, f'.{name}.taken')
+
+    def add(self, paths: list):
+        """
+        Queue files to be fetched again.
+
+        :param paths:
+            Names of the files, relative to the mirror's target.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.filename, 'a', encoding='utf-8',
+                  errors='surrogateescape') as f:
+            for path in paths:
+                f.write(f'{path}\n')
+
+    def done(self):
+        """Dequeue the files taken, now that they were fetched again."""
+        try:
+            os.unlink(self.taken_filename)
+        except FileNotFoundError:
+            pass
+
+    def take(self) -> str:
+        """
+        Take the queued files for fetching.  They remain taken, and are
+        taken again along with any queued meanwhile, until ``done()``.
+
+        :return:
+            Name of a file listing the taken files, suitable for rsync's
+            ``--files-from`` option, or ``None`` if none are queued.
+        """
+        taken = []
+        for name in [self.taken_filename, self.filename]:
+            try:
+                with open(name, 'rb') as f:
+                    taken += f.read().splitlines()
+            except FileNotFoundError:
+                pass
+        if not taken:
+            return None
+        with open(self.taken_filename, 'wb') as f:
+            # Each file need be fetched only once.
+            for path in OrderedDict.fromkeys(taken):
+                f.write(path + b'\n')
+        try:
+            os.unlink(self.filename)
+        except FileNotFoundError:
+            pass
+        return self.taken_filename
+
+
+class VerifyState(object):
+    """
+    A persistent record of the files that passed verification.
+
+    Each file is recorded with the attributes necessary to tell if it has
+    changed since, as well as the checksum it was verified against.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS verified (
+            path        TEXT PRIMARY KEY,
+            inode       INTEGER NOT NULL,
+            size        INTEGER NOT NULL,
+            mtime_ns    INTEGER NOT NULL,
+            algorithm   TEXT NOT NULL,
+            digest      TEXT NOT NULL,
+            verified    REAL NOT NULL
+        );
+    """
+
+    def __init__(self, filename: str = VERIFY_STATE):
+        """
+        Initialize the VerifyState object, creating it as necessary.
+
+        :param filename:
+            Name of the SQLite database that holds the state.
+        """
+        self.filename = filename
+        self._db = sqlite3.connect(filename)
+        self._db.executescript(self.SCHEMA)
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def commit(self):
+        self._db.commit()
+
+    def forget(self, path: str):
+        """Discard the record of *path*, if any."""
+        self._db.execute('DELETE FROM verified WHERE path = ?', (path,))
+
+    def is_current(self, path: str, st: os.stat_result, algorithm: str,
+                   digest: str) -> bool:
+        """
+        :return:
+            ``True`` iff *path* was verified against the same checksum and has
+            not changed since.
+        """
+        return self._db.execute(
+            'SELECT 1 FROM verified WHERE path = ? AND inode = ? AND size = ? '
+            'AND mtime_ns = ? AND algorithm = ? AND digest = ?',
+            (path, st.st_ino, st.st_size, st.st_mtime_ns, algorithm, digest)
+        ).fetchone() is not None
+
+    def record(self, path: str, st: os.stat_result, algorithm: str,
+               digest: str):
+        """Add or replace the record of *path*."""
+        self._db.execute(
+            'INSERT OR REPLACE INTO verified '
+            '(path, inode, size, mtime_ns, algorithm, digest, verified) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (path, st.st_ino, st.st_size, st.st_mtime_ns, algorithm, digest,
+             time())
+        )
+
+
+class VerifyResult(object):
+    """The outcome of the verification of a single mirror."""
+
+    def __init__(self, mirror: str):
+        self.mirror = mirror
+        self.manifests = 0
+        self.listed = 0
+        self.missing = 0
+        self.unchanged = 0
+        self.verified = 0
+        self.mismatched = []
+        self.errors = 0
+
+
+class Verifier(object):
+    """
+    Verifies the files of mirror targets against their checksum manifests.
+
+    The files are hashed concurrently by a pool of processes, so that
+    verification is not limited by a single CPU.
+    """
+
+    def __init__(self, state: VerifyState, workers: int,
+                 everything: bool = False):
+        """
+        Initialize the Verifier object.
+
+        :param state:
+            The persistent record of previously verified files.
+
+        :param workers:
+            Number of processes hashing files concurrently.
+
+        :param everything:
+            If true, every file is hashed, even if it is unchanged since it
+            was last verified, so as to catch silent corruption.
+        """
+        self.state = state
+        self.workers = workers
+        self.everything = everything
+
+    @staticmethod
+    def _manifests(root: str):
+        """Walk *root*, yielding the name of every checksum manifest."""
+        pending = [root]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                _log.warning('cannot scan %r because: %s', directory, e)
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file() and (
+                            _SUMS.match(entry.name)
+                            or _CHECKSUM.search(entry.name)
+                            or entry.name == 'repomd.xml'):
+                        yield entry.path
+                except OSError:
+                    continue
+
+    def _listed(self, root: str, result: VerifyResult) -> dict:
+        """
+        :return:
+            A dictionary mapping the name of each file listed by the manifests
+            within *root* to an ``(algorithm, digest)`` tuple.
+        """
+        listed = {}
+        for manifest in self._manifests(root):
+            try:
+                entries = read_manifest(manifest)
+            except (OSError, ValueError) as e:
+                _log.warning('cannot read manifest %r because: %s',
+                             manifest, e)
+                result.errors += 1
+                continue
+            if entries is None:
+                continue
+            _log.debug('manifest %r lists %d files', manifest, len(entries))
+            result.manifests += 1
+            for path, checksum in entries.items():
+                path = os.path.normpath(path)
+                # Never trust a manifest to name files outside the target.
+                if path.startswith(root):
+                    listed[path] = checksum
+        result.listed = len(listed)
+        return listed
+
+    def _jobs(self, listed: dict, result: VerifyResult) -> list:
+        """
+        :return:
+            A list of ``(path, algorithm, digest, stat)`` tuples for the files
+            that need to be hashed.
+        """
+        jobs = []
+        for path, (algorithm, digest) in sorted(listed.items()):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                # Likely excluded from the mirror.
+                result.missing += 1
+                continue
+            except OSError as e:
+                _log.warning('cannot stat %r because: %s', path, e)
+                result.errors += 1
+                continue
+            if not self.everything and self.state.is_current(
+                    path, st, algorithm, digest):
+                result.unchanged += 1
+            else:
+                jobs.append((path, algorithm, digest, st))
+        return jobs
+
+    def run(self, mirror_conf) -> VerifyResult:
+        """
+        Verify the target of a mirror.
+
+        Files that fail verification are queued for the mirror's next
+        synchronization to fetch again.
+
+        :param mirror_conf:
+            The MirrorConfig of the mirror.
+
+        :return:
+            The outcome of the verification.
+        """
+        result = VerifyResult(mirror_conf.mirror_name)
+        root = os.path.join(os.path.realpath(mirror_conf.target), '')
+        _log.info('verifying %r', root)
+        jobs = self._jobs(self._listed(root, result), result)
+        with ProcessPoolExecutor(self.workers) as executor:
+            hashes = executor.map(
+                _hash, [(path, algorithm) for path, algorithm, _, _ in jobs],
+                chunksize=16,
+            )
+            for (path, algorithm, digest, st), (actual, error) in zip(
+                    jobs, hashes):
+                if error:
+                    _log.warning('cannot hash %r because: %s', path, error)
+                    result.errors += 1
+                elif actual == digest:
+                    self.state.record(path, st, algorithm, digest)
+                    result.verified += 1
+                else:
+                    _log.error('%s checksum mismatch: %r', algorithm, path)
+                    self.state.forget(path)
+                    result.mismatched.append(os.path.relpath(path, root))
+        self.state.commit()
+        if result.mismatched:
+            RefetchQueue(mirror_conf.mirror_name).add(result.mismatched)
+        _log.info('verified %d files of %r; %d mismatched',
+                  result.verified, root, len(result.mismatched))
+        return result
@@ -0,0 +1,218 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+"""
+This module implements the watchdog that stops a mirror synchronization
+which has stalled or run for too long, such as when a hung upstream leaves
+rsync waiting indefinitely in a way that rsync's own ``--timeout`` does not
+cover.  Were it not stopped, it would hold both a worker and the lock of the
+mirror the whole time.
+
+Should a verdict be reached while no rsync process is running, such as while
+the upstream file list is fetched or between stages, the run is aborted
+before it spawns another.
+"""
+
+import logging
+import os
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from mirrmaid.exceptions import SynchronizerException
+from mirrmaid.reporting import STALLED, TIMEOUT
+
+__author__ = """John Florian <jflorian@doubledog.org>"""
+__copyright__ = """Copyright 2026 John Florian"""
+
+# Bounds on the seconds between the checks of the Watchdog.
+_MIN_INTERVAL = 1
+_MAX_INTERVAL = 30
+
+
+def _children() -> dict:
+    """
+    :return:
+        A dictionary mapping the ID of each process to a list of the IDs of
+        its child processes.
+    """
+    result = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name, in parentheses, may itself contain spaces.
+        ppid = int(stat.rpartition(')')[2].split()[1])
+        result.setdefault(ppid, []).append(int(name))
+    return result
+
+
+def io_counter(pid: int) -> int:
+    """
+    :param pid:
+        The ID of a process.
+
+    :return:
+        The total bytes that the process and all of its descendants have
+        read and written, including via the network, or ``None`` if that
+        cannot be determined.
+    """
+    try:
+        children = _children()
+    except OSError:
+        return None
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending += children.get(current, [])
+        try:
+            with open(f'/proc/{current}/io') as f:
+                for line in f:
+                    name, _, value = line.partition(':')
+                    if name in ('rchar', 'wchar'):
+                        total += int(value)
+        except OSError:
+            # Exited meanwhile or is not ours to inspect.
+            continue
+    return total
+
+
+class Watchdog(object):
+    """
+    Watches a single Synchronizer run for activity: output from rsync or
+    input/output by any of its processes.  If there is none for
+    ``stall_timeout`` seconds or the run exceeds ``max_runtime`` seconds,
+    the run is stopped.
+    """
+
+    def __init__(self, stall_timeout: int, max_runtime: int, stop,
+                 log: logging.Logger):
+        """
+        Initialize the Watchdog object.
+
+        :param stall_timeout:
+            Seconds of inactivity of rsync after which the run is stopped or
+            zero for no limit.
+
+        :param max_runtime:
+            Seconds after which the run is stopped or zero for no limit.
+
+        :param stop:
+            A function that stops the run.  It is called from the thread of
+            the Watchdog.
+
+        :param log:
+            The logger of the Synchronizer.
+        """
+        self.stall_timeout = stall_timeout
+        self.max_runtime = max_runtime
+        self.pending = None
+        self.verdict = None
+        self._stop = stop
+        self.log = log
+        self._cancelled = Event()
+        self._io = None
+        self._last_activity = monotonic()
+        self._lock = Lock()
+        self._pid = None
+        self._started = None
+        self._thread = None
+
+    @property
+    def _interval(self) -> float:
+        limits = [limit for limit in (self.stall_timeout, self.max_runtime)
+                  if limit]
+        return max(_MIN_INTERVAL, min(_MAX_INTERVAL, min(limits) / 10))
+
+    def _check(self) -> str:
+        """
+        :return:
+            The verdict upon the run, being the outcome to be reported, if it
+            is to be stopped, or else ``None``.
+        """
+        now = monotonic()
+        if self.max_runtime and now - self._started > self.max_runtime:
+            self.log.error('stopping since the run exceeded max_runtime of '
+                           '%ds', self.max_runtime)
+            return TIMEOUT
+        pid = self._pid
+        if not self.stall_timeout or pid is None:
+            return None
+        io = io_counter(pid)
+        if io is not None and io != self._io:
+            self._io = io
+            self.activity()
+        idle = now - self._last_activity
+        if idle > self.stall_timeout:
+            self.log.error('stopping since rsync has been inactive for %ds',
+                           idle)
+            return STALLED
+        return None
+
+    def _watch(self):
+        while not self._cancelled.wait(self._interval):
+            with self._lock:
+                if not self.pending:
+                    self.pending = self._check()
+                if not self.pending or self._pid is None:
+                    # Any verdict is enforced before the next spawn, but
+                    # watching continues in case that races with this.
+                    continue
+                self.verdict = self.pending
+            self._stop()
+            break
+
+    def activity(self):
+        """Note that rsync has shown signs of progress."""
+        self._last_activity = monotonic()
+
+    def enforce(self):
+        """
+        Abort the run, as it is about to spawn a process, if a verdict was
+        reached while none was running.
+
+        :raises SynchronizerException:
+            If the run is to be aborted.
+        """
+        with self._lock:
+            if self.pending and not self.verdict:
+                self.verdict = self.pending
+                raise SynchronizerException(
+                    f'aborted by the watchdog ({self.verdict})')
+
+    def cancel(self):
+        """Cease watching, now that the run has concluded."""
+        self._cancelled.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def start(self):
+        """Begin watching the run, if there are any limits."""
+        self._started = monotonic()
+        if not (self.stall_timeout or self.max_runtime):
+            return
+        self._thread = Thread(target=self._watch, name='watchdog',
+                              daemon=True)
+        self._thread.start()
+
+    def watch(self, pid: int):
+        """
+        Watch a newly spawned rsync process.
+
+        :param pid:
+            The ID of the rsync process or ``None`` if it has exited.
+        """
+        with self._lock:
+            self._pid = pid
+            self._io = None
+            self.activity()
@@ -0,0 +1,13 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import os
+import sys
+
+# The package is tested in place, without being installed.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'lib'))
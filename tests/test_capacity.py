@@ -0,0 +1,57 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import pytest
+
+from mirrmaid.capacity import forecast
+
+DAY = 24 * 60 * 60
+GB = 1000 ** 3
+
+
+def test_too_few_samples():
+    assert forecast([]) is None
+    assert forecast([(0, 100 * GB)]) is None
+
+
+def test_samples_spanning_too_short_a_time():
+    assert forecast([(0, 100 * GB), (59 * 60, 90 * GB)]) is None
+
+
+def test_shrinking_free_space():
+    samples = [(day * DAY, (100 - 10 * day) * GB) for day in range(5)]
+    per_day, days_until_full = forecast(samples)
+    assert per_day == pytest.approx(-10 * GB)
+    # 60 GB remain after the last sample.
+    assert days_until_full == pytest.approx(6)
+
+
+def test_growing_free_space():
+    samples = [(0, 50 * GB), (DAY, 60 * GB), (2 * DAY, 55 * GB)]
+    per_day, days_until_full = forecast(samples)
+    assert per_day == pytest.approx(2.5 * GB)
+    assert days_until_full is None
+
+
+def test_steady_free_space():
+    assert forecast([(0, 50 * GB), (DAY, 50 * GB)]) == (0, None)
+
+
+def test_already_full():
+    samples = [(0, 20 * GB), (DAY, 0)]
+    per_day, days_until_full = forecast(samples)
+    assert per_day == pytest.approx(-20 * GB)
+    assert days_until_full == 0
+
+
+def test_trend_is_fitted_through_noise():
+    samples = [(0, 100 * GB), (DAY, 96 * GB), (2 * DAY, 94 * GB),
+               (3 * DAY, 88 * GB), (4 * DAY, 84 * GB)]
+    per_day, days_until_full = forecast(samples)
+    assert per_day == pytest.approx(-4 * GB)
+    assert days_until_full == pytest.approx(21)
@@ -0,0 +1,160 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import pytest
+
+from mirrmaid import cluster
+from mirrmaid.cluster import ClusterCoordinator, LeaseStore
+from mirrmaid.reporting import FAILURE, RunReport, SUCCESS
+
+TTL = 60
+COSTS = {'a': 40.0, 'b': 30.0, 'c': 20.0, 'd': 10.0}
+
+
+class Clock(object):
+    """A wall clock that only advances when told to."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cluster, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def nodes(tmp_path, clock):
+    """A function returning a LeaseStore for a named node."""
+    return lambda node: LeaseStore(str(tmp_path), node, TTL)
+
+
+@pytest.fixture
+def coordinators():
+    """A function returning a ClusterCoordinator, closed after the test."""
+    created = []
+
+    def coordinator(store, window=None):
+        created.append(ClusterCoordinator(store, COSTS, window))
+        return created[-1]
+
+    yield coordinator
+    for c in created:
+        c.close()
+
+
+def report(mirror: str, outcome: str, elapsed: float = 10.0) -> RunReport:
+    run_report = RunReport(mirror, 'src', 'dst')
+    run_report.started -= elapsed
+    run_report.finish(0, outcome)
+    return run_report
+
+
+def test_lease_is_exclusive_until_it_expires(nodes, clock):
+    first, second = nodes('first'), nodes('second')
+    assert first.acquire('a')
+    assert not second.acquire('a')
+    clock.now += TTL - 1
+    assert first.renew('a')
+    clock.now += TTL - 1
+    assert not second.acquire('a')
+    clock.now += 2
+    assert second.acquire('a')
+    assert second.read('a')['node'] == 'second'
+    # The former holder learns that it lost the lease.
+    assert not first.renew('a')
+
+
+def test_expired_lease_is_not_renewed(nodes, clock):
+    first, second = nodes('first'), nodes('second')
+    assert first.acquire('a')
+    clock.now += TTL
+    assert not first.renew('a')
+    # Not having been extended, the lease may still be taken over.
+    assert second.acquire('a')
+    assert second.read('a')['node'] == 'second'
+
+
+def test_released_lease_is_handed_over_with_its_history(nodes):
+    first, second = nodes('first'), nodes('second')
+    assert first.acquire('a')
+    first.release('a', completed=True, elapsed=100.0)
+    lease = first.read('a')
+    assert lease['expires'] == 0
+    assert second.acquire('a')
+    lease = second.read('a')
+    assert lease['node'] == 'second'
+    assert lease['cost'] == 100.0
+    assert lease['completed'] is not None
+
+
+def test_cost_is_smoothed(nodes):
+    store = nodes('first')
+    assert store.acquire('a')
+    store.release('a', elapsed=100.0)
+    assert store.acquire('a')
+    store.release('a', elapsed=200.0)
+    smoothing = cluster.COST_SMOOTHING
+    expected = smoothing * 200 + (1 - smoothing) * 100
+    assert store.read('a')['cost'] == pytest.approx(expected)
+
+
+def test_nodes_claim_their_fair_share(nodes, coordinators):
+    first = coordinators(nodes('first'))
+    second = coordinators(nodes('second'))
+    first_claims = first.claims(list(COSTS))
+    second_claims = second.claims(list(COSTS))
+    # Both nodes are live, so each is due half of the total of 100.
+    assert [next(first_claims), next(first_claims)] == ['a', 'b']
+    assert list(second_claims) == ['c', 'd']
+    assert list(first_claims) == []
+
+
+def test_completed_mirrors_are_not_claimed_again(nodes, coordinators):
+    first = coordinators(nodes('first'))
+    assert list(first.claims(['a', 'b'])) == ['a', 'b']
+    first.report(report('a', SUCCESS))
+    first.report(report('b', FAILURE))
+    second = coordinators(nodes('second'))
+    assert list(second.claims(['a', 'b'])) == ['b']
+
+
+def test_late_node_counts_nodes_that_already_finished(nodes, coordinators,
+                                                      clock):
+    nodes('early').heartbeat()
+    nodes('other').heartbeat()
+    clock.now += 10 * TTL
+    late = nodes('late')
+    assert sorted(late.live_nodes()) == ['late']
+    assert sorted(late.live_nodes(20 * TTL)) == ['early', 'late', 'other']
+    # With three nodes in the cycle, the share is a third of 100, which 'a'
+    # alone exceeds.  Were the finished nodes not counted, 'late' would
+    # claim everything in its first pass.
+    claims = coordinators(late, 20 * TTL).claims(list(COSTS))
+    assert next(claims) == 'a'
+    busy = coordinators(nodes('busy'), 20 * TTL)
+    assert next(busy.claims(list(COSTS))) == 'b'
+
+
+def test_mirrors_of_dead_node_are_taken_over(nodes, coordinators, clock):
+    dead = nodes('dead')
+    assert dead.acquire('a')
+    dead.heartbeat()
+    survivor = coordinators(nodes('survivor'))
+    # The lease is still valid, so the survivor claims all but it.
+    assert list(survivor.claims(list(COSTS))) == ['b', 'c', 'd']
+    for mirror in 'bcd':
+        survivor.report(report(mirror, SUCCESS))
+    clock.now += TTL + 1
+    assert list(survivor.claims(list(COSTS))) == ['a']
+    assert survivor.store.read('a')['node'] == 'survivor'
@@ -0,0 +1,49 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import logging
+import sys
+
+import pytest
+
+from mirrmaid.logging.collector import LogCollector
+
+
+@pytest.fixture
+def root(monkeypatch):
+    """The root logger, with its handlers restored after the test."""
+    root = logging.getLogger()
+    monkeypatch.setattr(root, 'handlers', [])
+    return root
+
+
+def test_only_file_handlers_are_collected(root, tmp_path):
+    console = logging.StreamHandler(sys.stderr)
+    log_file = logging.FileHandler(str(tmp_path / 'log'), delay=True)
+    root.addHandler(console)
+    root.addHandler(log_file)
+    collector = LogCollector('queue')
+    collector.start()
+    try:
+        assert collector.handlers == [log_file]
+        assert console in root.handlers
+        assert log_file not in root.handlers
+    finally:
+        collector.stop()
+    assert console in root.handlers
+    assert log_file in root.handlers
+
+
+def test_nothing_is_collected_without_file_handlers(root):
+    console = logging.StreamHandler(sys.stderr)
+    root.addHandler(console)
+    collector = LogCollector('queue')
+    collector.start()
+    assert collector.handlers == []
+    assert console in root.handlers
+    collector.stop()
@@ -0,0 +1,123 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import pytest
+
+from mirrmaid.config import MirrorTable
+from mirrmaid.exceptions import MirrmaidRuntimeException
+
+CONFIG = """
+[DEFAULT]
+target_host: mirror.example.org
+exclude: []
+
+[MIRRORS]
+mirrors: []
+
+[TEMPLATE fedora]
+source: rsync://dl.example.org/fedora/{release}/{arch}/
+target: /srv/mirrors/fedora/{release}/{arch}/
+include: ['{arch}/']
+rsync_profiles: ['lan']
+
+[BULK fedora]
+name: fedora-{release}-{arch}
+template: fedora
+release: [39, 40]
+arch: ['x86_64', 'aarch64']
+
+[fedora-40-x86_64]
+include: ['everything/']
+rsync_options_add: ['--checksum']
+
+[epel]
+source: rsync://dl.example.org/epel/
+target: /srv/mirrors/epel/
+include: []
+
+[PROFILE lan]
+rsync_options_add: ['--whole-file']
+rsync_options_remove: ['--compress']
+"""
+
+
+def table(tmp_path, content: str = CONFIG, enabled=None) -> MirrorTable:
+    filename = tmp_path / 'mirrmaid.conf'
+    filename.write_text(content)
+    return MirrorTable(str(filename), enabled or [])
+
+
+def test_bulk_section_declares_every_combination(tmp_path):
+    assert sorted(table(tmp_path)) == [
+        'epel',
+        'fedora-39-aarch64', 'fedora-39-x86_64',
+        'fedora-40-aarch64', 'fedora-40-x86_64',
+    ]
+
+
+def test_template_is_expanded_with_variables(tmp_path):
+    mirror = table(tmp_path)['fedora-39-aarch64']
+    assert mirror.mirror_name == 'fedora-39-aarch64'
+    assert mirror.source == 'rsync://dl.example.org/fedora/39/aarch64/'
+    assert mirror.includes == ['aarch64/']
+    # The [DEFAULT] section still applies.
+    assert mirror.excludes == []
+
+
+def test_own_section_overrides_template(tmp_path):
+    mirrors = table(tmp_path)
+    mirror = mirrors['fedora-40-x86_64']
+    assert mirrors.template('fedora-40-x86_64') == 'fedora'
+    assert mirror.includes == ['everything/']
+    assert mirror.target == '/srv/mirrors/fedora/40/x86_64/'
+    assert mirror.rsync_options_add == ['--checksum']
+
+
+def test_mirror_without_template(tmp_path):
+    mirrors = table(tmp_path)
+    assert mirrors.template('epel') is None
+    assert mirrors['epel'].source == 'rsync://dl.example.org/epel/'
+
+
+def test_unknown_mirror(tmp_path):
+    mirrors = table(tmp_path)
+    assert 'fedora-41-x86_64' not in mirrors
+    with pytest.raises(KeyError):
+        mirrors['fedora-41-x86_64']
+
+
+def test_enabled_patterns_keep_order_without_duplicates(tmp_path):
+    mirrors = table(tmp_path, enabled=[
+        'epel', 'fedora-40-*', 'fedora-40-x86_64', 'nonesuch', 'centos-*',
+    ])
+    assert mirrors.enabled == [
+        'epel', 'fedora-40-aarch64', 'fedora-40-x86_64',
+    ]
+
+
+def test_profile(tmp_path):
+    assert table(tmp_path).profile('lan') == (['--whole-file'],
+                                              ['--compress'])
+    with pytest.raises(MirrmaidRuntimeException):
+        table(tmp_path).profile('wan')
+
+
+def test_undeclared_template(tmp_path):
+    with pytest.raises(MirrmaidRuntimeException, match='centos'):
+        table(tmp_path, CONFIG + '\n[stream]\ntemplate: centos\n')
+
+
+def test_bulk_mirror_declared_twice(tmp_path):
+    content = CONFIG + '\n[BULK again]\nname: fedora-{r}-x86_64\nr: 40\n'
+    with pytest.raises(MirrmaidRuntimeException, match='again'):
+        table(tmp_path, content)
+
+
+def test_bulk_section_requires_name(tmp_path):
+    with pytest.raises(MirrmaidRuntimeException, match='name'):
+        table(tmp_path, CONFIG + '\n[BULK nameless]\nrelease: [1]\n')
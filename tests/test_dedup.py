@@ -0,0 +1,101 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import os
+
+import pytest
+
+from mirrmaid import dedup
+from mirrmaid.dedup import DedupIndex, Deduplicator
+
+CONTENT = b'identical content\n' * 100
+MTIME_NS = 1700000000 * 10 ** 9
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch) -> DedupIndex:
+    monkeypatch.setattr(dedup, 'LOCK_DIRECTORY', str(tmp_path))
+    index = DedupIndex(str(tmp_path / 'dedup.sqlite'))
+    yield index
+    index.close()
+
+
+def make_file(root, name: str = 'file', content: bytes = CONTENT,
+              mode: int = 0o644, mtime_ns: int = MTIME_NS) -> str:
+    root.mkdir(exist_ok=True)
+    path = root / name
+    path.write_bytes(content)
+    os.chmod(path, mode)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def deduplicate(index: DedupIndex, *roots) -> Deduplicator:
+    deduplicator = Deduplicator(index, 2, 0)
+    deduplicator.run([(root.name, str(root)) for root in roots])
+    return deduplicator
+
+
+def linked(path: str, other: str) -> bool:
+    return os.stat(path).st_ino == os.stat(other).st_ino
+
+
+def test_identical_files_are_linked(tmp_path, index):
+    a = make_file(tmp_path / 'a')
+    b = make_file(tmp_path / 'b')
+    deduplicator = deduplicate(index, tmp_path / 'a', tmp_path / 'b')
+    assert linked(a, b)
+    assert deduplicator.linked == 1
+    assert deduplicator.saved == len(CONTENT)
+    assert not os.path.exists(b + dedup.LINK_SUFFIX)
+
+
+def test_files_differing_in_mtime_are_not_linked(tmp_path, index):
+    a = make_file(tmp_path / 'a')
+    b = make_file(tmp_path / 'b', mtime_ns=MTIME_NS + 1)
+    assert deduplicate(index, tmp_path / 'a', tmp_path / 'b').linked == 0
+    assert not linked(a, b)
+
+
+def test_files_differing_in_mode_are_not_linked(tmp_path, index):
+    a = make_file(tmp_path / 'a')
+    b = make_file(tmp_path / 'b', mode=0o600)
+    assert deduplicate(index, tmp_path / 'a', tmp_path / 'b').linked == 0
+    assert not linked(a, b)
+
+
+def test_files_on_other_devices_are_skipped(tmp_path, index):
+    a = make_file(tmp_path / 'a')
+    b = make_file(tmp_path / 'b')
+    deduplicate(index, tmp_path / 'a')
+    # As though the target of mirror a were on another filesystem.
+    index._db.execute('UPDATE files SET device = device + 1')
+    assert deduplicate(index, tmp_path / 'b').linked == 0
+    assert not linked(a, b)
+
+
+def test_file_changed_while_hashed_is_not_linked(tmp_path, index,
+                                                 monkeypatch):
+    a = make_file(tmp_path / 'a')
+    b = make_file(tmp_path / 'b')
+    hash_ = Deduplicator._hash
+
+    def hash_then_update(candidate):
+        result = hash_(candidate)
+        if candidate[0] == b:
+            make_file(tmp_path / 'b', content=b'updated\n' * 100,
+                      mtime_ns=MTIME_NS + 10 ** 9)
+        return result
+
+    monkeypatch.setattr(Deduplicator, '_hash',
+                        staticmethod(hash_then_update))
+    assert deduplicate(index, tmp_path / 'a', tmp_path / 'b').linked == 0
+    assert not linked(a, b)
+    with open(b, 'rb') as f:
+        assert f.read() == b'updated\n' * 100
+    assert not os.path.exists(b + dedup.LINK_SUFFIX)
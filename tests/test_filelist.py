@@ -0,0 +1,115 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import os
+
+import pytest
+
+from mirrmaid import filelist
+from mirrmaid.filelist import FileListIndex, UNKNOWN, changes, write_index
+
+ENTRIES = [
+    ('releases/40/x86_64/b.rpm', 200, 1700000200),
+    ('releases/40/x86_64/a.rpm', 100, 1700000100),
+    ('README', 10, 1600000000),
+    ('releases/40/x86_64/c.rpm', UNKNOWN, UNKNOWN),
+    ('\udcff-undecodable', 1, 1),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    """A function writing an index of the entries and then opening it."""
+    source = tmp_path / 'fullfiletimelist'
+    source.write_text('')
+    opened = []
+
+    def index(entries, name='index') -> FileListIndex:
+        write_index(str(tmp_path / name), iter(entries), str(source))
+        opened.append(FileListIndex(str(tmp_path / name)))
+        return opened[-1]
+
+    yield index
+    for i in opened:
+        i.close()
+
+
+def encoded(entries) -> list:
+    return sorted((path.encode('utf-8', 'surrogateescape'), size, mtime)
+                  for path, size, mtime in entries)
+
+
+def test_index_is_sorted_by_path(index):
+    assert list(index(ENTRIES)) == encoded(ENTRIES)
+
+
+@pytest.mark.parametrize('run_length', [1, 2, 3, len(ENTRIES)])
+def test_index_is_sorted_in_runs(index, monkeypatch, run_length):
+    monkeypatch.setattr(filelist, '_RUN_LENGTH', run_length)
+    result = index(ENTRIES)
+    assert len(result) == len(ENTRIES)
+    assert list(result) == encoded(ENTRIES)
+
+
+def test_empty_index(index):
+    result = index([])
+    assert len(result) == 0
+    assert list(result) == []
+    assert result.find(b'README') is None
+
+
+def test_find(index):
+    result = index(ENTRIES)
+    assert result.find(b'README') == (10, 1600000000)
+    assert result.find(b'releases/40/x86_64/c.rpm') == (UNKNOWN, UNKNOWN)
+    assert result.find(b'releases/40/x86_64/d.rpm') is None
+    assert result.find(b'') is None
+
+
+def test_describes_its_source(index, tmp_path):
+    result = index(ENTRIES)
+    source = str(tmp_path / 'fullfiletimelist')
+    assert result.describes(source)
+    os.utime(source, (0, 0))
+    assert not result.describes(source)
+
+
+def test_not_an_index(tmp_path):
+    (tmp_path / 'bogus').write_bytes(b'not an index at all, not at all')
+    with pytest.raises(ValueError):
+        FileListIndex(str(tmp_path / 'bogus'))
+
+
+def test_changes(index):
+    previous = index(ENTRIES, 'previous')
+    current = index([
+        ('README', 10, 1600000000),
+        ('releases/40/x86_64/a.rpm', 101, 1700000100),
+        ('releases/40/x86_64/c.rpm', UNKNOWN, UNKNOWN),
+        ('releases/40/x86_64/d.rpm', 400, 1700000400),
+        ('\udcff-undecodable', 1, 2),
+    ], 'current')
+    assert list(changes(previous, current)) == [
+        (b'releases/40/x86_64/a.rpm', False),
+        (b'releases/40/x86_64/b.rpm', True),
+        (b'releases/40/x86_64/d.rpm', False),
+        (b'\xff-undecodable', False),
+    ]
+
+
+def test_no_changes(index):
+    assert list(changes(index(ENTRIES, 'a'), index(ENTRIES, 'b'))) == []
+
+
+def test_everything_changed(index):
+    previous = index([], 'previous')
+    current = index(ENTRIES, 'current')
+    assert list(changes(previous, current)) == [
+        (path, False) for path, _, _ in encoded(ENTRIES)]
+    assert list(changes(current, previous)) == [
+        (path, True) for path, _, _ in encoded(ENTRIES)]
@@ -0,0 +1,80 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import logging
+import os
+import signal
+from threading import Thread
+from time import sleep
+
+from doubledog.config.sectioned import DefaultConfig
+
+from mirrmaid.config import MirrorTable
+from mirrmaid.hooks import HookPool
+from mirrmaid.reporting import RunReport, SUCCESS
+from mirrmaid.synchronizer import Synchronizer
+
+_log = logging.getLogger('mirrmaid.test.hooks')
+
+CONFIG = """
+[MIRRORS]
+mirrors: ['repo']
+
+[repo]
+source: rsync://mirror.example.org/repo
+target: {target}
+include: []
+exclude: []
+post_sync: ['false', 'true']
+"""
+
+
+def test_hook_exceeding_its_time_limit_is_killed(caplog):
+    results = HookPool(1).run(_log, ['sleep 30', 'true'], timeout=1)
+    # The remaining hooks are skipped.
+    assert len(results) == 1
+    assert results[0].exit_code == -signal.SIGKILL
+    assert results[0].elapsed < 10
+    assert 'exceeded its time limit' in caplog.text
+
+
+def test_hooks_are_bounded_by_the_slots(tmp_path):
+    running = tmp_path / 'running'
+    running.mkdir()
+    # Each hook advertises itself while it runs.
+    command = f'sh -c "touch {running}/$$; sleep 0.5; rm {running}/$$"'
+    pool = HookPool(2)
+    results = []
+    workers = [Thread(target=lambda: results.extend(pool.run(_log, [command])))
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    most = 0
+    while any(worker.is_alive() for worker in workers):
+        most = max(most, len(os.listdir(running)))
+        sleep(0.02)
+    assert most == 2
+    assert [result.exit_code for result in results] == [os.EX_OK] * 4
+
+
+def test_hook_failure_does_not_fail_the_sync(tmp_path, caplog):
+    filename = str(tmp_path / 'mirrmaid.conf')
+    with open(filename, 'w') as f:
+        f.write(CONFIG.format(target=tmp_path / 'target'))
+    table = MirrorTable(filename, ['repo'])
+    synchronizer = Synchronizer(DefaultConfig(filename), table['repo'],
+                                hook_pool=HookPool(1))
+    # As though rsync had just succeeded.
+    synchronizer.report = RunReport('repo', 'src', 'dst')
+    synchronizer.exit_code = os.EX_OK
+    synchronizer._run_post_sync_hooks()
+    synchronizer._report(True)
+    assert [r.exit_code for r in synchronizer.hook_results] == [1]
+    assert synchronizer.report.outcome == SUCCESS
+    assert "post-sync hook 'false' exit code=1" in caplog.text
+    assert 'remaining post-sync hooks skipped' in caplog.text
@@ -0,0 +1,86 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import pytest
+
+from mirrmaid.journal import JournalQuery, RunJournal
+from mirrmaid.reporting import (
+    DEFERRED, FAILURE, LOCKED, RunReport, SUCCESS,
+)
+from mirrmaid.stats import RsyncStats
+
+
+def run_report(mirror: str, outcome: str, elapsed: float = 10.0,
+               received: int = 1000, dry_run: bool = False) -> RunReport:
+    report = RunReport(mirror, 'rsync://example.org/repo', '/srv/repo',
+                       dry_run)
+    report.stats = {RsyncStats.TOTAL_BYTES_RECEIVED: received,
+                    RsyncStats.TOTAL_TRANSFERRED_FILE_SIZE: received}
+    report.finish(0 if outcome == SUCCESS else 23, outcome)
+    report.finished = report.started + elapsed
+    return report
+
+
+@pytest.fixture
+def query(tmp_path) -> callable:
+    """
+    :return:
+        A function that journals the given RunReports and returns a
+        JournalQuery of them.
+    """
+    filename = str(tmp_path / 'journal.sqlite')
+
+    def journal(*reports) -> JournalQuery:
+        run_journal = RunJournal(filename)
+        for report in reports:
+            run_journal.report(report)
+        run_journal.close()
+        return JournalQuery(filename)
+
+    return journal
+
+
+def test_failure_rates_ignore_runs_that_were_held_back(query):
+    journal = query(
+        run_report('a', SUCCESS),
+        run_report('a', FAILURE),
+        run_report('a', LOCKED),
+        run_report('a', DEFERRED),
+        run_report('a', DEFERRED),
+        run_report('b', SUCCESS),
+        run_report('b', DEFERRED),
+        run_report('c', FAILURE, dry_run=True),
+    )
+    assert journal.failure_rates(30) == [('a', 2, 1, 50.0), ('b', 1, 0, 0.0)]
+    assert journal.failure_rates(30, 'b') == [('b', 1, 0, 0.0)]
+
+
+def test_slowest_ignores_runs_that_were_held_back(query):
+    journal = query(
+        run_report('a', SUCCESS, elapsed=10),
+        run_report('a', FAILURE, elapsed=30),
+        run_report('a', DEFERRED, elapsed=0),
+        run_report('b', SUCCESS, elapsed=5),
+        run_report('b', LOCKED, elapsed=600),
+    )
+    assert [row[:4] for row in journal.slowest(30)] == [
+        ('a', 2, pytest.approx(20), pytest.approx(30)),
+        ('b', 1, pytest.approx(5), pytest.approx(5)),
+    ]
+
+
+def test_successful_runs_only_are_measured(query):
+    journal = query(
+        run_report('a', SUCCESS, elapsed=10, received=1000),
+        run_report('a', SUCCESS, elapsed=30, received=3000),
+        run_report('a', FAILURE, elapsed=100, received=10 ** 6),
+    )
+    assert journal.mean_elapsed(30) == {'a': pytest.approx(20)}
+    assert journal.max_transferred(30) == {'a': 3000}
+    assert journal.throughput(30) == {'a': pytest.approx(100),
+                                      None: pytest.approx(100)}
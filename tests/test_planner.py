@@ -0,0 +1,28 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+from mirrmaid.planner import makespan
+
+
+def test_makespan_of_no_mirrors():
+    assert makespan([], 2) == 0
+
+
+def test_makespan_with_one_worker_is_the_sum():
+    assert makespan([3, 1, 2], 1) == 6
+
+
+def test_makespan_starts_mirrors_in_order_on_the_first_free_worker():
+    # Worker A: 10; worker B: 2, then 3, then 4.
+    assert makespan([10, 2, 3, 4], 2) == 10
+    # Worker A: 1, then 10; worker B: 5.
+    assert makespan([1, 5, 10], 2) == 11
+
+
+def test_makespan_with_more_workers_than_mirrors():
+    assert makespan([4, 7], 8) == 7
@@ -0,0 +1,77 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+from types import SimpleNamespace
+
+from mirrmaid.exceptions import SynchronizerException
+from mirrmaid.preflight import MirrorCheck, Preflight
+
+GiB = 1024 ** 3
+
+
+def stubbed_check(mirror: str) -> MirrorCheck:
+    """Check each mirror according to its name, rather than its worth."""
+    check = MirrorCheck(mirror)
+    check.free = 2 * GiB
+    check.locked = mirror.startswith('locked')
+    if mirror.startswith('bad'):
+        check.problems += ['upstream did not respond within 5s',
+                           'target is not writable']
+    else:
+        check.probe_time = 0.25
+    return check
+
+
+def test_results_are_aggregated_in_cycle_order(monkeypatch):
+    preflight = Preflight(None, 3, 5)
+    monkeypatch.setattr(preflight, 'check', stubbed_check)
+    mirrors = ['ok', 'bad-1', 'locked', 'bad-2', 'last']
+    checks = preflight.run(mirrors)
+    assert [c.mirror for c in checks] == mirrors
+    assert preflight.passed == ['ok', 'locked', 'last']
+
+
+def test_results_are_reported_as_a_table(monkeypatch):
+    preflight = Preflight(None, 2, 5)
+    monkeypatch.setattr(preflight, 'check', stubbed_check)
+    preflight.run(['ok', 'bad', 'locked'])
+    header, _, *rows = str(preflight).splitlines()
+    assert header.split() == ['MIRROR', 'RESULT', 'FREE', 'LOCK',
+                              'PROBE_SECS', 'PROBLEMS']
+    assert rows[0].split() == ['ok', 'ok', '2.0', 'GiB', 'free', '0.25', '-']
+    assert rows[1].split()[:5] == ['bad', 'dropped', '2.0', 'GiB', 'free']
+    assert rows[1].endswith('upstream did not respond within 5s; '
+                            'target is not writable')
+    assert rows[2].split()[:5] == ['locked', 'ok', '2.0', 'GiB', 'held']
+
+
+def test_invalid_configuration_is_a_problem():
+    def synchronizer(mirror):
+        raise SynchronizerException('rsync_options is not a list')
+
+    check = Preflight(synchronizer, 1, 5).check('repo')
+    assert not check.passed
+    assert check.problems == [
+        'invalid configuration: rsync_options is not a list']
+
+
+def test_local_mirror_is_checked_without_rsync(tmp_path):
+    mirror_conf = SimpleNamespace(
+        source=str(tmp_path / 'missing'), target=str(tmp_path / 'target'),
+        space_check='none', space_reserve=0)
+
+    def synchronizer(mirror):
+        return SimpleNamespace(
+            mirror_conf=mirror_conf, rsync_command=[],
+            lock_file=SimpleNamespace(name=str(tmp_path / 'repo.lock')))
+
+    check = Preflight(synchronizer, 1, 5).check('repo')
+    assert check.problems == [f'source {mirror_conf.source!r} is not a '
+                              f'directory']
+    assert check.locked is False
+    assert check.free is not None
@@ -0,0 +1,98 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import logging
+from time import sleep
+
+from doubledog.config.sectioned import DefaultConfig
+
+from mirrmaid import process
+from mirrmaid.config import MirrorTable
+from mirrmaid.hooks import HookPool
+from mirrmaid.process import CONTEXT, ProcessEvents, SynchronizerProcess
+from mirrmaid.reporting import DEFERRED
+from mirrmaid.synchronizer import Synchronizer
+
+CONFIG = """
+[MIRRORS]
+mirrors: ['repo']
+
+[repo]
+source: {source}
+target: {target}
+include: []
+exclude: []
+rsync_options: ['-a']
+space_check: history
+space_reserve: 1000000000000000000
+"""
+
+
+def _occupy_slot(hook_pool: HookPool, occupied, release):
+    """Hold a slot of the *hook_pool* until told to *release* it."""
+    with hook_pool._slots:
+        occupied.set()
+        release.wait(10)
+
+
+def test_child_shares_hook_slots():
+    hook_pool = HookPool(1, CONTEXT.BoundedSemaphore(1))
+    occupied, release = CONTEXT.Event(), CONTEXT.Event()
+    child = CONTEXT.Process(target=_occupy_slot,
+                            args=(hook_pool, occupied, release))
+    child.start()
+    try:
+        assert occupied.wait(30)
+        assert not hook_pool._slots.acquire(timeout=0.1)
+    finally:
+        release.set()
+        child.join()
+    assert hook_pool._slots.acquire(timeout=1)
+
+
+def test_configured_levels_are_passed_on(monkeypatch):
+    root = logging.getLogger()
+    monkeypatch.setattr(root, 'level', logging.DEBUG)
+    quiet = logging.getLogger('mirrmaid.test.quiet')
+    monkeypatch.setattr(quiet, 'level', logging.ERROR)
+    levels = process._configured_levels()
+    assert levels[''] == logging.DEBUG
+    assert levels['mirrmaid.test.quiet'] == logging.ERROR
+    assert 'mirrmaid.test' not in levels
+
+
+def test_report_is_received_before_the_worker_retires(tmp_path, monkeypatch):
+    # Make the receiver lag behind the child process.
+    report = ProcessEvents._report
+
+    def slow_report(self, run_report):
+        sleep(1)
+        report(self, run_report)
+
+    monkeypatch.setattr(ProcessEvents, '_report', slow_report)
+    filename = str(tmp_path / 'mirrmaid.conf')
+    (tmp_path / 'source').mkdir()
+    with open(filename, 'w') as f:
+        f.write(CONFIG.format(source=tmp_path / 'source',
+                              target=tmp_path / 'target'))
+    table = MirrorTable(filename, ['repo'])
+    # The huge space_reserve defers the run, without any need of rsync.
+    events = ProcessEvents([])
+    worker = SynchronizerProcess(
+        Synchronizer(DefaultConfig(filename), table['repo'],
+                     expected_incoming=0),
+        events, logging.CRITICAL)
+    worker.start()
+    try:
+        while worker.is_alive():
+            sleep(0.1)
+        assert worker.report is not None
+        assert worker.report.outcome == DEFERRED
+    finally:
+        worker.join()
+        events.close()
@@ -0,0 +1,112 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import logging
+import os
+
+import pytest
+
+from mirrmaid import resources
+from mirrmaid.exceptions import MirrmaidRuntimeException, SynchronizerException
+from mirrmaid.resources import ResourceControls, delegate
+
+_log = logging.getLogger('mirrmaid.test')
+
+
+class MirrorConf(object):
+    """Just the settings of a mirror that ResourceControls uses."""
+
+    mirror_name = 'fedora'
+    cgroup_cpu_weight = 0
+    cgroup_io_max = []
+    cgroup_io_weight = 50
+    ionice_class = 'none'
+    ionice_priority = 4
+    nice = 0
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """
+    A stand-in for the delegated cgroup in which this process runs, where
+    this process is deemed to be wherever its cgroup.procs was last written.
+    """
+    root = tmp_path / 'service'
+    root.mkdir()
+    for name in ['cgroup.procs', 'cgroup.subtree_control']:
+        (root / name).write_text('')
+    own = [str(root)]
+    mkdir = os.makedirs
+
+    def write(path: str, value: str):
+        if os.path.basename(path) == 'cgroup.procs':
+            own[0] = os.path.dirname(path)
+        mode = 'a' if path.endswith('subtree_control') else 'w'
+        with open(path, mode) as f:
+            f.write(value.lstrip('+') + '\n')
+
+    def makedirs(path: str, exist_ok: bool = False):
+        # The kernel provides the interface files of a new cgroup.
+        mkdir(path, exist_ok=exist_ok)
+        for name in ['cgroup.procs', 'cgroup.subtree_control']:
+            if not os.path.exists(os.path.join(path, name)):
+                open(os.path.join(path, name), 'w').close()
+
+    monkeypatch.setattr(resources, '_write', write)
+    monkeypatch.setattr(resources, '_own_cgroup', lambda: own[0])
+    monkeypatch.setattr(resources.os, 'makedirs', makedirs)
+    return root
+
+
+def test_delegate_moves_into_leaf(cgroup):
+    delegate(['io'])
+    assert resources._own_cgroup() == str(cgroup / 'manager')
+    assert (cgroup / 'cgroup.subtree_control').read_text().split() == ['io']
+    assert (cgroup / 'mirrors' / 'cgroup.subtree_control').read_text() \
+        .split() == ['io']
+    # Once more, as by a spawned worker process, changes nothing.
+    delegate(['io'])
+    assert resources._own_cgroup() == str(cgroup / 'manager')
+    assert (cgroup / 'cgroup.subtree_control').read_text().split() == ['io']
+
+
+def test_delegate_requires_delegation(cgroup, monkeypatch):
+    monkeypatch.setattr(os, 'access', lambda path, mode: False)
+    with pytest.raises(MirrmaidRuntimeException):
+        delegate(['io'])
+
+
+def test_mirror_cgroup_is_beside_manager(cgroup):
+    delegate(['io'])
+    controls = ResourceControls(MirrorConf(), _log)
+    controls.prepare()
+    directory = cgroup / 'mirrors' / 'fedora'
+    assert controls.directory == str(directory)
+    assert (directory / 'io.weight').read_text() == 'default 50\n'
+    assert controls.prefix[-1] == str(directory / 'cgroup.procs')
+
+
+def test_mirror_cgroup_requires_delegate(cgroup):
+    with pytest.raises(SynchronizerException):
+        ResourceControls(MirrorConf(), _log).prepare()
+
+
+def test_negative_nice_is_rejected():
+    conf = MirrorConf()
+    conf.cgroup_io_weight = 0
+    conf.nice = -5
+    with pytest.raises(SynchronizerException, match='negative'):
+        ResourceControls(conf, _log).prepare()
+
+
+def test_realtime_ionice_class_is_rejected():
+    conf = MirrorConf()
+    conf.cgroup_io_weight = 0
+    conf.ionice_class = 'realtime'
+    with pytest.raises(SynchronizerException, match='realtime'):
+        ResourceControls(conf, _log).prepare()
@@ -0,0 +1,60 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import os
+
+import pytest
+
+from mirrmaid import rules
+from mirrmaid.exceptions import SynchronizerException
+from mirrmaid.rules import EXCLUDE, INCLUDE, FilterRules
+
+
+def test_inclusions_precede_exclusions():
+    compiled = FilterRules('m', ['a/'], ['b/', 'c/'])
+    assert compiled.rules == [(INCLUDE, 'a/'), (EXCLUDE, 'b/'),
+                              (EXCLUDE, 'c/')]
+
+
+def test_duplicates_are_dropped():
+    compiled = FilterRules('m', ['a/', 'a/'], ['a/', 'b/'])
+    assert compiled.rules == [(INCLUDE, 'a/'), (EXCLUDE, 'b/')]
+
+
+def test_rules_after_catch_all_are_dropped():
+    compiled = FilterRules('m', ['repodata/***'], ['*', 'debug/'])
+    assert compiled.rules == [(INCLUDE, 'repodata/***'), (EXCLUDE, '*')]
+
+
+@pytest.mark.parametrize('pattern', ['', None, 'a\nb', 'a\rb'])
+def test_invalid_patterns_are_rejected(pattern):
+    with pytest.raises(SynchronizerException):
+        FilterRules('m', [pattern], [])
+
+
+def test_digest_depends_on_the_patterns():
+    assert (FilterRules('m', ['a'], []).digest
+            == FilterRules('m', ['a'], []).digest)
+    assert (FilterRules('m', ['a'], []).digest
+            != FilterRules('m', [], ['a']).digest)
+
+
+def test_install_writes_once_and_discards_stale(monkeypatch, tmp_path):
+    monkeypatch.setattr(rules, 'FILTER_DIRECTORY', str(tmp_path))
+    old = FilterRules('m', ['a/'], []).install()
+    other = FilterRules('other', ['x/'], []).install()
+    new = FilterRules('m', ['b/'], ['*'])
+    filename = new.install()
+    assert filename == new.filename
+    with open(filename) as f:
+        assert f.read().splitlines()[1:] == ['+ b/', '- *']
+    assert not os.path.exists(old)
+    assert os.path.exists(other)
+    mtime = os.stat(filename).st_mtime_ns
+    assert new.install() == filename
+    assert os.stat(filename).st_mtime_ns == mtime
@@ -0,0 +1,115 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import json
+import os
+
+import pytest
+
+from mirrmaid.logging import spool
+from mirrmaid.logging.spool import MailSpool, RETRY_DELAY, SpoolSender
+
+
+class Mailer(object):
+    """Stands in for the MiniMailer, failing as often as told to."""
+
+    sent = []
+    failures = 0
+
+    def send(self, sender, recipients, subject, body):
+        if Mailer.failures:
+            Mailer.failures -= 1
+            raise ConnectionRefusedError('refused')
+        Mailer.sent.append((sender, recipients, subject, body))
+
+
+class Clock(object):
+    """A clock that only advances when told to."""
+
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def mailer(monkeypatch):
+    monkeypatch.setattr(spool, 'MiniMailer', Mailer)
+    monkeypatch.setattr(Mailer, 'sent', [])
+    monkeypatch.setattr(Mailer, 'failures', 0)
+    return Mailer
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(spool, 'time', clock)
+    return clock
+
+
+def spooled(directory) -> list:
+    return sorted(name for name in os.listdir(directory)
+                  if name.endswith('.json'))
+
+
+def test_message_is_spooled_whole(tmp_path):
+    mail_spool = MailSpool(str(tmp_path))
+    mail_spool.put('me@example.org', ['you@example.org'], 'subject', 'body')
+    name, = spooled(tmp_path)
+    # No temporary file is left behind.
+    assert os.listdir(tmp_path) == [name]
+    with open(tmp_path / name) as f:
+        message = json.load(f)
+    assert message['recipients'] == ['you@example.org']
+    assert message['body'] == 'body'
+    assert message['attempts'] == 0
+
+
+def test_interrupted_write_spools_nothing(tmp_path, monkeypatch, mailer):
+    def dump(message, f):
+        f.write('{"sender": ')
+        raise OSError('no space left on device')
+
+    monkeypatch.setattr(spool.json, 'dump', dump)
+    mail_spool = MailSpool(str(tmp_path))
+    with pytest.raises(OSError):
+        mail_spool.put('me@example.org', ['you@example.org'], 'subject',
+                       'body')
+    assert os.listdir(tmp_path) == []
+    assert mail_spool.deliver_due() is None
+    assert mailer.sent == []
+
+
+def test_failed_send_is_retried_once_due(tmp_path, mailer, clock):
+    mailer.failures = 1
+    mail_spool = MailSpool(str(tmp_path))
+    mail_spool.put('me@example.org', ['you@example.org'], 'subject', 'body')
+    assert mail_spool.deliver_due() == clock.now + RETRY_DELAY
+    name, = spooled(tmp_path)
+    with open(tmp_path / name) as f:
+        assert json.load(f)['attempts'] == 1
+    # Not yet due.
+    clock.now += RETRY_DELAY - 1
+    assert mail_spool.deliver_due() == clock.now + 1
+    assert mailer.sent == []
+    clock.now += 1
+    assert mail_spool.deliver_due() is None
+    assert mailer.sent == [('me@example.org', ['you@example.org'], 'subject',
+                            'body')]
+    assert os.listdir(tmp_path) == []
+
+
+def test_sent_message_is_removed(tmp_path, mailer):
+    mail_spool = MailSpool(str(tmp_path))
+    sender = SpoolSender(mail_spool)
+    mail_spool.put('me@example.org', ['you@example.org'], 'subject', 'body')
+    sender.wake()
+    sender.stop()
+    assert len(mailer.sent) == 1
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,60 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+from mirrmaid.stats import RsyncStats
+
+OUTPUT = """\
+Number of files: 1,234 (reg: 1,000, dir: 234)
+Number of created files: 10
+Number of deleted files: 2
+Number of regular files transferred: 12
+Total file size: 1.50G bytes
+Total transferred file size: 2,048 bytes
+Literal data: 2,048 bytes
+File list generation time: 0.250 seconds
+File list transfer time: 0.000 seconds
+Total bytes sent: 345
+Total bytes received: 4,567
+"""
+
+
+def feed(text: str) -> RsyncStats:
+    stats = RsyncStats()
+    for line in text.splitlines():
+        stats.feed(line)
+    return stats
+
+
+def test_feed_parses_statistics():
+    stats = feed(OUTPUT)
+    assert stats[RsyncStats.FILES] == 1234
+    assert stats[RsyncStats.DELETED_FILES] == 2
+    assert stats[RsyncStats.TOTAL_FILE_SIZE] == 1500000000
+    assert stats[RsyncStats.TOTAL_TRANSFERRED_FILE_SIZE] == 2048
+    assert stats[RsyncStats.FILE_LIST_GENERATION_TIME] == 0.25
+    assert stats[RsyncStats.TOTAL_BYTES_RECEIVED] == 4567
+
+
+def test_feed_ignores_other_lines():
+    stats = RsyncStats()
+    assert not stats.feed('receiving incremental file list')
+    assert not stats.feed('pub/fedora/Packages/a.rpm')
+    assert len(stats) == 0
+    assert stats.get(RsyncStats.FILES) is None
+
+
+def test_merge_sums_work_but_not_tree():
+    first = feed(OUTPUT)
+    second = feed('Number of files: 1,300\n'
+                  'Number of deleted files: 3\n'
+                  'Total bytes received: 33\n')
+    first.merge(second)
+    assert first[RsyncStats.FILES] == 1300
+    assert first[RsyncStats.DELETED_FILES] == 5
+    assert first[RsyncStats.TOTAL_BYTES_RECEIVED] == 4600
+    assert first[RsyncStats.FILES_TRANSFERRED] == 12
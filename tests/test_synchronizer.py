@@ -0,0 +1,74 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import pytest
+from doubledog.config.sectioned import DefaultConfig
+
+from mirrmaid.config import MirrorTable
+from mirrmaid.synchronizer import Synchronizer
+
+CONFIG = """
+[MIRRORS]
+mirrors: ['repo']
+
+[repo]
+source: rsync://mirror.example.org/repo
+target: {target}
+include: []
+exclude: []
+rsync_options: ['-a', '--delay-updates', '--delete-after', '--del']
+staged: true
+metadata: ['repodata/']
+"""
+
+
+@pytest.fixture
+def synchronizer(tmp_path) -> Synchronizer:
+    filename = str(tmp_path / 'mirrmaid.conf')
+    with open(filename, 'w') as f:
+        f.write(CONFIG.format(target=tmp_path / 'target'))
+    table = MirrorTable(filename, ['repo'])
+    return Synchronizer(DefaultConfig(filename), table['repo'])
+
+
+def stage_options(synchronizer: Synchronizer) -> dict:
+    """
+    :return:
+        A dictionary mapping the name of each stage to its rsync options,
+        less the phase options, source and target.
+    """
+    commands = {}
+    for stage in synchronizer._stages:
+        synchronizer._begin_stage(stage)
+        commands[stage.name] = synchronizer.rsync_command[2:-2]
+        synchronizer._end_stage()
+    return commands
+
+
+def test_only_the_last_stage_deletes(synchronizer):
+    assert stage_options(synchronizer) == {
+        'payload': ['-a', '--delay-updates', '--exclude', 'repodata/'],
+        'metadata': ['-a', '--delay-updates', '--include', '*/',
+                     '--include', 'repodata/', '--exclude', '*'],
+        'delete': ['-a', '--delay-updates', '--delete-after', '--del'],
+    }
+
+
+def test_tune_removes_options_with_their_values():
+    opts = ['-a', '--partial-dir', '.rsync-partial', '--compress',
+            '--compress-level=9', '--timeout', '60', '--delete']
+    assert Synchronizer._tune(
+        opts, [], ['--partial-dir', '--compress', '--compress-level',
+                   '--timeout=60']) == ['-a', '--delete']
+
+
+def test_tune_moves_added_options_to_the_end():
+    opts = ['--whole-file', '-a', '--bwlimit', '100', '--partial']
+    assert Synchronizer._tune(
+        opts, ['--whole-file', '--bwlimit', '100'], ['--bwlimit=200']) == [
+        '-a', '--partial', '--whole-file', '--bwlimit', '100']
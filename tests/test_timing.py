@@ -0,0 +1,114 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+from mirrmaid import timing
+from mirrmaid.timing import (
+    CONNECT, DELETE, FILE_LIST, PhaseTimer, RsyncPhaseTracker, TRANSFER,
+)
+
+
+class Clock(object):
+    """A monotonic clock that only advances when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def track(monkeypatch, lines: list, names: bool = True) -> dict:
+    """
+    Feed the tracker each ``(seconds, line)`` pair, the line arriving that
+    many seconds after the prior one.  The output names the files transferred
+    iff *names* is true.
+
+    :return:
+        The phases of the timer.
+    """
+    clock = Clock()
+    monkeypatch.setattr(timing, 'monotonic', clock)
+    timer = PhaseTimer()
+    tracker = RsyncPhaseTracker(timer, names)
+    for seconds, line in lines:
+        clock.now += seconds
+        tracker.feed(line)
+    clock.now += 1
+    tracker.finish()
+    return timer.phases
+
+
+def test_phases_of_full_file_list(monkeypatch):
+    phases = track(monkeypatch, [
+        (2, 'receiving file list ... '),
+        (5, 'done'),
+        (3, 'deleting old.rpm'),
+        (4, 'new.rpm'),
+        (0, 'Number of files: 3'),
+    ])
+    # The header arrives once connected; "done" once the list is complete.
+    assert phases[CONNECT] == 2
+    assert phases[FILE_LIST] == 5
+    assert phases[DELETE] == 3
+    assert phases[TRANSFER] == 5
+
+
+def test_incremental_file_list_time_is_taken_from_statistics(monkeypatch):
+    phases = track(monkeypatch, [
+        (1, 'receiving incremental file list'),
+        (2, 'a.rpm'),
+        (6, 'b.rpm'),
+        (0, 'File list transfer time: 3.000 seconds'),
+    ])
+    assert phases[CONNECT] == 1
+    assert phases[FILE_LIST] == 2 + 3
+    assert phases[TRANSFER] == 6 + 1 - 3
+
+
+def test_phases_without_names(monkeypatch):
+    phases = track(monkeypatch, [
+        (2, 'receiving file list ... '),
+        (5, 'done'),
+        (3, 'deleting old.rpm'),
+        (4, ''),
+        (0, 'Number of files: 3'),
+    ], names=False)
+    assert phases[CONNECT] == 2
+    assert phases[FILE_LIST] == 5
+    assert phases[DELETE] == 3
+    assert phases[TRANSFER] == 4 + 1
+
+
+def test_incremental_phases_without_names(monkeypatch):
+    phases = track(monkeypatch, [
+        (1, 'receiving incremental file list'),
+        (8, ''),
+        (0, 'File list transfer time: 3.000 seconds'),
+    ], names=False)
+    assert phases[CONNECT] == 1
+    assert phases[FILE_LIST] == 3
+    assert phases[TRANSFER] == 8 + 1 - 3
+
+
+def flags(options: list) -> set:
+    option, = options
+    return set(option.partition('=')[2].split(','))
+
+
+def test_phase_options_request_the_markers():
+    assert flags(timing.PHASE_OPTIONS) == {'flist2', 'del1', 'stats2'}
+    assert flags(timing.VERBOSE_PHASE_OPTIONS) == {'flist2', 'name1', 'del1',
+                                                   'stats2'}
+
+
+def test_file_names_only_when_verbose():
+    assert timing.phase_options(['-a', '--delete']) == timing.PHASE_OPTIONS
+    assert timing.phase_options(['-e', 'ssh -v']) == timing.PHASE_OPTIONS
+    for verbose in [['--verbose'], ['-v'], ['-avH']]:
+        assert (timing.phase_options(['--delete'] + verbose)
+                == timing.VERBOSE_PHASE_OPTIONS)
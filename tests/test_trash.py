@@ -0,0 +1,119 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import os
+from datetime import datetime
+
+import pytest
+
+from mirrmaid import trash
+from mirrmaid.trash import Purger, _within
+
+
+def at(hour: int, minute: int = 0):
+    """
+    :return:
+        A replacement for the datetime class whose now() is the given time of
+        day.
+    """
+    class Fixed(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2026, 1, 1, hour, minute)
+
+    return Fixed
+
+
+@pytest.fixture
+def trash_tree(tmp_path, monkeypatch) -> str:
+    """
+    :return:
+        The trash directory of a mirror named ``'repo'`` holding two runs of
+        three files each.
+    """
+    monkeypatch.setattr(trash, 'LOCK_DIRECTORY', str(tmp_path / 'lock'))
+    monkeypatch.setattr(trash, 'sleep', lambda seconds: None)
+    (tmp_path / 'lock').mkdir()
+    directory = tmp_path / 'trash'
+    for stamp in ['20260102T000000', '20260101T000000']:
+        (directory / stamp / 'sub').mkdir(parents=True)
+        for name in ['a', 'b', 'sub/c']:
+            (directory / stamp / name).write_bytes(b'x' * 10)
+    return str(directory)
+
+
+@pytest.mark.parametrize('hour, minute, expected', [
+    (22, 59, False),
+    (23, 0, True),
+    (0, 0, True),
+    (5, 59, True),
+    (6, 0, False),
+    (12, 0, False),
+])
+def test_window_wrapping_past_midnight(monkeypatch, hour, minute, expected):
+    monkeypatch.setattr(trash, 'datetime', at(hour, minute))
+    assert _within((23 * 60, 6 * 60)) is expected
+
+
+@pytest.mark.parametrize('hour, expected', [
+    (0, False), (9, True), (16, True), (17, False),
+])
+def test_window_within_a_day(monkeypatch, hour, expected):
+    monkeypatch.setattr(trash, 'datetime', at(hour))
+    assert _within((9 * 60, 17 * 60)) is expected
+
+
+def test_no_window(monkeypatch):
+    monkeypatch.setattr(trash, 'datetime', at(12))
+    assert _within(None)
+
+
+def test_purge_empties_the_trash(trash_tree):
+    files, size, _, finished = Purger(2, 0, None).purge('repo', trash_tree)
+    assert (files, size, finished) == (6, 60, True)
+    assert os.listdir(trash_tree) == []
+
+
+def test_purge_stops_when_a_batch_ends_outside_the_window(trash_tree,
+                                                          monkeypatch):
+    monkeypatch.setattr(trash, 'datetime', at(12))
+    files, size, _, finished = Purger(2, 0, (23 * 60, 6 * 60)).purge(
+        'repo', trash_tree)
+    assert (files, size, finished) == (2, 20, False)
+    # The oldest run is purged first.
+    assert sorted(os.listdir(trash_tree)) == ['20260101T000000',
+                                              '20260102T000000']
+    assert len(os.listdir(os.path.join(trash_tree, '20260102T000000'))) == 3
+
+
+def test_purge_yields_to_a_synchronization(trash_tree, tmp_path,
+                                           monkeypatch):
+    lock = tmp_path / 'lock' / 'repo'
+
+    def sync_begins(seconds):
+        lock.touch()
+
+    monkeypatch.setattr(trash, 'sleep', sync_begins)
+    files, _, _, finished = Purger(4, 0, None).purge('repo', trash_tree)
+    assert (files, finished) == (4, False)
+    files, _, _, finished = Purger(4, 0, None).purge('repo', trash_tree)
+    assert (files, finished) == (0, False)
+    lock.unlink()
+    files, _, _, finished = Purger(4, 0, None).purge('repo', trash_tree)
+    assert (files, finished) == (2, True)
+
+
+def test_purge_does_not_follow_symlinked_directories(trash_tree, tmp_path):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'keep').write_bytes(b'keep')
+    os.symlink(outside, os.path.join(trash_tree, '20260101T000000', 'link'))
+    files, _, _, finished = Purger(100, 0, None).purge('repo', trash_tree)
+    assert (files, finished) == (7, True)
+    assert os.listdir(trash_tree) == []
+    assert (outside / 'keep').read_bytes() == b'keep'
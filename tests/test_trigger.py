@@ -0,0 +1,85 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import os
+
+import pytest
+
+from mirrmaid import trigger
+from mirrmaid.exceptions import MirrmaidRuntimeException
+from mirrmaid.trigger import LOCKED_RETRY_DELAY, TriggerQueue, TriggerSpool
+
+NOW = 1000000.0
+
+
+@pytest.fixture
+def queue(monkeypatch) -> TriggerQueue:
+    monkeypatch.setattr(trigger, 'time', lambda: NOW)
+    return TriggerQueue()
+
+
+def test_spool_yields_oldest_trigger_first(tmp_path):
+    spool = TriggerSpool(str(tmp_path / 'triggers'))
+    for mirror, age in [('b', 10), ('a', 20), ('c', 5)]:
+        spool.add(mirror)
+        path = os.path.join(spool.directory, mirror)
+        os.utime(path, (NOW - age, NOW - age))
+    assert spool.take() == ['a', 'b', 'c']
+    # Taking them consumes them.
+    assert spool.take() == []
+
+
+def test_spool_merges_duplicate_triggers(tmp_path):
+    spool = TriggerSpool(str(tmp_path))
+    spool.add('a')
+    spool.add('a')
+    assert spool.take() == ['a']
+
+
+def test_spool_rejects_names_that_are_not_plain(tmp_path):
+    spool = TriggerSpool(str(tmp_path))
+    for mirror in ['.hidden', 'a/b']:
+        with pytest.raises(MirrmaidRuntimeException):
+            spool.add(mirror)
+    assert spool.take() == []
+
+
+def test_queue_merges_duplicate_triggers(queue):
+    queue.add('a')
+    queue.add('b')
+    queue.add('a')
+    assert len(queue) == 2
+    assert queue.take(set()) == 'a'
+    assert queue.take(set()) == 'b'
+    assert queue.take(set()) is None
+
+
+def test_queue_skips_running_mirrors(queue):
+    queue.add('a')
+    queue.add('b')
+    assert queue.take({'a'}) == 'b'
+    # The mirror remains queued for a run once the current one concludes.
+    assert queue.take({'a'}) is None
+    assert 'a' in queue
+    assert queue.take(set()) == 'a'
+
+
+def test_queue_delays_retries_until_due(queue, monkeypatch):
+    queue.add('a', NOW + LOCKED_RETRY_DELAY)
+    queue.add('b')
+    assert queue.take(set()) == 'b'
+    assert queue.take(set()) is None
+    monkeypatch.setattr(trigger, 'time', lambda: NOW + LOCKED_RETRY_DELAY)
+    assert queue.take(set()) == 'a'
+
+
+def test_trigger_hastens_a_delayed_retry(queue):
+    queue.add('a', NOW + LOCKED_RETRY_DELAY)
+    queue.add('a')
+    assert len(queue) == 1
+    assert queue.take(set()) == 'a'
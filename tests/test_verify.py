@@ -0,0 +1,51 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import gzip
+
+from mirrmaid.verify import read_manifest
+
+REPOMD = """<?xml version="1.0" encoding="UTF-8"?>
+<repomd xmlns="http://linux.duke.edu/metadata/repo">
+  <data type="primary">
+    <checksum type="sha256">AAAA</checksum>
+    <location href="repodata/primary.xml.gz"/>
+  </data>
+  <data type="other">
+    <checksum type="sha256">bbbb</checksum>
+    <location xml:base="http://elsewhere.example.org/" href="repodata/other.xml.gz"/>
+  </data>
+</repomd>
+"""
+
+PRIMARY = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://linux.duke.edu/metadata/common" packages="2">
+  <package type="rpm">
+    <name>here</name>
+    <checksum type="sha256" pkgid="YES">cccc</checksum>
+    <location href="Packages/h/here-1.0-1.noarch.rpm"/>
+  </package>
+  <package type="rpm">
+    <name>there</name>
+    <checksum type="sha256" pkgid="YES">dddd</checksum>
+    <location xml:base="http://elsewhere.example.org/" href="Packages/t/there-1.0-1.noarch.rpm"/>
+  </package>
+</metadata>
+"""
+
+
+def test_files_located_elsewhere_are_skipped(tmp_path):
+    repodata = tmp_path / 'repodata'
+    repodata.mkdir()
+    (repodata / 'repomd.xml').write_text(REPOMD)
+    with gzip.open(str(repodata / 'primary.xml.gz'), 'wt') as f:
+        f.write(PRIMARY)
+    assert read_manifest(str(repodata / 'repomd.xml')) == {
+        str(repodata / 'primary.xml.gz'): ('sha256', 'aaaa'),
+        str(tmp_path / 'Packages/h/here-1.0-1.noarch.rpm'): ('sha256', 'cccc'),
+    }
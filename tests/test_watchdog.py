@@ -0,0 +1,77 @@
+# coding=utf-8
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright 2026 John Florian <jflorian@doubledog.org>
+#
+# This file is part of mirrmaid.
+
+
+import logging
+import os
+from threading import Event
+
+import pytest
+
+from mirrmaid import watchdog
+from mirrmaid.exceptions import SynchronizerException
+from mirrmaid.reporting import TIMEOUT
+from mirrmaid.watchdog import Watchdog
+
+_log = logging.getLogger('mirrmaid.test')
+
+
+@pytest.fixture
+def stopped(monkeypatch):
+    """An Event set once the Watchdog stops the run."""
+    monkeypatch.setattr(watchdog, '_MIN_INTERVAL', 0.01)
+    return Event()
+
+
+def test_running_process_is_stopped(stopped):
+    dog = Watchdog(0, 0.05, stopped.set, _log)
+    dog.watch(os.getpid())
+    dog.start()
+    try:
+        assert stopped.wait(5)
+    finally:
+        dog.cancel()
+    assert dog.verdict == TIMEOUT
+    # The run was stopped, so the verdict is not enforced a second time.
+    dog.enforce()
+
+
+def test_verdict_without_process_is_enforced_before_spawning(stopped):
+    dog = Watchdog(0, 0.05, stopped.set, _log)
+    dog.start()
+    try:
+        assert not stopped.wait(0.5)
+        assert dog.pending == TIMEOUT
+        assert dog.verdict is None
+        with pytest.raises(SynchronizerException):
+            dog.enforce()
+    finally:
+        dog.cancel()
+    assert dog.verdict == TIMEOUT
+
+
+def test_process_spawned_despite_verdict_is_stopped(stopped):
+    dog = Watchdog(0, 0.05, stopped.set, _log)
+    dog.start()
+    try:
+        assert not stopped.wait(0.5)
+        dog.watch(os.getpid())
+        assert stopped.wait(5)
+    finally:
+        dog.cancel()
+    assert dog.verdict == TIMEOUT
+
+
+def test_no_verdict_within_limits(stopped):
+    dog = Watchdog(0, 60, stopped.set, _log)
+    dog.start()
+    dog.watch(os.getpid())
+    dog.enforce()
+    dog.cancel()
+    assert not stopped.is_set()
+    assert dog.pending is None
+    assert dog.verdict is None